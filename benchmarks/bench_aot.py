@@ -0,0 +1,62 @@
+"""
+Runs the scaled-up test_syntax programs of bench_vm on the stack machine and
+translated to Python, and checks both write the same output.
+
+Usage: python benchmarks/bench_aot.py [repetitions] [loop size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from code_generator.vm import Program, VirtualMachine, ListInput, ListOutput
+from code_generator.aot import CompiledMachine, compile_program
+from bench_vm import scaled_source, compile_source
+
+
+def time_machine(create, inputs, runs=5):
+    """
+    Runs a machine from create(input_stream, output_stream) runs times,
+    returns (output, best time in seconds).
+    """
+    best = None
+    for _ in range(runs):
+        output = ListOutput()
+        machine = create(ListInput(inputs), output)
+        start = time.perf_counter()
+        machine.run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return output.values, best
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    loop_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name in ["test_syntax1.txt", "test_syntax3.txt"]:
+            program = Program.from_generator(compile_source(scaled_source(os.path.join(ROOT, name), repetitions)))
+            inputs = [loop_size] * repetitions
+
+            start = time.perf_counter()
+            compile_program(program, cache_dir)
+            translated = time.perf_counter() - start
+            start = time.perf_counter()
+            compile_program(program, cache_dir)
+            cached = time.perf_counter() - start
+
+            vm_output, vm_time = time_machine(lambda i, o: VirtualMachine(program, i, o), inputs)
+            aot_output, aot_time = time_machine(lambda i, o: CompiledMachine(program, i, o, cache_dir), inputs)
+            print(f"{name}: {len(program)} instructions, translated in {translated * 1000:.1f} ms, "
+                  f"loaded from the cache in {cached * 1000:.1f} ms")
+            print(f"  stack machine {vm_time * 1000:9.2f} ms")
+            print(f"  translated    {aot_time * 1000:9.2f} ms  {vm_time / aot_time:5.1f}x")
+            print(f"  identical output: {vm_output == aot_output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Measures the syntax tree built by Parser(build_ast=True) on a generated Rat25S
+program: memory per node, and the time of parsing with code generation in one
+pass against parsing to a tree and generating code from it in a second pass.
+
+Usage: python benchmarks/bench_ast.py [repetitions]
+"""
+import contextlib
+import gc
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lexical_analyzer.lexical_analyzer import Lexer
+from lexical_analyzer.token_buffer import TokenBuffer
+from lexical_analyzer.constants import ENGINE_PATTERN
+from syntax_analyzer.parser import Parser
+from code_generator.symbol_table import SymbolTable
+from code_generator.code_generator import AssemblyGenerator
+from code_generator.tree_codegen import TreeCodeGenerator
+from bench_lexer import generate_source
+
+
+def count_nodes(tree):
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def parse_tree(tokens):
+    symbol_table = SymbolTable()
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = Parser(tokens, None, symbol_table, None, build_ast=True)
+        parser.parse()
+    return parser.tree, symbol_table
+
+
+def tree_memory(tokens):
+    """
+    Returns (tree, bytes still allocated for the tree and symbol table once parsing is done).
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tree, symbol_table = parse_tree(tokens)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return tree, size
+
+
+def time_passes(tokens, runs=10):
+    """
+    Returns (one pass instructions, two pass instructions, best one pass time, best two pass time).
+    """
+    best_one = best_two = None
+    for _ in range(runs):
+        symbol_table = SymbolTable()
+        one_pass = AssemblyGenerator(symbol_table)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            Parser(tokens, None, symbol_table, one_pass).parse()
+            elapsed = time.perf_counter() - start
+        best_one = elapsed if best_one is None else min(best_one, elapsed)
+
+        start = time.perf_counter()
+        tree, symbol_table = parse_tree(tokens)
+        two_pass = AssemblyGenerator(symbol_table)
+        TreeCodeGenerator(symbol_table, two_pass).generate(tree)
+        elapsed = time.perf_counter() - start
+        best_two = elapsed if best_two is None else min(best_two, elapsed)
+
+    return (one_pass.instructions[1:one_pass.current_instruction],
+            two_pass.instructions[1:two_pass.current_instruction], best_one, best_two)
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    tokens = TokenBuffer.from_lexer(Lexer(generate_source(repetitions), ENGINE_PATTERN))
+
+    tree, size = tree_memory(tokens)
+    nodes = count_nodes(tree)
+    print(f"{len(tokens)} tokens, {nodes} nodes, {size} bytes, {size / nodes:.1f} bytes/node")
+
+    one_pass, two_pass, one_elapsed, two_elapsed = time_passes(tokens)
+    print(f"{'one pass':10} {one_elapsed * 1000:10.2f} ms")
+    print(f"{'two pass':10} {two_elapsed * 1000:10.2f} ms")
+    print(f"identical code: {one_pass == two_pass}")
+
+
+if __name__ == "__main__":
+    main()
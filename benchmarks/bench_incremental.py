@@ -0,0 +1,46 @@
+"""
+Measures the latency of single character edits with the IncrementalLexer
+against lexing the whole source again.
+
+Usage: python benchmarks/bench_incremental.py [repetitions]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lexical_analyzer.incremental import IncrementalLexer
+from lexical_analyzer.lexical_analyzer import Lexer
+from lexical_analyzer.constants import ENGINE_PATTERN
+from bench_lexer import generate_source
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    source = generate_source(repetitions)
+    print(f"{source.count(chr(10))} lines, {len(source)} characters")
+
+    start = time.perf_counter()
+    lexer = IncrementalLexer(source)
+    full = time.perf_counter() - start
+    print(f"full lex          {full * 1000:10.2f} ms")
+
+    edits = 200
+    middle = len(source) // 2
+    start = time.perf_counter()
+    for index in range(edits):
+        lexer.apply_edit(middle + index, 0, "x")
+    print(f"one char insert   {(time.perf_counter() - start) / edits * 1000:10.2f} ms")
+
+    start = time.perf_counter()
+    lexer.apply_edits([(middle, 0, "[*"), (middle, 2, "")])
+    print(f"open/close [*     {(time.perf_counter() - start) * 1000:10.2f} ms")
+
+    relexed = Lexer(lexer.text, ENGINE_PATTERN).tokenize()
+    identical = [(t.token_type, t.lexeme) for t in lexer.tokens] == [(t.token_type, t.lexeme) for t in relexed]
+    print(f"identical to a full re-lex: {identical}")
+
+
+if __name__ == "__main__":
+    main()
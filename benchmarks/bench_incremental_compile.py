@@ -0,0 +1,48 @@
+"""
+Measures recompiling a generated Rat25S program after a one statement edit
+with the IncrementalCompiler against compiling the whole source again.
+
+Usage: python benchmarks/bench_incremental_compile.py [repetitions]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from syntax_analyzer.incremental import IncrementalCompiler
+from bench_lexer import generate_source
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    source = generate_source(repetitions)
+
+    start = time.perf_counter()
+    compiler = IncrementalCompiler(source)
+    full = time.perf_counter() - start
+    print(f"{len(compiler.token_marks) - 1} statements, {len(compiler.instructions())} instructions")
+    print(f"full compile        {full * 1000:10.2f} ms")
+
+    # Alternate one literal in the middle of the program between two values
+    edits = 200
+    offset = source.index("value * 2", len(source) // 2) + len("value * ")
+    start = time.perf_counter()
+    for index in range(edits):
+        compiler.apply_edit(offset, 1, "3" if index % 2 == 0 else "2")
+    print(f"change a literal    {(time.perf_counter() - start) / edits * 1000:10.2f} ms")
+
+    # Add a statement and take it out again
+    offset = source.index("done = false;", len(source) // 2)
+    start = time.perf_counter()
+    for index in range(edits // 2):
+        compiler.apply_edit(offset, 0, "print(value);\n")
+        compiler.apply_edit(offset, len("print(value);\n"), "")
+    print(f"insert/delete stmt  {(time.perf_counter() - start) / edits * 1000:10.2f} ms")
+
+    identical = compiler.instructions() == IncrementalCompiler(compiler.text).instructions()
+    print(f"identical to a full compile: {identical and not compiler.errors}")
+
+
+if __name__ == "__main__":
+    main()
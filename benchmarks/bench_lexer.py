@@ -0,0 +1,87 @@
+"""
+Compares the FSM, pattern and bytes scanner engines (and the NumPy pre-pass when
+NumPy is installed) on a generated Rat25S source.
+
+Usage: python benchmarks/bench_lexer.py [repetitions]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lexical_analyzer.lexical_analyzer import Lexer
+from lexical_analyzer.byte_lexer import bytes_lexer
+from lexical_analyzer import vectorized
+from lexical_analyzer.parallel import parallel_tokenize
+from lexical_analyzer.constants import ENGINE_FSM, ENGINE_PATTERN, ENGINE_BYTES
+
+STATEMENTS = """[* Conditional execution with if-else *]
+scan(value);
+done = false;
+if (value > 0) {
+    result = value * 2;
+    print(result);
+}
+else {
+    result = 0;
+    print(result);
+}
+endif
+counter = 1;
+while (counter <= value) {
+    print(counter);
+    counter = counter + 1;
+}
+endwhile
+"""
+
+
+def generate_source(repetitions):
+    """
+    Builds a large Rat25S program by repeating a block of statements.
+    """
+    return "$$\n$$\ninteger value, counter, result;\nboolean done;\n$$\n" + STATEMENTS * repetitions + "$$\n"
+
+
+def time_engine(tokenize):
+    """
+    Runs one tokenize call, returns (tokens, seconds).
+    """
+    # The FSM engine prints a debug line per number, keep it out of the timing output
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        tokens = tokenize()
+        elapsed = time.perf_counter() - start
+    return tokens, elapsed
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate_source(repetitions)
+    raw_source = source.encode()
+    print(f"Source size: {len(source)} characters")
+
+    engines = {
+        ENGINE_FSM: lambda: Lexer(source, ENGINE_FSM).tokenize(),
+        ENGINE_PATTERN: lambda: Lexer(source, ENGINE_PATTERN).tokenize(),
+        ENGINE_BYTES: lambda: bytes_lexer(raw_source).tokenize(),
+        f"parallel x{os.cpu_count()}": lambda: parallel_tokenize(source),
+    }
+    if vectorized.np is not None:
+        engines["numpy"] = lambda: vectorized.vectorized_tokenize(source)
+
+    results = {}
+    for engine, tokenize in engines.items():
+        tokens, elapsed = time_engine(tokenize)
+        results[engine] = [repr(t) for t in tokens]
+        print(f"{engine:<12} {len(tokens)} tokens in {elapsed:.3f}s ({len(tokens) / elapsed:,.0f} tokens/s)")
+
+    same = all(tokens == results[ENGINE_FSM] for tokens in results.values())
+    print(f"Token streams identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Compares the recursive descent Parser with the table-driven LLParser on a
+generated Rat25S program. Tokens are lexed once up front so only parsing,
+tracing and code generation are timed.
+
+Usage: python benchmarks/bench_parser.py [repetitions]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lexical_analyzer.lexical_analyzer import Lexer
+from lexical_analyzer.token_buffer import TokenBuffer
+from lexical_analyzer.constants import ENGINE_PATTERN
+from syntax_analyzer.parser import Parser
+from syntax_analyzer.ll_parser import LLParser
+from code_generator.symbol_table import SymbolTable
+from code_generator.code_generator import AssemblyGenerator
+from bench_lexer import generate_source
+
+
+def time_parser(parser_class, tokens, runs=10):
+    """
+    Parses tokens runs times, returns (instructions, best time in seconds).
+    """
+    best = None
+    for _ in range(runs):
+        symbol_table = SymbolTable()
+        assembly_gen = AssemblyGenerator(symbol_table)
+        # Every token and production is traced to stdout, keep it out of the timing output
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            parser_class(tokens, None, symbol_table, assembly_gen).parse()
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return assembly_gen.instructions[1:assembly_gen.current_instruction], best
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    tokens = TokenBuffer.from_lexer(Lexer(generate_source(repetitions), ENGINE_PATTERN))
+    # The recursive parser nests one call per statement of the list
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), len(tokens) * 4))
+
+    results = {}
+    for name, parser_class in [("recursive", Parser), ("ll1", LLParser)]:
+        instructions, elapsed = time_parser(parser_class, tokens)
+        results[name] = instructions
+        print(f"{name:10} {elapsed * 1000:10.2f} ms {len(tokens) / elapsed:12.0f} tokens/s")
+    print(f"identical code: {results['recursive'] == results['ll1']}")
+
+
+if __name__ == "__main__":
+    main()
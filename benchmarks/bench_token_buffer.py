@@ -0,0 +1,47 @@
+"""
+Compares the memory used per token by a list of Token objects and a TokenBuffer.
+
+Usage: python benchmarks/bench_token_buffer.py [repetitions]
+"""
+import os
+import pickle
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from lexical_analyzer.lexical_analyzer import Lexer
+from lexical_analyzer.token_buffer import TokenBuffer
+from lexical_analyzer.constants import ENGINE_PATTERN
+from bench_lexer import generate_source
+
+
+def measure(build):
+    """
+    Returns (result, bytes allocated while building it).
+    """
+    tracemalloc.start()
+    result = build()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, allocated
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate_source(repetitions)
+
+    tokens, list_bytes = measure(lambda: Lexer(source, ENGINE_PATTERN).tokenize())
+    # The line index is part of the buffer, build it inside the measurement too
+    buffer, buffer_bytes = measure(lambda: TokenBuffer.from_lexer(Lexer(source, ENGINE_PATTERN)))
+
+    count = len(tokens)
+    print(f"{count} tokens")
+    print(f"list of Token  {list_bytes / count:8.1f} bytes/token")
+    print(f"TokenBuffer    {buffer_bytes / count:8.1f} bytes/token ({buffer.nbytes() / count:.1f} in token columns)")
+    print(f"Pickled list   {len(pickle.dumps(tokens)) / count:8.1f} bytes/token")
+    print(f"Pickled buffer {len(pickle.dumps(buffer)) / count:8.1f} bytes/token")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Runs the test_syntax programs on the stack machine, scaled up: the statements
+of each program are repeated and the loops are given large inputs.
+
+Usage: python benchmarks/bench_vm.py [repetitions] [loop size]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from lexical_analyzer.lexical_analyzer import Lexer
+from lexical_analyzer.constants import ENGINE_PATTERN
+from syntax_analyzer.parser import Parser
+from code_generator.symbol_table import SymbolTable
+from code_generator.code_generator import AssemblyGenerator
+from code_generator.vm import Program, VirtualMachine, ListInput, ListOutput
+
+
+def scaled_source(path, repetitions):
+    """
+    Returns the program in path with its statements repeated.
+    """
+    with open(path) as f:
+        parts = f.read().split("$$")
+    parts[3] = parts[3] * repetitions
+    return "$$".join(parts)
+
+
+def compile_source(source):
+    """
+    Compiles a Rat25S program, returns its AssemblyGenerator.
+    """
+    symbol_table = SymbolTable()
+    assembly_gen = AssemblyGenerator(symbol_table)
+    with contextlib.redirect_stdout(io.StringIO()):
+        errors = Parser(Lexer(source, ENGINE_PATTERN), None, symbol_table, assembly_gen, False).parse()
+    if errors:
+        raise SyntaxError(errors[0])
+    return assembly_gen
+
+
+def time_run(program, inputs, runs=5):
+    """
+    Runs program runs times, returns (output, instructions, best time in seconds).
+    """
+    best = None
+    for _ in range(runs):
+        output = ListOutput()
+        machine = VirtualMachine(program, ListInput(inputs), output)
+        start = time.perf_counter()
+        executed = machine.run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return output.values, executed, best
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    loop_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    total_executed = total_time = 0
+    for name in ["test_syntax1.txt", "test_syntax2.txt", "test_syntax3.txt"]:
+        program = Program.from_generator(compile_source(scaled_source(os.path.join(ROOT, name), repetitions)))
+        # Every copy of the statements scans its own loop bound
+        output, executed, elapsed = time_run(program, [loop_size] * repetitions)
+        total_executed += executed
+        total_time += elapsed
+        print(f"{name:18} {len(program):6} instructions {executed:10} run {elapsed * 1000:9.2f} ms "
+              f"{executed / elapsed:12,.0f} instructions/s {len(output):7} outputs")
+    print(f"{'total':18} {total_executed / total_time:60,.0f} instructions/s")
+
+
+if __name__ == "__main__":
+    main()
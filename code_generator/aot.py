@@ -0,0 +1,356 @@
+"""
+Ahead-of-time translation of generated code into one Python function.
+The decoded Program is split into basic blocks at every jump target. Each
+block becomes straight-line Python in which local variables stand in for the
+memory cells, and the operand stack only exists at compile time, as the
+expressions still waiting to be used. A block that a JMP0 falls through into
+and that no jump lands on is written inline after the test. Blocks are picked
+by a binary search on their number in a single loop, and a block that jumps
+back to itself loops in place. The function is compiled once and its code
+object cached on disk with marshal, keyed by a hash of the generated source.
+"""
+import hashlib
+import importlib.util
+import marshal
+import os
+
+from code_generator.instruction_buffer import (
+    PUSHI, PUSHM, POPM, SOUT, SIN, A, S, M, D, GRT, LES, EQU, NEQ, GEQ, LEQ,
+    JMP0, JMP, LABEL, JUMPS
+)
+from code_generator.symbol_table import MEMORY_BASE
+from code_generator.vm import Program, MachineError, ListInput, ListOutput, OUTPUT_BATCH
+
+# Bumped whenever the generated code changes, invalidating cached code objects
+AOT_VERSION = 1
+
+DEFAULT_CODE_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__")
+
+OPERATORS = {A: "+", S: "-", M: "*"}
+
+# Deepest an expression is nested before it goes into a temporary
+MAX_NESTING = 50
+
+# Python operator of every relation, and of its opposite for a JMP0 on it
+RELATIONS = {GRT: ">", LES: "<", EQU: "==", NEQ: "!=", GEQ: ">=", LEQ: "<="}
+OPPOSITES = {GRT: "<=", LES: ">=", EQU: "!=", NEQ: "==", GEQ: "<", LEQ: ">"}
+
+
+class Value:
+    """
+    One operand stack entry at compile time: a Python expression, and for the
+    result of a relation its operator and operands, so a JMP0 on it can test
+    the opposite relation instead of the 0 or 1.
+    """
+    def __init__(self, expression, relation=None, nesting=0):
+        self.expression = expression
+        self.relation = relation    # (opcode, left expression, right expression)
+        self.nesting = nesting      # Parentheses deep
+
+    def is_atom(self):
+        """
+        A name or a literal, cheap to use more than once.
+        """
+        return self.expression.lstrip("-").isalnum()
+
+
+class BlockTranslator:
+    """
+    Writes the Python code of the blocks of one Program.
+    entries holds the address every block starts at, the last one the address
+    just past the program; blocks are numbered by their place in it.
+    """
+    def __init__(self, program):
+        self.program = program
+        opcodes, operands, depths = program.opcodes, program.operands, program.depths
+        self.end = len(opcodes)
+        # Jump address -> where it ends up, past any labels and unconditional jumps it lands on
+        self.targets = {address: self.final_target(operands[address]) for address in range(1, self.end)
+                        if opcodes[address] in JUMPS and depths[address] is not None}
+        self.entries = sorted(set(self.targets.values()) | {1, self.end})
+        self.numbers = {address: number for number, address in enumerate(self.entries)}
+        self.temporaries = 0
+
+    def final_target(self, target):
+        """
+        Follows target through labels and JMPs; a loop of jumps stays where it is.
+        """
+        opcodes, operands = self.program.opcodes, self.program.operands
+        seen = set()
+        address = target
+        while address < self.end and address not in seen:
+            seen.add(address)
+            if opcodes[address] == LABEL:
+                address += 1
+            elif opcodes[address] == JMP:
+                target = address = operands[address]
+            else:
+                break
+        return target
+
+    def temporary(self):
+        self.temporaries += 1
+        return f"t{self.temporaries}"
+
+    def cell(self, address):
+        return f"m{self.program.operands[address] + MEMORY_BASE}"
+
+    def block(self, number):
+        """
+        Returns the lines of code of a block, without indentation.
+        """
+        start = self.entries[number]
+        lines = []
+        if start == self.end:
+            return ["break"]
+        # A block that jumps back to itself loops in place, leaving it is a break out of that loop
+        loops = self.jumps_to(start)
+        leave = "break" if loops else "continue"
+        stack = [Value(f"s{index}") for index in range(self.program.depths[start])]
+        body = self.straight_line(start, stack, leave)
+        if loops:
+            return ["while True:"] + ["    " + line for line in body]
+        return body
+
+    def jumps_to(self, start):
+        """
+        True when the code written for the block at start jumps back to start.
+        """
+        opcodes, operands = self.program.opcodes, self.program.operands
+        address = start
+        while address < self.end:
+            if opcodes[address] in JUMPS and self.targets[address] == start:
+                return True
+            if opcodes[address] == JMP:
+                return False
+            address += 1
+            if address in self.numbers:
+                return False
+        return False
+
+    def go_to(self, lines, target, stack, leave, indent=""):
+        """
+        Writes the jump to the block at target, with the stack kept in s0, s1, ...
+        """
+        if stack:
+            names = ", ".join(f"s{index}" for index in range(len(stack)))
+            lines.append(f"{indent}{names} = {', '.join(value.expression for value in stack)}")
+        if leave == "break" and target == self.entries[self.current]:
+            lines.append(f"{indent}continue")
+        else:
+            lines.append(f"{indent}block = {self.numbers[target]}")
+            lines.append(f"{indent}{leave}")
+
+    def materialize(self, lines, value):
+        """
+        Returns value as an atom, assigning its expression to a new temporary if needed.
+        """
+        if value.is_atom():
+            return value
+        name = self.temporary()
+        lines.append(f"{name} = {value.expression}")
+        return Value(name)
+
+    def operands(self, lines, stack):
+        """
+        Pops the two operands of a binary operator. Python only parses
+        parentheses so deep, so a long expression is cut short in a temporary.
+        """
+        right = stack.pop()
+        left = stack.pop()
+        if left.nesting >= MAX_NESTING:
+            left = self.materialize(lines, left)
+        if right.nesting >= MAX_NESTING:
+            right = self.materialize(lines, right)
+        return left, right
+
+    def straight_line(self, address, stack, leave):
+        lines = []
+        opcodes, operands = self.program.opcodes, self.program.operands
+        self.current = self.numbers[address]
+        while True:
+            if address in self.numbers and address != self.entries[self.current]:
+                # Falling into the next block
+                self.go_to(lines, address, stack, leave)
+                return lines
+            opcode = opcodes[address]
+            operand = operands[address]
+            if opcode == PUSHI:
+                stack.append(Value(str(operand)))
+            elif opcode == PUSHM:
+                stack.append(Value(self.cell(address)))
+            elif opcode == POPM:
+                value = stack.pop()
+                name = self.cell(address)
+                # Values still on the stack were read before this store
+                for index, waiting in enumerate(stack):
+                    if name in waiting.expression:
+                        stack[index] = Value(self.temporary())
+                        lines.append(f"{stack[index].expression} = {waiting.expression}")
+                lines.append(f"{name} = {value.expression}")
+            elif opcode in OPERATORS:
+                left, right = self.operands(lines, stack)
+                nesting = max(left.nesting, right.nesting) + 1
+                stack.append(Value(f"({left.expression} {OPERATORS[opcode]} {right.expression})", None, nesting))
+            elif opcode in RELATIONS:
+                left, right = self.operands(lines, stack)
+                nesting = max(left.nesting, right.nesting) + 1
+                condition = f"{left.expression} {RELATIONS[opcode]} {right.expression}"
+                stack.append(Value(f"(1 if {condition} else 0)", (opcode, left.expression, right.expression), nesting))
+            elif opcode == D:
+                right = self.materialize(lines, stack.pop()).expression
+                left = self.materialize(lines, stack.pop()).expression
+                name = self.temporary()
+                lines.append(f"if {right} == 0:")
+                lines.append(f"    raise MachineError('Division by zero at instruction {address}')")
+                lines.append(f"{name} = abs({left}) // abs({right})")
+                lines.append(f"if ({left} < 0) != ({right} < 0):")
+                lines.append(f"    {name} = -{name}")
+                stack.append(Value(name))
+            elif opcode == SOUT:
+                lines.append(f"outputs.append({stack.pop().expression})")
+                lines.append(f"if len(outputs) >= {OUTPUT_BATCH}:")
+                lines.append(f"    write_batch(outputs)")
+                lines.append(f"    outputs = []")
+            elif opcode == SIN:
+                name = self.temporary()
+                lines.append(f"if next_input == len(inputs):")
+                lines.append(f"    inputs = read_batch()")
+                lines.append(f"    next_input = 0")
+                lines.append(f"    if not inputs:")
+                lines.append(f"        raise MachineError('SIN with no input left at instruction {address}')")
+                lines.append(f"{name} = inputs[next_input]")
+                lines.append(f"next_input += 1")
+                stack.append(Value(name))
+            elif opcode == JMP0:
+                value = stack.pop()
+                if value.relation is None:
+                    lines.append(f"if {value.expression} == 0:")
+                else:
+                    relation, left, right = value.relation
+                    lines.append(f"if {left} {OPPOSITES[relation]} {right}:")
+                self.go_to(lines, self.targets[address], stack, leave, "    ")
+            elif opcode == JMP:
+                self.go_to(lines, self.targets[address], stack, leave)
+                return lines
+            address += 1    # LABEL writes nothing
+
+
+def translate(program):
+    """
+    Returns the Python source of a module defining run(memory, read_batch, write_batch),
+    which runs program on the cells in memory and returns them as they end up.
+    """
+    translator = BlockTranslator(program)
+    cells = [f"m{index + MEMORY_BASE}" for index in range(program.memory_size)]
+    lines = ["def run(memory, read_batch, write_batch):"]
+    if cells:
+        lines.append(f"    {', '.join(cells)}, = memory")
+    lines.append("    inputs = []")
+    lines.append("    next_input = 0")
+    lines.append("    outputs = []")
+    lines.append("    block = 0")
+    lines.append("    try:")
+    lines.append("        while True:")
+    dispatch(translator, lines, 0, len(translator.entries), "            ")
+    lines.append("    finally:")
+    lines.append("        if outputs:")
+    lines.append("            write_batch(outputs)")
+    lines.append(f"    return [{', '.join(cells)}]")
+    return "\n".join(lines) + "\n"
+
+
+def dispatch(translator, lines, first, last, indent):
+    """
+    Writes the blocks numbered first up to last as a binary search on block.
+    """
+    if last - first == 1:
+        lines.extend(indent + line for line in translator.block(first))
+        return
+    middle = (first + last) // 2
+    lines.append(f"{indent}if block < {middle}:")
+    dispatch(translator, lines, first, middle, indent + "    ")
+    lines.append(f"{indent}else:")
+    dispatch(translator, lines, middle, last, indent + "    ")
+
+
+class CodeCache:
+    """
+    On-disk cache of compiled code objects, keyed by a hash of the generated
+    source, AOT_VERSION and the interpreter's bytecode version.
+    """
+    def __init__(self, directory=DEFAULT_CODE_CACHE):
+        self.directory = directory
+
+    def key(self, source):
+        digest = hashlib.sha256(f"{AOT_VERSION}\0".encode() + importlib.util.MAGIC_NUMBER)
+        digest.update(source.encode())
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"aot_{key}.bin")
+
+    def load(self, key):
+        """
+        Returns the cached code object for key, or None if there is no usable entry.
+        """
+        try:
+            with open(self.path(key), 'rb') as file:
+                return marshal.load(file)
+        except (OSError, ValueError, EOFError, TypeError):
+            return None
+
+    def store(self, key, code):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # Written aside and renamed, so a reader never sees a half written entry
+            temporary = f"{self.path(key)}.{os.getpid()}"
+            with open(temporary, 'wb') as file:
+                marshal.dump(code, file)
+            os.replace(temporary, self.path(key))
+        except OSError:
+            pass    # A read-only install just compiles every time
+
+
+def compile_program(program, cache_dir=DEFAULT_CODE_CACHE):
+    """
+    Returns the run function of program, loaded from the cache when the same
+    code was compiled before.
+    """
+    source = translate(program)
+    cache = CodeCache(cache_dir)
+    key = cache.key(source)
+    code = cache.load(key)
+    if code is None:
+        code = compile(source, "<rat25s>", "exec")
+        cache.store(key, code)
+    namespace = {"MachineError": MachineError}
+    exec(code, namespace)
+    return namespace["run"]
+
+
+class CompiledMachine:
+    """
+    Runs a Program translated to Python, with the same streams and memory as
+    a VirtualMachine. memory is updated when the program finishes.
+    """
+    def __init__(self, program, input_stream=None, output_stream=None, cache_dir=DEFAULT_CODE_CACHE):
+        if not isinstance(program, Program):
+            program = Program.from_generator(program)
+        self.program = program
+        self.function = compile_program(program, cache_dir)
+        self.input_stream = input_stream if input_stream is not None else ListInput([])
+        self.output_stream = output_stream if output_stream is not None else ListOutput()
+        self.memory = [0] * program.memory_size
+
+    def value(self, address):
+        """
+        Returns what the memory cell at address holds.
+        """
+        return self.memory[address - MEMORY_BASE]
+
+    def run(self):
+        """
+        Runs the program. Raises MachineError like VirtualMachine.run.
+        """
+        self.memory = self.function(self.memory, self.input_stream.read_batch, self.output_stream.write_batch)
@@ -1,18 +1,81 @@
+from code_generator.instruction_buffer import (
+    InstructionBuffer, PUSHI, PUSHM, POPM, SOUT, SIN, A, S, M, D,
+    GRT, LES, EQU, NEQ, GEQ, LEQ, JMP0, JMP, LABEL, JUMPS, evaluate
+)
+from code_generator.peephole import optimize
+
+
 class AssemblyGenerator:
-    def __init__(self, symbol_table):
+    """
+    With fold_constants, pushed constants are held back instead of generated.
+    An operator on constants is computed right away, and only a value that is
+    still needed at run time turns into a single PUSHI. Within a basic block,
+    a variable last assigned a constant is read as that constant. Dividing by a
+    constant zero is left to run time and reported in diagnostics.
+    """
+    def __init__(self, symbol_table, fold_constants=False):
         self.symbol_table = symbol_table
-        self.instructions = [""] * 1000 # Array to hold assembly instructions
-        self.current_instruction = 1   # Current instruction index
+        self.instructions = InstructionBuffer()  # Opcode and operand arrays, grows as needed
         self.jump_stack = []    # Stack to keep track of jump instructions
         self.temp_label_count = 0   # Counter for temporary labels
+        self.fold_constants = fold_constants
+        self.constants = []     # Constants on top of the run time stack, not generated yet
+        self.known = {}         # Address -> constant it holds, within the current basic block
+        self.diagnostics = []   # Compile time warnings
+
+    @property
+    def current_instruction(self):
+        """
+        Address the next instruction goes to.
+        """
+        return len(self.instructions.opcodes)
 
     def generate_instruction(self, instruction):
         """
-        Generates an assembly instruction and adds it to the instructions list.
+        Generates an assembly instruction given as listing text and adds it to the instructions list.
+        """
+        self.flush_constants()
+        return self.instructions.add_text(instruction)
+
+    def emit(self, opcode, operand=0):
+        """
+        Adds an instruction by opcode (see code_generator.instruction_buffer) and returns its address.
+        """
+        if self.constants:
+            self.flush_constants()
+        if opcode in JUMPS or opcode == LABEL:
+            self.end_block()
+        return self.instructions.append(opcode, operand)
+
+    def flush_constants(self):
+        """
+        Generates the PUSHI of every constant held back, the next instruction needs them.
         """
-        self.instructions[self.current_instruction] = instruction
-        self.current_instruction += 1
-        return self.current_instruction - 1
+        for value in self.constants:
+            self.instructions.append(PUSHI, value)
+        self.constants.clear()
+
+    def end_block(self):
+        """
+        A jump or label ends the basic block, what variables hold is no longer known.
+        """
+        self.known.clear()
+
+    def emit_operator(self, opcode):
+        """
+        Generates a binary operator, or computes it when both operands are constants.
+        """
+        if not self.fold_constants:
+            return self.emit(opcode)
+        constants = self.constants
+        if opcode == D and constants and int(constants[-1]) == 0:
+            self.diagnostics.append(f"Division by constant zero at instruction {self.current_instruction + len(constants)}")
+            return self.emit(opcode)
+        if len(constants) < 2:
+            return self.emit(opcode)
+        right = int(constants.pop())
+        constants[-1] = evaluate(opcode, int(constants[-1]), right)
+        return None
     
     def update_instruction(self, index, instruction):
         """
@@ -20,6 +83,23 @@ class AssemblyGenerator:
         """
         self.instructions[index] = instruction
 
+    def replace_instructions(self, start, end, other, offset=0):
+        """
+        Replaces the instructions from start up to end with every instruction of
+        the AssemblyGenerator other, moving their jump targets by offset. Every
+        instruction after end moves along with the difference in length, and so
+        does every jump target in them.
+        """
+        self.instructions.replace(start, end, other.instructions, offset)
+
+    def optimize(self):
+        """
+        Runs the peephole optimizer over the finished code (see code_generator.peephole).
+        Returns the number of instructions it removed.
+        """
+        self.instructions, removed = optimize(self.instructions)
+        return removed
+
     def get_next_instruction(self): 
         """
         Returns the next instruction index.
@@ -33,7 +113,7 @@ class AssemblyGenerator:
         print("Generated Assembly Code:")
         print("=======================================")
         for i in range(1, self.current_instruction):
-            print(f"{i} {self.instructions[i]}")
+            print(f"{i} {self.instructions.format(i)}")
 
     #=========================
     # ASSEMBLY INSTRUCTIONS
@@ -42,92 +122,103 @@ class AssemblyGenerator:
     def gen_pushi(self, value):
         """
         I1. Generates a push immediate instruction.
+        Held back as a constant when folding, so None is returned.
         """
-        return self.generate_instruction(f"PUSHI     {value}")
+        if self.fold_constants:
+            self.constants.append(value)
+            return None
+        return self.emit(PUSHI, value)
     
     def gen_pushm(self, address):
         """
         I2. Generates a push memory instruction.
         """
-        return self.generate_instruction(f"PUSHM     {address}")
+        if self.fold_constants and address in self.known:
+            return self.gen_pushi(self.known[address])
+        return self.emit(PUSHM, address)
     
     def gen_popm(self, address):
         """
         I3. Generates a pop memory instruction.
         """
-        return self.generate_instruction(f"POPM      {address}")
+        if self.fold_constants:
+            if self.constants:
+                self.known[address] = self.constants[-1]
+            else:
+                self.known.pop(address, None)
+        return self.emit(POPM, address)
     
     def gen_stdout(self):
         """
         I4. Generates a standard out instruction.
         """
-        return self.generate_instruction("SOUT")
+        return self.emit(SOUT)
     
     def gen_stdin(self):
         """
         I5. Generates a standard in instruction.
         """
-        return self.generate_instruction("SIN")
+        return self.emit(SIN)
         
     def gen_add(self):
         """
         I6. Generates an add instruction.
         """
-        return self.generate_instruction("A")
+        return self.emit_operator(A)
     
     def gen_sub(self):
         """
         I7. Generates a subtract instruction.
         """
-        return self.generate_instruction("S")
+        return self.emit_operator(S)
     
     def gen_mul(self):
         """
         I8. Generates a multiply instruction.
         """
-        return self.generate_instruction("M")
+        return self.emit_operator(M)
     
     def gen_div(self):
         """
         I9. Generates a divide instruction.
         """
-        return self.generate_instruction("D")
+        return self.emit_operator(D)
     
     def gen_greater(self):
         """
         I10. Generates a greater than instruction.
         """
-        return self.generate_instruction("GRT")
+        return self.emit_operator(GRT)
     
     def gen_less(self):
         """
         I11. Generates a less than instruction.
         """
-        return self.generate_instruction("LES")
+        return self.emit_operator(LES)
 
     def gen_equal(self):
         """
         I12. Generates an equal to instruction.
         """
-        return self.generate_instruction("EQU")
+        return self.emit_operator(EQU)
     
     def gen_not_equal(self):
         """
         I13. Generates a not equal to instruction.
         """
-        return self.generate_instruction("NEQ")
+        return self.emit_operator(NEQ)
     
     def gen_greater_equal(self):
         """
         I14. Generates a greater than or equal to instruction.
         """
-        return self.generate_instruction("GEQ")
+        return self.emit_operator(GEQ)
     
     def gen_less_equal(self):
         """
         I15. Generates a less than or equal to instruction.
         """
-        return self.generate_instruction("LEQ")
+        return self.emit_operator(LEQ)
     
     def gen_jump_false(self, address=None):
         """
@@ -136,10 +227,10 @@ class AssemblyGenerator:
         """
         if address is None:
             # If no address is provided, use a placeholder that will be backpatched later
-            jmp_addr = self.generate_instruction("JMP0 0")
+            jmp_addr = self.emit(JMP0, 0)
             return jmp_addr
         else:
-            return self.generate_instruction(f"JMP0 {address}")
+            return self.emit(JMP0, address)
     
     def gen_jump(self, address=None):
         """
@@ -148,17 +239,17 @@ class AssemblyGenerator:
         """
         if address is None:
             # If no address is provided, use a placeholder that will be backpatched later
-            jmp_addr = self.generate_instruction("JMP 0")
+            jmp_addr = self.emit(JMP, 0)
             return jmp_addr
         else:
-            return self.generate_instruction(f"JMP {address}")
+            return self.emit(JMP, address)
     
     def gen_label(self):
         """
         I18. Generates a label instruction.
         LABEL - Empty Instruction; Provides the instruction location to jmp to.
         """
-        label_addr = self.generate_instruction("LABEL")
+        label_addr = self.emit(LABEL)
         return label_addr
     
     # Additional methods for code generation patterns
@@ -167,11 +258,10 @@ class AssemblyGenerator:
         """
         Backpatches a jump instruction with the target address.
         """
-        instruction = self.instructions[jump_addr]
-        if instruction.startswith("JMP0"):
-            self.instructions[jump_addr] = f"JMP0 {target_addr}"
-        elif instruction.startswith("JMP"):
-            self.instructions[jump_addr] = f"JMP {target_addr}"
+        if self.instructions.opcodes[jump_addr] in JUMPS:
+            self.instructions.set_operand(jump_addr, target_addr)
+            # Code is about to be generated at a jump target, which starts a basic block
+            self.end_block()
     
     def gen_assignment(self, identifier):
         """
@@ -234,8 +324,7 @@ class AssemblyGenerator:
         Returns the label address for the condition.
         """
         # Generate a label for the start of the loop
-        self.generate_instruction("LABEL")
-        return self.current_instruction - 1
+        return self.emit(LABEL)
     
     def while_condition(self):
         """
@@ -0,0 +1,193 @@
+"""
+Growable instruction store for the AssemblyGenerator.
+Each instruction is an opcode (one byte) and an integer operand (four bytes)
+in two parallel arrays, indexed by instruction address. Instructions are only
+formatted as listing text when they are read, so generating and backpatching
+code never builds or parses strings.
+"""
+from array import array
+
+# Opcodes, numbered like the instructions I1-I18 of the Rat25S machine
+(PUSHI, PUSHM, POPM, SOUT, SIN, A, S, M, D, GRT, LES, EQU, NEQ, GEQ, LEQ,
+ JMP0, JMP, LABEL) = range(1, 19)
+
+OPCODE_NAMES = [None, "PUSHI", "PUSHM", "POPM", "SOUT", "SIN", "A", "S", "M", "D",
+                "GRT", "LES", "EQU", "NEQ", "GEQ", "LEQ", "JMP0", "JMP", "LABEL"]
+OPCODES = {name: opcode for opcode, name in enumerate(OPCODE_NAMES) if name}
+
+# Listing text of every opcode, {} is the operand
+TEXT_FORMATS = [""] + OPCODE_NAMES[1:]
+TEXT_FORMATS[PUSHI] = "PUSHI     {}"
+TEXT_FORMATS[PUSHM] = "PUSHM     {}"
+TEXT_FORMATS[POPM] = "POPM      {}"
+TEXT_FORMATS[JMP0] = "JMP0 {}"
+TEXT_FORMATS[JMP] = "JMP {}"
+
+JUMPS = (JMP0, JMP)
+
+# Opcodes that pop two operands and push one result
+BINARY_OPCODES = (A, S, M, D, GRT, LES, EQU, NEQ, GEQ, LEQ)
+
+
+def evaluate(opcode, left, right):
+    """
+    Returns what a binary opcode pushes for two ints: relations give 1 or 0,
+    and division truncates toward zero. Raises ZeroDivisionError for D by 0.
+    """
+    if opcode == A:
+        return left + right
+    if opcode == S:
+        return left - right
+    if opcode == M:
+        return left * right
+    if opcode == D:
+        quotient = abs(left) // abs(right)
+        return quotient if (left < 0) == (right < 0) else -quotient
+    if opcode == GRT:
+        return int(left > right)
+    if opcode == LES:
+        return int(left < right)
+    if opcode == EQU:
+        return int(left == right)
+    if opcode == NEQ:
+        return int(left != right)
+    if opcode == GEQ:
+        return int(left >= right)
+    if opcode == LEQ:
+        return int(left <= right)
+    raise ValueError(f"Not a binary opcode: {opcode}")
+
+
+class InstructionBuffer:
+    """
+    Instructions by address, from 1 like the listing; address 0 holds nothing.
+    buffer[address] formats one instruction and buffer[first:last] a list of
+    them. An operand whose text int() does not give back, such as an integer
+    literal written with leading zeros or one too large for the operand column,
+    keeps its text in literals so the listing shows it as written.
+    """
+    def __init__(self):
+        self.opcodes = array('B', [0])
+        self.operands = array('i', [0])
+        self.literals = {}  # address -> operand text
+
+    def __len__(self):
+        """
+        Returns the number of instructions.
+        """
+        return len(self.opcodes) - 1
+
+    def append(self, opcode, operand=0):
+        """
+        Adds an instruction and returns its address.
+        """
+        address = len(self.opcodes)
+        self.opcodes.append(opcode)
+        self.operands.append(0)
+        if operand:
+            self.store(address, operand)
+        return address
+
+    def store(self, address, operand):
+        """
+        Writes the operand of the instruction at address, an int or its text.
+        """
+        value = int(operand)
+        try:
+            self.operands[address] = value
+        except OverflowError:
+            self.operands[address] = 0
+            self.literals[address] = str(operand)
+            return
+        if isinstance(operand, str) and operand != str(value):
+            self.literals[address] = operand
+
+    def add_text(self, text):
+        """
+        Adds an instruction given as listing text and returns its address.
+        """
+        opcode, operand = parse_instruction(text)
+        return self.append(opcode, operand)
+
+    def operand(self, address):
+        """
+        Returns the operand at address as an int, including one kept as text.
+        """
+        literal = self.literals.get(address)
+        return self.operands[address] if literal is None else int(literal)
+
+    def format(self, address):
+        """
+        Returns the listing text of the instruction at address.
+        """
+        opcode = self.opcodes[address]
+        literal = self.literals.get(address)
+        return TEXT_FORMATS[opcode].format(self.operands[address] if literal is None else literal)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.format(address) for address in range(*index.indices(len(self.opcodes)))]
+        if not 0 <= index < len(self.opcodes):
+            raise IndexError("instruction address out of range")
+        return self.format(index)
+
+    def __setitem__(self, address, text):
+        """
+        Replaces the instruction at address with one given as listing text.
+        """
+        if not 0 < address < len(self.opcodes):
+            raise IndexError("instruction address out of range")
+        opcode, operand = parse_instruction(text)
+        self.opcodes[address] = opcode
+        self.literals.pop(address, None)
+        self.store(address, operand)
+
+    def set_operand(self, address, operand):
+        """
+        Overwrites the int operand at address, as backpatching a jump does.
+        """
+        self.operands[address] = operand
+
+    def replace(self, start, end, other, offset=0):
+        """
+        Replaces the instructions from start up to end with every instruction of
+        other, moving the jump targets in them by offset. The instructions after
+        end move by the difference in length, and so do the jump targets in them.
+        """
+        delta = len(other) - (end - start)
+        opcodes, operands = self.opcodes, self.operands
+        # Literals are few, so they are moved one by one
+        literals = {address if address < end else address + delta: text
+                    for address, text in self.literals.items() if not start <= address < end}
+        literals.update((start + address - 1, text) for address, text in other.literals.items())
+
+        opcodes[start:end] = other.opcodes[1:]
+        operands[start:end] = other.operands[1:]
+        self.literals = literals
+        if offset:
+            self.shift_jumps(start, start + len(other), offset)
+        if delta:
+            self.shift_jumps(start + len(other), len(opcodes), delta)
+
+    def shift_jumps(self, first, last, delta):
+        """
+        Moves the targets of the jumps from address first up to last by delta.
+        """
+        opcodes, operands = self.opcodes, self.operands
+        for address in range(first, last):
+            if opcodes[address] in JUMPS:
+                operands[address] += delta
+
+    def nbytes(self):
+        return self.opcodes.itemsize * len(self.opcodes) + self.operands.itemsize * len(self.operands)
+
+
+def parse_instruction(text):
+    """
+    Returns (opcode, operand) of one instruction of listing text, 0 for no operand.
+    """
+    parts = text.split()
+    opcode = OPCODES.get(parts[0]) if parts else None
+    if opcode is None:
+        raise ValueError(f"Unknown instruction '{text}'")
+    return opcode, parts[1] if len(parts) > 1 else 0
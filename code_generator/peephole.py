@@ -0,0 +1,233 @@
+"""
+Peephole optimizer for the finished instruction list of an AssemblyGenerator.
+Short instruction sequences are matched against PATTERNS and rewritten,
+jumps that land on labels or other jumps go straight to where those lead,
+and labels nothing jumps to are dropped. Addresses are then renumbered and
+every JMP/JMP0 target is moved to the new address of its instruction.
+"""
+from code_generator.instruction_buffer import (
+    InstructionBuffer, PUSHI, PUSHM, POPM, M, JMP, LABEL, JUMPS
+)
+
+
+def negate_constant(operands):
+    """
+    PUSHI c, PUSHI -1, M: the unary minus of a literal is a literal.
+    """
+    if int(operands[1]) != -1:
+        return None
+    return [(PUSHI, -int(operands[0]))]
+
+
+def double_negation(operands):
+    """
+    PUSHI -1, M, PUSHI -1, M: two unary minuses cancel out.
+    """
+    if int(operands[0]) != -1 or int(operands[2]) != -1:
+        return None
+    return []
+
+
+def self_assignment(operands):
+    """
+    PUSHM x, POPM x: storing a cell's own value back changes nothing.
+    """
+    if operands[0] != operands[1]:
+        return None
+    return []
+
+
+def store_reload_store(operands):
+    """
+    POPM x, PUSHM x, POPM x: the reload is stored right back where it came from.
+    The machine has no duplicate instruction, so a store and reload of the same
+    cell can only be dropped where the reloaded value goes straight back.
+    """
+    if not operands[0] == operands[1] == operands[2]:
+        return None
+    return [(POPM, operands[0])]
+
+
+# (opcode sequence, rewrite): rewrite gets the operands of a matching sequence and
+# returns the instructions replacing it, or None when it does not apply
+PATTERNS = [
+    ((PUSHI, PUSHI, M), negate_constant),
+    ((PUSHI, M, PUSHI, M), double_negation),
+    ((PUSHM, POPM), self_assignment),
+    ((POPM, PUSHM, POPM), store_reload_store),
+]
+
+# Patterns by their first opcode, tried in table order
+PATTERNS_BY_OPCODE = {}
+for pattern in PATTERNS:
+    PATTERNS_BY_OPCODE.setdefault(pattern[0][0], []).append(pattern)
+
+
+def decode(buffer):
+    """
+    Returns the opcodes and operands of buffer as lists indexed by address.
+    Operands kept as text stay text, so unchanged instructions list the same.
+    """
+    opcodes = list(buffer.opcodes)
+    operands = list(buffer.operands)
+    for address, literal in buffer.literals.items():
+        operands[address] = literal
+    return opcodes, operands
+
+
+def jump_targets(opcodes, operands, removed):
+    """
+    Returns the addresses the jumps left in the program land on.
+    """
+    targets = set()
+    for address in range(1, len(opcodes)):
+        if not removed[address] and opcodes[address] in JUMPS:
+            target = operands[address]
+            while 0 < target < len(opcodes) and removed[target]:
+                target += 1
+            targets.add(target)
+    return targets
+
+
+def apply_patterns(opcodes, operands, removed):
+    """
+    Rewrites every sequence matching a pattern, marking the instructions it
+    drops in removed. A sequence is only rewritten when nothing jumps into it
+    past its first instruction. Returns True when anything changed.
+    """
+    targets = jump_targets(opcodes, operands, removed)
+    changed = False
+    address = 1
+    end = len(opcodes)
+    while address < end:
+        for sequence, rewrite in PATTERNS_BY_OPCODE.get(opcodes[address], ()):
+            window = live_window(opcodes, removed, address, len(sequence))
+            if window is None or any(opcodes[index] != opcode for index, opcode in zip(window, sequence)):
+                continue
+            if any(index in targets for index in window[1:]):
+                continue
+            replacement = rewrite([operands[index] for index in window])
+            if replacement is None:
+                continue
+            for index, instruction in zip(window, replacement):
+                opcodes[index], operands[index] = instruction
+            for index in window[len(replacement):]:
+                removed[index] = True
+            changed = True
+            break
+        else:
+            address += 1
+            continue
+        # Look again from the start of the rewrite, it may complete another pattern
+        while address < end and removed[address]:
+            address += 1
+    return changed
+
+
+def live_window(opcodes, removed, address, length):
+    """
+    Returns the addresses of length instructions from address on, skipping
+    removed ones, or None when the program ends first.
+    """
+    window = []
+    while address < len(opcodes) and len(window) < length:
+        if not removed[address]:
+            window.append(address)
+        address += 1
+    return window if len(window) == length else None
+
+
+def thread_jumps(opcodes, operands, removed):
+    """
+    Points every jump past the labels and unconditional jumps it lands on.
+    Returns True when any target changed.
+    """
+    end = len(opcodes)
+    changed = False
+    for address in range(1, end):
+        if removed[address] or opcodes[address] not in JUMPS:
+            continue
+        target = final_target(opcodes, operands, removed, operands[address])
+        if target != operands[address]:
+            operands[address] = target
+            changed = True
+    return changed
+
+
+def final_target(opcodes, operands, removed, target):
+    """
+    Follows target through removed instructions, labels and JMPs to the
+    instruction that actually runs next. A loop of jumps stays where it is.
+    """
+    seen = set()
+    while 0 < target < len(opcodes) and target not in seen:
+        seen.add(target)
+        if removed[target] or opcodes[target] == LABEL:
+            target += 1
+        elif opcodes[target] == JMP:
+            target = operands[target]
+        else:
+            break
+    return target
+
+
+def drop_dead_jumps_and_labels(opcodes, operands, removed):
+    """
+    Drops JMPs to the very next instruction and labels nothing jumps to.
+    Returns True when anything was dropped.
+    """
+    end = len(opcodes)
+    targets = jump_targets(opcodes, operands, removed)
+    changed = False
+    for address in range(1, end):
+        if removed[address]:
+            continue
+        if opcodes[address] == LABEL and address not in targets:
+            removed[address] = True
+            changed = True
+        elif opcodes[address] == JMP and final_target(opcodes, operands, removed, address + 1) == operands[address]:
+            removed[address] = True
+            changed = True
+    return changed
+
+
+def compact(opcodes, operands, removed):
+    """
+    Builds the InstructionBuffer of the instructions left, with jump targets
+    moved to the new addresses. A target whose instruction was dropped goes
+    to the next instruction that was kept.
+    """
+    new_address = [0] * (len(opcodes) + 1)
+    address = 1
+    for old in range(1, len(opcodes)):
+        new_address[old] = address
+        if not removed[old]:
+            address += 1
+    new_address[len(opcodes)] = address     # Just past the last instruction
+
+    buffer = InstructionBuffer()
+    for old in range(1, len(opcodes)):
+        if removed[old]:
+            continue
+        operand = operands[old]
+        if opcodes[old] in JUMPS and 0 < operand <= len(opcodes):
+            operand = new_address[operand]
+        buffer.append(opcodes[old], operand)
+    return buffer
+
+
+def optimize(buffer):
+    """
+    Runs the peephole passes over an InstructionBuffer until none applies.
+    Returns the optimized InstructionBuffer and the number of instructions removed.
+    """
+    opcodes, operands = decode(buffer)
+    removed = [False] * len(opcodes)
+    while True:
+        changed = apply_patterns(opcodes, operands, removed)
+        changed = thread_jumps(opcodes, operands, removed) or changed
+        changed = drop_dead_jumps_and_labels(opcodes, operands, removed) or changed
+        if not changed:
+            break
+    optimized = compact(opcodes, operands, removed)
+    return optimized, len(buffer) - len(optimized)
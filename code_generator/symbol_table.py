@@ -1,7 +1,11 @@
+# Address of the first variable, memory cells are numbered up from here
+MEMORY_BASE = 10000
+
+
 class SymbolTable:
     def __init__(self):
         self.table = {}
-        self.memory_address = 10000  # Starting address 
+        self.memory_address = MEMORY_BASE  # Starting address 
 
     def lookup(self, lexeme):
         """
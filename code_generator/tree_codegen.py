@@ -0,0 +1,108 @@
+from syntax_analyzer.syntax_tree import (
+    Program, Compound, Assign, If, While, Print, Scan,
+    Condition, BinaryOp, Negate, Identifier, Integer, Boolean
+)
+
+
+class TreeCodeGenerator:
+    """
+    Generates assembly from a syntax tree built by Parser(build_ast=True).
+    Calls the AssemblyGenerator in exactly the order the parser would while
+    parsing, so the listing is the same as generating code during the parse.
+    """
+    def __init__(self, symbol_table, assembly_gen):
+        self.symbol_table = symbol_table
+        self.assembly_gen = assembly_gen
+        self.handlers = {
+            Program: self.program,
+            Compound: self.compound,
+            Assign: self.assign,
+            If: self.if_statement,
+            While: self.while_statement,
+            Print: self.print_statement,
+            Scan: self.scan_statement,
+            Condition: self.condition,
+            BinaryOp: self.binary_op,
+            Negate: self.negate,
+            Identifier: self.identifier,
+            Integer: self.integer,
+            Boolean: self.boolean,
+        }
+
+    def generate(self, node):
+        """
+        Generates code for node and everything below it.
+        Handlers of nodes with children are generators that yield each child to
+        generate first; like Parser.run_rules, they run on an explicit stack
+        rather than by recursion. Leaf handlers generate their code and return None.
+        """
+        handlers = self.handlers
+        stack = [handlers[type(node)](node)]
+        while stack:
+            try:
+                child = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+            else:
+                nested = handlers[type(child)](child)
+                if nested is not None:
+                    stack.append(nested)
+
+    def program(self, node):
+        # Declarations were entered in the symbol table while parsing
+        yield from node.statements
+
+    def compound(self, node):
+        yield from node.statements
+
+    def assign(self, node):
+        yield node.expression
+        self.assembly_gen.gen_assignment(node.name)
+
+    def if_statement(self, node):
+        yield node.condition
+        jmp_addr = self.assembly_gen.start_if_statement()
+        yield node.then
+        if node.otherwise is not None:
+            jmp_addr = self.assembly_gen.else_statement(jmp_addr)
+            yield node.otherwise
+        self.assembly_gen.end_if_statement(jmp_addr)
+
+    def while_statement(self, node):
+        loop_start = self.assembly_gen.start_while_loop()
+        yield node.condition
+        condition_jmp = self.assembly_gen.while_condition()
+        yield node.body
+        self.assembly_gen.end_while_loop(loop_start, condition_jmp)
+
+    def print_statement(self, node):
+        yield node.expression
+        self.assembly_gen.gen_stdout()
+
+    def scan_statement(self, node):
+        for name in node.names:
+            self.assembly_gen.gen_scan(name)
+
+    def condition(self, node):
+        yield node.left
+        yield node.right
+        self.assembly_gen.gen_relational(node.operator)
+
+    def binary_op(self, node):
+        yield node.left
+        yield node.right
+        self.assembly_gen.gen_arithmetic(node.operator)
+
+    def negate(self, node):
+        yield node.operand
+        self.assembly_gen.gen_pushi(-1)
+        self.assembly_gen.gen_mul()
+
+    def identifier(self, node):
+        self.assembly_gen.gen_pushm(self.symbol_table.get_address(node.name))
+
+    def integer(self, node):
+        self.assembly_gen.gen_pushi(node.lexeme)
+
+    def boolean(self, node):
+        self.assembly_gen.gen_pushi(1 if node.value else 0)
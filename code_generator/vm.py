@@ -0,0 +1,324 @@
+"""
+Stack machine that runs the code of an AssemblyGenerator.
+The instructions are decoded once into a Program: opcodes and operands in two
+arrays, memory operands turned into cell indexes from MEMORY_BASE, and every
+jump target checked. Decoding also works out how deep the operand stack can
+get, so the stack is allocated once and the dispatch loop never checks it.
+SIN and SOUT go through input and output streams that move integers in
+batches, so the loop only calls out to them when a batch runs out or fills up.
+"""
+import sys
+from array import array
+
+from code_generator.instruction_buffer import (
+    PUSHI, PUSHM, POPM, SOUT, SIN, A, S, M, D, GRT, LES, EQU, NEQ, GEQ, LEQ,
+    JMP0, JMP, JUMPS, BINARY_OPCODES, OPCODE_NAMES
+)
+from code_generator.symbol_table import MEMORY_BASE
+
+# Operands every opcode pops, and the change in stack depth it makes
+STACK_NEEDS = [0] * len(OPCODE_NAMES)
+STACK_EFFECT = [0] * len(OPCODE_NAMES)
+STACK_EFFECT[PUSHI] = STACK_EFFECT[PUSHM] = STACK_EFFECT[SIN] = 1
+for opcode in (POPM, SOUT, JMP0):
+    STACK_NEEDS[opcode], STACK_EFFECT[opcode] = 1, -1
+for opcode in BINARY_OPCODES:
+    STACK_NEEDS[opcode], STACK_EFFECT[opcode] = 2, -1
+
+# Integers SOUT collects before they are handed to the output stream
+OUTPUT_BATCH = 4096
+
+
+class MachineError(Exception):
+    """
+    A program that cannot be decoded or that fails while it runs.
+    """
+    pass
+
+
+class ListInput:
+    """
+    SIN input from a list of integers, handed over in one batch.
+    """
+    def __init__(self, values):
+        self.values = list(values)
+
+    def read_batch(self):
+        """
+        Returns the next integers to read, an empty list when there are none left.
+        """
+        values, self.values = self.values, []
+        return values
+
+
+class TextInput:
+    """
+    SIN input from a text file of integers separated by whitespace, read a
+    batch of lines at a time.
+    """
+    def __init__(self, file, batch_size=65536):
+        self.file = file
+        self.batch_size = batch_size
+
+    def read_batch(self):
+        lines = self.file.readlines(self.batch_size)
+        try:
+            return [int(word) for line in lines for word in line.split()]
+        except ValueError as e:
+            raise MachineError(f"SIN input is not an integer: {e}")
+
+
+class ListOutput:
+    """
+    SOUT output collected in values.
+    """
+    def __init__(self):
+        self.values = []
+
+    def write_batch(self, values):
+        self.values.extend(values)
+
+
+class TextOutput:
+    """
+    SOUT output written to a text file, one integer per line.
+    """
+    def __init__(self, file):
+        self.file = file
+
+    def write_batch(self, values):
+        self.file.write("".join(f"{value}\n" for value in values))
+
+
+class Program:
+    """
+    Decoded instructions, by address from 1 like the listing. PUSHM and POPM
+    operands are cell indexes: the address minus MEMORY_BASE. memory_size is
+    the number of cells, depths the stack depth before every instruction (see
+    stack_depths) and stack_size the deepest the operand stack gets.
+    """
+    def __init__(self, buffer, memory_size=0):
+        count = len(buffer)
+        self.opcodes = array('B', buffer.opcodes)
+        self.operands = array('q', [0] * (count + 1))
+        for address in range(1, count + 1):
+            opcode = self.opcodes[address]
+            operand = buffer.operand(address)
+            if opcode in (PUSHM, POPM):
+                operand -= MEMORY_BASE
+                if operand < 0:
+                    raise MachineError(f"Memory address {operand + MEMORY_BASE} below {MEMORY_BASE} at instruction {address}")
+                memory_size = max(memory_size, operand + 1)
+            elif opcode in JUMPS and not 1 <= operand <= count + 1:
+                raise MachineError(f"Jump to {operand} outside the program at instruction {address}")
+            try:
+                self.operands[address] = operand
+            except OverflowError:
+                raise MachineError(f"Integer {operand} too large for the machine at instruction {address}")
+        self.memory_size = memory_size
+        self.depths = stack_depths(self.opcodes, self.operands)
+        # Every depth the stack reaches is the depth before some instruction, or the one it ends with
+        self.stack_size = max(depth for depth in self.depths if depth is not None)
+
+    @classmethod
+    def from_generator(cls, assembly_gen):
+        """
+        Decodes the code of an AssemblyGenerator, with a cell for every variable in its symbol table.
+        """
+        return cls(assembly_gen.instructions, assembly_gen.symbol_table.memory_address - MEMORY_BASE)
+
+    def __len__(self):
+        return len(self.opcodes) - 1
+
+
+def stack_depths(opcodes, operands):
+    """
+    Follows every path through the code and returns, by address, how deep the
+    operand stack is before each instruction; None where nothing leads. The
+    entry past the last instruction is the depth the program ends with. Code
+    the generator produces leaves the stack equally deep whichever way an
+    instruction is reached; code that does not, or that pops an empty stack,
+    raises MachineError.
+    """
+    end = len(opcodes)
+    depths = [None] * (end + 1)
+    depths[1] = 0
+    pending = [1]
+    while pending:
+        address = pending.pop()
+        depth = depths[address]
+        while address < end:
+            opcode = opcodes[address]
+            if depth < STACK_NEEDS[opcode]:
+                raise MachineError(f"{OPCODE_NAMES[opcode]} on a stack of {depth} at instruction {address}")
+            depth += STACK_EFFECT[opcode]
+            if opcode in JUMPS:
+                target = operands[address]
+                if depths[target] is None:
+                    depths[target] = depth
+                    pending.append(target)
+                elif depths[target] != depth:
+                    raise MachineError(f"Stack depth differs at instruction {target}")
+                if opcode == JMP:
+                    break
+            address += 1
+            if depths[address] is None:
+                depths[address] = depth
+            elif depths[address] != depth:
+                raise MachineError(f"Stack depth differs at instruction {address}")
+            else:
+                break   # Already followed from here
+    return depths
+
+
+class VirtualMachine:
+    """
+    Runs a Program. memory holds the cells, memory[0] is address MEMORY_BASE,
+    and every cell starts at 0. SIN reads from input_stream and SOUT writes to
+    output_stream, either of which is any object with read_batch() or
+    write_batch(values) like the stream classes above. Arithmetic is on Python
+    integers, and division truncates toward zero like instruction_buffer.evaluate.
+    """
+    def __init__(self, program, input_stream=None, output_stream=None):
+        if not isinstance(program, Program):
+            program = Program.from_generator(program)
+        self.program = program
+        self.input_stream = input_stream if input_stream is not None else ListInput([])
+        self.output_stream = output_stream if output_stream is not None else ListOutput()
+        self.memory = [0] * program.memory_size
+        self.executed = 0   # Instructions run by the last run()
+
+    def value(self, address):
+        """
+        Returns what the memory cell at address holds.
+        """
+        return self.memory[address - MEMORY_BASE]
+
+    def run(self, limit=None):
+        """
+        Runs the program from instruction 1 until it goes past its last
+        instruction. Raises MachineError when it divides by zero, reads past the
+        end of the input or, with limit, runs more than limit instructions; a
+        program over the limit reads and writes nothing past it.
+        Returns the number of instructions run.
+        """
+        program = self.program
+        # Lists index faster than arrays, which box every item they return
+        opcodes = program.opcodes.tolist()
+        operands = program.operands.tolist()
+        end = len(opcodes)
+        memory = self.memory
+        stack = [0] * (program.stack_size + 1)
+        sp = 0      # Stack holds stack[0:sp]
+        read_batch = self.input_stream.read_batch
+        inputs = []
+        next_input = 0
+        write_batch = self.output_stream.write_batch
+        outputs = []
+        limit = sys.maxsize if limit is None else limit
+
+        # Instructions are counted a straight run at a time: executed grows by
+        # the length of the run each time a jump is taken, from start to pc.
+        # The limit is checked there, before SIN and SOUT, and at the end
+        executed = 0
+        start = pc = 1
+        try:
+            while pc < end:
+                opcode = opcodes[pc]
+                if opcode == PUSHM:
+                    stack[sp] = memory[operands[pc]]
+                    sp += 1
+                elif opcode == PUSHI:
+                    stack[sp] = operands[pc]
+                    sp += 1
+                elif opcode == POPM:
+                    sp -= 1
+                    memory[operands[pc]] = stack[sp]
+                elif opcode == JMP0:
+                    sp -= 1
+                    if stack[sp] == 0:
+                        executed += pc + 1 - start
+                        if executed > limit:
+                            raise MachineError(f"Stopped at the limit of {limit} instructions")
+                        start = pc = operands[pc]
+                        continue
+                elif opcode == JMP:
+                    executed += pc + 1 - start
+                    if executed > limit:
+                        raise MachineError(f"Stopped at the limit of {limit} instructions")
+                    start = pc = operands[pc]
+                    continue
+                elif opcode == A:
+                    sp -= 1
+                    stack[sp - 1] += stack[sp]
+                elif opcode == S:
+                    sp -= 1
+                    stack[sp - 1] -= stack[sp]
+                elif opcode == LES:
+                    sp -= 1
+                    stack[sp - 1] = 1 if stack[sp - 1] < stack[sp] else 0
+                elif opcode == GRT:
+                    sp -= 1
+                    stack[sp - 1] = 1 if stack[sp - 1] > stack[sp] else 0
+                elif opcode == LEQ:
+                    sp -= 1
+                    stack[sp - 1] = 1 if stack[sp - 1] <= stack[sp] else 0
+                elif opcode == GEQ:
+                    sp -= 1
+                    stack[sp - 1] = 1 if stack[sp - 1] >= stack[sp] else 0
+                elif opcode == EQU:
+                    sp -= 1
+                    stack[sp - 1] = 1 if stack[sp - 1] == stack[sp] else 0
+                elif opcode == NEQ:
+                    sp -= 1
+                    stack[sp - 1] = 1 if stack[sp - 1] != stack[sp] else 0
+                elif opcode == M:
+                    sp -= 1
+                    stack[sp - 1] *= stack[sp]
+                elif opcode == D:
+                    sp -= 1
+                    right = stack[sp]
+                    if right == 0:
+                        raise MachineError(f"Division by zero at instruction {pc}")
+                    left = stack[sp - 1]
+                    quotient = abs(left) // abs(right)
+                    stack[sp - 1] = quotient if (left < 0) == (right < 0) else -quotient
+                elif opcode == SOUT:
+                    # Nothing past the limit is written, even on a run without jumps
+                    if executed + pc + 1 - start > limit:
+                        raise MachineError(f"Stopped at the limit of {limit} instructions")
+                    sp -= 1
+                    outputs.append(stack[sp])
+                    if len(outputs) >= OUTPUT_BATCH:
+                        write_batch(outputs)
+                        outputs = []
+                elif opcode == SIN:
+                    if executed + pc + 1 - start > limit:
+                        raise MachineError(f"Stopped at the limit of {limit} instructions")
+                    if next_input == len(inputs):
+                        inputs = read_batch()
+                        next_input = 0
+                        if not inputs:
+                            raise MachineError(f"SIN with no input left at instruction {pc}")
+                    stack[sp] = inputs[next_input]
+                    next_input += 1
+                    sp += 1
+                pc += 1     # LABEL does nothing
+            executed += pc - start
+            if executed > limit:
+                raise MachineError(f"Stopped at the limit of {limit} instructions")
+        finally:
+            if outputs:
+                write_batch(outputs)
+        self.executed = executed
+        return executed
+
+
+def run_program(assembly_gen, inputs=(), limit=None):
+    """
+    Runs the code of an AssemblyGenerator with inputs for SIN.
+    Returns the list of integers it wrote with SOUT.
+    """
+    output = ListOutput()
+    VirtualMachine(assembly_gen, ListInput(inputs), output).run(limit)
+    return output.values
@@ -0,0 +1,159 @@
+import re
+
+from .token import Token
+from .line_index import LineIndex
+from .lexical_analyzer import Lexer
+from .scanner import WHITESPACE_CHARS, SCANNER_OPERATORS
+from .constants import TOKEN_KEYWORD, TOKEN_IDENTIFIER, TOKEN_INTEGER, TOKEN_REAL, TOKEN_OPERATOR, TOKEN_SEPARATOR
+from .constants import KEYWORDS, SEPARATORS, ENGINE_FSM, TRACE_FULL
+
+# Character classes for the 256-entry lookup table
+OTHER, WHITESPACE, LETTER, DIGIT, OPERATOR, SEPARATOR, DOLLAR = range(7)
+
+CHAR_CLASSES = bytearray(256)
+for char in WHITESPACE_CHARS:
+    CHAR_CLASSES[ord(char)] = WHITESPACE
+for code in range(ord('a'), ord('z') + 1):
+    CHAR_CLASSES[code] = LETTER
+    CHAR_CLASSES[code - 32] = LETTER
+for code in range(ord('0'), ord('9') + 1):
+    CHAR_CLASSES[code] = DIGIT
+for symbol in SCANNER_OPERATORS:
+    CHAR_CLASSES[ord(symbol[0])] = OPERATOR
+for symbol in SEPARATORS:
+    if len(symbol) == 1:
+        CHAR_CLASSES[ord(symbol)] = SEPARATOR
+CHAR_CLASSES[ord('$')] = DOLLAR
+CHAR_CLASSES = bytes(CHAR_CLASSES)
+
+EQUALS = ord('=')
+DOT = ord('.')
+STAR = ord('*')
+LEFT_BRACKET = ord('[')
+
+# Lexemes that never need decoding, keyed by their raw bytes
+KEYWORD_BYTES = {keyword.encode(): keyword for keyword in KEYWORDS}
+SYMBOL_BYTES = {symbol.encode(): symbol for symbol in SCANNER_OPERATORS + SEPARATORS}
+
+WHITESPACE_RUN = re.compile(f"[{re.escape(WHITESPACE_CHARS)}]+".encode())
+WORD = re.compile(rb"[A-Za-z][A-Za-z0-9]*")
+NUMBER = re.compile(rb"[0-9]+(?:\.[0-9]*)?")
+NON_ASCII = re.compile(rb"[\x80-\xff]")
+
+
+def bytes_lexer(data, engine=ENGINE_FSM, trace=TRACE_FULL, trace_sink=None):
+    """
+    Returns a BytesLexer over the raw bytes of a source, or a str Lexer using
+    engine, trace and trace_sink when a non-ASCII byte shows up.
+    """
+    if NON_ASCII.search(data):
+        return Lexer(str(data, 'utf-8'), engine, trace=trace, trace_sink=trace_sink)
+    return BytesLexer(data)
+
+
+class BytesLexer:
+    """
+    Lexer for ASCII sources working on a memoryview of the raw file bytes.
+    The first byte of every token is classified through CHAR_CLASSES and only
+    identifier and number lexemes are ever decoded. Line and column are not
+    tracked while scanning, they are looked up on demand.
+    """
+    def __init__(self, data):
+        # data must be read-only (bytes or a read-only mmap) so its slices can be hashed
+        self.text = data
+        self.view = memoryview(data)
+        self.pos = 0
+        self.scanner = None
+        self.line_index = None
+        self.names = {}     # Raw identifier/number bytes -> decoded lexeme
+
+    def position(self):
+        """
+        Returns the (line, column) of the current position.
+        """
+        if self.line_index is None:
+            self.line_index = LineIndex(self.text)
+        return self.line_index.position(self.pos)
+
+    @property
+    def line(self):
+        return self.position()[0]
+
+    @property
+    def column(self):
+        return self.position()[1]
+
+    def decode(self, start, end):
+        raw = self.view[start:end]
+        lexeme = self.names.get(raw)
+        if lexeme is None:
+            lexeme = self.names[bytes(raw)] = str(raw, 'ascii')
+        return lexeme
+
+    def get_next_token(self):
+        view = self.view
+        size = len(view)
+        pos = self.pos
+        while pos < size:
+            char_class = CHAR_CLASSES[view[pos]]
+
+            if char_class == WHITESPACE:
+                pos = WHITESPACE_RUN.match(view, pos).end()
+                continue
+
+            if char_class == LETTER:
+                end = WORD.match(view, pos).end()
+                self.pos = end
+                keyword = KEYWORD_BYTES.get(view[pos:end])
+                if keyword is not None:
+                    return Token(TOKEN_KEYWORD, keyword)
+                return Token(TOKEN_IDENTIFIER, self.decode(pos, end))
+
+            if char_class == DIGIT:
+                end = NUMBER.match(view, pos).end()
+                self.pos = end
+                if view[end - 1] == DOT:
+                    raise SyntaxError(f"Invalid real number format at line {self.line}, column {self.column}")
+                lexeme = self.decode(pos, end)
+                return Token(TOKEN_REAL if '.' in lexeme else TOKEN_INTEGER, lexeme)
+
+            if char_class == OPERATOR:
+                end = pos + 2 if pos + 1 < size and view[pos + 1] == EQUALS and view[pos:pos + 2] in SYMBOL_BYTES else pos + 1
+                self.pos = end
+                return Token(TOKEN_OPERATOR, SYMBOL_BYTES[view[pos:end]])
+
+            if char_class == SEPARATOR:
+                if view[pos] == LEFT_BRACKET and pos + 1 < size and view[pos + 1] == STAR:
+                    # The closing "*]" may reuse the '*' of the opener, as in Lexer.skip_comment
+                    close = self.text.find(b"*]", pos + 1)
+                    if close < 0:
+                        self.pos = pos
+                        raise SyntaxError(f"Unterminated comment starting at line {self.line}, column {self.column}")
+                    pos = close + 2
+                    continue
+                self.pos = pos + 1
+                return Token(TOKEN_SEPARATOR, SYMBOL_BYTES[view[pos:pos + 1]])
+
+            if char_class == DOLLAR and view[pos:pos + 2] == b"$$":
+                self.pos = pos + 2
+                return Token(TOKEN_SEPARATOR, "$$")
+
+            self.pos = pos
+            raise SyntaxError(f"Invalid Character '{chr(view[pos])}' at line {self.line}, column {self.column}")
+
+        self.pos = pos
+        return None
+
+    def tokenize(self):
+        tokens = []
+        while (token := self.get_next_token()) is not None:
+            tokens.append(token)
+        return tokens
+
+
+def lex_file_bytes(input_file, engine=ENGINE_FSM, trace=TRACE_FULL, trace_sink=None):
+    """
+    Reads input_file as raw bytes and returns the lexer for it (see bytes_lexer).
+    """
+    with open(input_file, 'rb') as file:
+        return bytes_lexer(file.read(), engine, trace, trace_sink)
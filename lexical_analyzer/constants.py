@@ -51,3 +51,40 @@ SEPARATORS = [
     ".",
     "$$"
 ]
+
+
+# Scanner engines selectable through Lexer(text, engine=...)
+ENGINE_FSM = "fsm"
+ENGINE_PATTERN = "pattern"
+ENGINE_BYTES = "bytes"  # Raw file bytes, see byte_lexer.bytes_lexer
+
+# Small integer codes for the token types, used by compact token storage
+TOKEN_TYPES = [
+    TOKEN_KEYWORD,
+    TOKEN_IDENTIFIER,
+    TOKEN_INTEGER,
+    TOKEN_REAL,
+    TOKEN_OPERATOR,
+    TOKEN_SEPARATOR,
+]
+
+TOKEN_TYPE_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+
+# Bumped whenever the tokens produced for a source change, invalidating cached token streams
+LEXER_VERSION = 1
+
+# Trace levels, each one also traces everything the levels before it do
+TRACE_OFF = "off"
+TRACE_PRODUCTIONS = "productions"   # Productions applied by the parser
+TRACE_TOKENS = "tokens"             # Tokens matched by the parser
+TRACE_FULL = "full"                 # Lexer debug lines
+TRACE_LEVELS = [TRACE_OFF, TRACE_PRODUCTIONS, TRACE_TOKENS, TRACE_FULL]
+
+# Integer kind code of every token: one per token class for identifiers and
+# numbers, and one per keyword, operator and separator
+KIND_IDENTIFIER = 0
+KIND_INTEGER = 1
+KIND_REAL = 2
+TOKEN_KINDS = [TOKEN_IDENTIFIER, TOKEN_INTEGER, TOKEN_REAL] + KEYWORDS + OPERATORS + SEPARATORS
+CLASS_KINDS = {TOKEN_IDENTIFIER: KIND_IDENTIFIER, TOKEN_INTEGER: KIND_INTEGER, TOKEN_REAL: KIND_REAL}
+KIND_CODES = {lexeme: kind for kind, lexeme in enumerate(TOKEN_KINDS) if kind > KIND_REAL}
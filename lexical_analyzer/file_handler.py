@@ -1,9 +1,17 @@
 from .lexical_analyzer import Lexer
+from .token_buffer import TokenBuffer
+from .streaming import stream_file
+from .byte_lexer import lex_file_bytes
+from .token_cache import cached_token_buffer
+from .constants import ENGINE_FSM, ENGINE_BYTES
 
 class FileHandler: 
-    def __init__(self, input_file, output_file):
+    def __init__(self, input_file, output_file, engine=ENGINE_FSM, stream=False, cache_dir=None):
         self.input_file = input_file
         self.output_file = output_file
+        self.engine = engine
+        self.stream = stream  # Write tokens out as they are lexed, never holding the whole file
+        self.cache_dir = cache_dir  # Token stream cache, unchanged inputs are not lexed again
 
     def read_file(self):
         with open(self.input_file, 'r') as file:
@@ -15,12 +23,23 @@ class FileHandler:
                 file.write(f"{token}\n")
 
     def process(self):
-        input_code = self.read_file()
-        lexer = Lexer(input_code)
-        tokens = lexer.tokenize()
+        if self.stream:
+            self.write_output_file(stream_file(self.input_file))
+            return
+
+        if self.cache_dir:
+            self.write_output_file(cached_token_buffer(self.input_file, self.engine, self.cache_dir))
+            return
+
+        if self.engine == ENGINE_BYTES:
+            lexer = lex_file_bytes(self.input_file)
+        else:
+            input_code = self.read_file()
+            lexer = Lexer(input_code, self.engine)
+        tokens = TokenBuffer.from_lexer(lexer)
         self.write_output_file(tokens)
         
         
-def analyze_file(input_file, output_file):
-    file_handler = FileHandler(input_file, output_file)
+def analyze_file(input_file, output_file, engine=ENGINE_FSM, stream=False, cache_dir=None):
+    file_handler = FileHandler(input_file, output_file, engine, stream, cache_dir)
     file_handler.process()        
@@ -0,0 +1,406 @@
+from bisect import bisect_left
+
+from .lexical_analyzer import Lexer
+from .constants import ENGINE_PATTERN, TRACE_OFF
+
+# Tokens per block when the source is lexed from scratch. A block an edit grows
+# past twice this is split, one that shrinks below half of it joins the next
+BLOCK_TOKENS = 256
+# Characters past the edited text the first re-scan window holds, doubled until
+# the new tokens line up with the old ones inside it
+WINDOW = 256
+
+
+class FenwickTree:
+    """
+    Running sums over a list of counts, each updated and summed up to in O(log n).
+    """
+    def __init__(self, values):
+        self.tree = [0]
+        self.tree.extend(values)
+        size = len(self.tree)
+        for index in range(1, size):
+            parent = index + (index & -index)
+            if parent < size:
+                self.tree[parent] += self.tree[index]
+
+    def add(self, index, delta):
+        index += 1
+        size = len(self.tree)
+        while index < size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index):
+        """
+        Returns the sum of the first index counts.
+        """
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def find(self, value):
+        """
+        Returns the index of the count that takes the running sum past value,
+        the number of counts when none does.
+        """
+        index = 0
+        size = len(self.tree)
+        step = 1 << (size - 1).bit_length()
+        while step:
+            upper = index + step
+            if upper < size and self.tree[upper] <= value:
+                index = upper
+                value -= self.tree[upper]
+            step >>= 1
+        return index
+
+
+class Block:
+    """
+    A stretch of the source with the tokens in it, their start offsets in text
+    and the number of newlines in it.
+    Blocks are split at token starts, so every token lies inside a single block.
+    """
+    __slots__ = ("text", "tokens", "starts", "newlines")
+
+    def __init__(self, text, tokens, starts):
+        self.text = text
+        self.tokens = tokens
+        self.starts = starts
+        self.newlines = text.count('\n')
+
+
+def make_blocks(text, tokens, starts, largest=BLOCK_TOKENS):
+    """
+    Splits text, with its tokens starting at starts in it, into as few blocks
+    of about the same size as hold at most largest tokens each.
+    """
+    count = len(tokens)
+    parts = max(1, -(-count // largest))
+    size = -(-count // parts)
+    blocks = []
+    for part in range(parts):
+        low = part * size
+        high = min(count, low + size)
+        text_low = starts[low] if part else 0
+        text_high = starts[high] if high < count else len(text)
+        blocks.append(Block(text[text_low:text_high], tokens[low:high],
+                            [start - text_low for start in starts[low:high]] if text_low else starts[low:high]))
+    return blocks
+
+
+class TokenList:
+    """
+    The tokens of an IncrementalLexer, indexed like a list.
+    """
+    def __init__(self, lexer):
+        self.lexer = lexer
+
+    def __len__(self):
+        return self.lexer.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.lexer.token(i) for i in range(*index.indices(self.lexer.count))]
+        if index < 0:
+            index += self.lexer.count
+        if not 0 <= index < self.lexer.count:
+            raise IndexError("token index out of range")
+        return self.lexer.token(index)
+
+    def __iter__(self):
+        for block in self.lexer.blocks:
+            yield from block.tokens
+
+
+class IncrementalLexer:
+    """
+    Keeps the token stream of a source up to date as it is edited.
+    The source is held in blocks of a few hundred tokens, with running sums of
+    their lengths, token counts and newlines in Fenwick trees, so finding the
+    token at an offset or the line of an offset is O(log n) and an edit only
+    rewrites the blocks it touches. Each edit re-scans a window of the text from
+    the last token before it until the new tokens line up with the old ones again.
+    tokens can be indexed and iterated like a list, and text joins the blocks
+    back into the whole source. The FSM engine writes its debug lines at the
+    given trace level, so none by default.
+    After each edit, changed is (first, last, count): tokens[first:last] of the
+    old list were replaced by count new tokens, or None when everything was re-lexed.
+    """
+    def __init__(self, text, engine=ENGINE_PATTERN, trace=TRACE_OFF):
+        self.engine = engine
+        self.trace = trace
+        self.tokens = TokenList(self)
+        self.reset(text)
+        self.relex()
+
+    @property
+    def text(self):
+        return "".join(block.text for block in self.blocks)
+
+    def reset(self, text):
+        """
+        Holds text as a single block with no tokens, left to be re-lexed.
+        """
+        self.set_blocks([Block(text, [], [])])
+        self.valid = False
+        self.changed = None
+
+    def set_blocks(self, blocks):
+        self.blocks = blocks
+        self.lengths = FenwickTree(len(block.text) for block in blocks)
+        self.counts = FenwickTree(len(block.tokens) for block in blocks)
+        self.newlines = FenwickTree(block.newlines for block in blocks)
+        self.length = sum(len(block.text) for block in blocks)
+        self.count = sum(len(block.tokens) for block in blocks)
+        self.cached = (0, 0, None)
+
+    def relex(self):
+        """
+        Lexes the whole source from scratch.
+        """
+        text = self.text
+        self.reset(text)
+        tokens = []
+        starts = []
+        lexer = Lexer(text, self.engine, trace=self.trace)
+        while (token := lexer.get_next_token()) is not None:
+            tokens.append(token)
+            starts.append(lexer.pos - len(token.lexeme))
+        self.set_blocks(make_blocks(text, tokens, starts))
+        self.valid = True
+
+    def block_at(self, offset):
+        """
+        Returns the index of the block holding offset and the offset it starts at.
+        """
+        index = min(self.lengths.find(offset), len(self.blocks) - 1)
+        return index, self.lengths.prefix(index)
+
+    def token(self, index):
+        """
+        Returns the token at index. The block last read from is remembered, so
+        reading tokens in order only looks blocks up once.
+        """
+        low, high, tokens = self.cached
+        if not low <= index < high:
+            block = self.counts.find(index)
+            low = self.counts.prefix(block)
+            tokens = self.blocks[block].tokens
+            high = low + len(tokens)
+            self.cached = (low, high, tokens)
+        return tokens[index - low]
+
+    def start(self, index):
+        """
+        Returns the start offset of the token at index.
+        """
+        block = self.counts.find(index)
+        return self.lengths.prefix(block) + self.blocks[block].starts[index - self.counts.prefix(block)]
+
+    def end(self, index):
+        return self.start(index) + len(self.token(index).lexeme)
+
+    def first_token_starting_at(self, offset):
+        """
+        Returns the index of the first token whose start is at or after offset.
+        """
+        block, base = self.block_at(offset)
+        return self.counts.prefix(block) + bisect_left(self.blocks[block].starts, offset - base)
+
+    def first_token_ending_at(self, offset):
+        """
+        Returns the index of the first token whose end is at or after offset.
+        """
+        index = self.first_token_starting_at(offset)
+        # Tokens never overlap, so only the one before can reach offset
+        if index and self.end(index - 1) >= offset:
+            index -= 1
+        return index
+
+    def position(self, offset):
+        """
+        Returns the (line, column) of offset, both starting at 1 like the Lexer's.
+        """
+        block, base = self.block_at(offset)
+        text = self.blocks[block].text
+        newlines = self.newlines.prefix(block) + text.count('\n', 0, offset - base)
+        line_start = text.rfind('\n', 0, offset - base)
+        if line_start >= 0:
+            line_start += base + 1
+        elif newlines:
+            # The line starts after the last newline of the closest block before with one
+            block = self.newlines.find(newlines - 1)
+            line_start = self.lengths.prefix(block) + self.blocks[block].text.rfind('\n') + 1
+        else:
+            line_start = 0
+        return newlines + 1, offset - line_start + 1
+
+    def slice(self, start, end):
+        """
+        Returns text[start:end] from the blocks it spans.
+        """
+        end = min(end, self.length)
+        if start >= end:
+            return ""
+        block, base = self.block_at(start)
+        pieces = []
+        while base < end:
+            text = self.blocks[block].text
+            pieces.append(text[max(start - base, 0):end - base])
+            base += len(text)
+            block += 1
+        return "".join(pieces)
+
+    def starts_from(self, index):
+        """
+        Yields the start offsets of the tokens from index on.
+        """
+        block = self.counts.find(index)
+        first = index - self.counts.prefix(block)
+        base = self.lengths.prefix(block)
+        for block in self.blocks[block:]:
+            for start in block.starts[first:]:
+                yield base + start
+            base += len(block.text)
+            first = 0
+
+    def apply_edits(self, edits):
+        """
+        Applies edits in order and returns the updated tokens.
+        Each edit is (offset, removed length, inserted text), with offset taken
+        in the text as left by the edits before it.
+        """
+        for offset, removed, inserted in edits:
+            self.apply_edit(offset, removed, inserted)
+        return self.tokens
+
+    def apply_edit(self, offset, removed, inserted):
+        if offset < 0 or offset + removed > self.length:
+            raise ValueError(f"Edit ({offset}, {removed}) is outside the source")
+
+        if not self.valid:
+            text = self.text
+            self.reset("".join((text[:offset], inserted, text[offset + removed:])))
+            self.relex()
+            return self.tokens
+
+        # The last token ending before the edit never looked at the edited text
+        first = self.first_token_ending_at(offset)
+        restart = self.end(first - 1) if first else 0
+        # Old tokens past the edited text are where the new scan can sync up again
+        reusable = max(self.first_token_starting_at(offset + removed), first)
+
+        try:
+            new_tokens, new_starts, last = self.rescan(restart, offset, removed, inserted, reusable)
+        except SyntaxError:
+            # Left for a full re-lex, which also reports the error at its exact position
+            text = self.text
+            self.reset("".join((text[:offset], inserted, text[offset + removed:])))
+            raise
+
+        self.splice(first, last, new_tokens, new_starts, restart, offset, removed, inserted)
+        return self.tokens
+
+    def rescan(self, restart, offset, removed, inserted, reusable):
+        """
+        Scans the edited text from restart until a new token starts exactly where
+        an old token past the edit now starts. Returns the new tokens, their starts
+        and the index of the first old token kept.
+        """
+        new_length = self.length + len(inserted) - removed
+        size = offset - restart + len(inserted) + WINDOW
+        while True:
+            window = self.slice(restart, offset) + inserted
+            if len(window) < size:
+                window += self.slice(offset + removed, offset + removed + size - len(window))
+            else:
+                window = window[:size]
+            result = self.scan_window(window, restart, restart + len(window) == new_length,
+                                      reusable, len(inserted) - removed)
+            if result is not None:
+                return result
+            size *= 2
+
+    def scan_window(self, window, restart, complete, reusable, delta):
+        """
+        Scans window, the edited text from restart on, as rescan does. Returns None
+        when the scan needs text past the window, which is only an error or the
+        end of the input when complete.
+        """
+        lexer = Lexer(window, self.engine, trace=self.trace)
+        lexer.line, lexer.column = self.position(restart)
+        # A token that ends this close to the end of the window may go on past it
+        limit = len(window) - 2
+        new_tokens = []
+        new_starts = []
+        old = reusable
+        old_starts = self.starts_from(reusable)
+        old_start = next(old_starts, None)
+        try:
+            while (token := lexer.get_next_token()) is not None:
+                start = restart + lexer.pos - len(token.lexeme)
+                while old_start is not None and old_start + delta < start:
+                    old += 1
+                    old_start = next(old_starts, None)
+                if old_start is not None and old_start + delta == start:
+                    # Same position in an unchanged suffix, so every token from here on is unchanged
+                    return new_tokens, new_starts, old
+                if lexer.pos > limit and not complete:
+                    return None
+                new_tokens.append(token)
+                new_starts.append(start)
+        except SyntaxError:
+            if complete:
+                raise
+            return None
+        if not complete:
+            return None
+        return new_tokens, new_starts, self.count
+
+    def splice(self, first, last, new_tokens, new_starts, restart, offset, removed, inserted):
+        """
+        Replaces tokens[first:last] with the new tokens and the edited text in
+        the blocks they lie in, then splits those blocks again.
+        """
+        delta = len(inserted) - removed
+        old_end = self.start(last) if last < self.count else self.length
+        low, base = self.block_at(restart)
+        high = max(self.block_at(old_end - 1)[0], low) if old_end > restart else low
+        low_token = self.counts.prefix(low)
+        count = len(new_tokens) - (last - first)
+        if self.counts.prefix(high + 1) - low_token + count < BLOCK_TOKENS // 2 and high + 1 < len(self.blocks):
+            high += 1
+
+        old_blocks = self.blocks[low:high + 1]
+        text = "".join(block.text for block in old_blocks)
+        tokens = []
+        starts = []
+        block_base = 0
+        for block in old_blocks:
+            tokens.extend(block.tokens)
+            starts.extend(start + block_base for start in block.starts)
+            block_base += len(block.text)
+
+        text = "".join((text[:offset - base], inserted, text[offset + removed - base:]))
+        first -= low_token
+        last -= low_token
+        tokens[first:last] = new_tokens
+        starts[first:] = [start - base for start in new_starts] + [start + delta for start in starts[last:]]
+        new_blocks = make_blocks(text, tokens, starts, 2 * BLOCK_TOKENS)
+
+        self.blocks[low:high + 1] = new_blocks
+        if len(new_blocks) == len(old_blocks):
+            for index, (old_block, new_block) in enumerate(zip(old_blocks, new_blocks), low):
+                self.lengths.add(index, len(new_block.text) - len(old_block.text))
+                self.counts.add(index, len(new_block.tokens) - len(old_block.tokens))
+                self.newlines.add(index, new_block.newlines - old_block.newlines)
+            self.length += delta
+            self.count += count
+            self.cached = (0, 0, None)
+        else:
+            self.set_blocks(self.blocks)
+        self.changed = (first + low_token, last + low_token, len(new_tokens))
@@ -1,16 +1,44 @@
-from .token import Token
+import re
+
+from .token import Token, SpanToken
+from .line_index import LineIndex
 from .finite_state_machines import FiniteStateMachines
+from .scanner import PatternScanner
 from .constants import TOKEN_KEYWORD, TOKEN_IDENTIFIER, TOKEN_INTEGER, TOKEN_REAL, TOKEN_OPERATOR, TOKEN_SEPARATOR
 from .constants import KEYWORDS, OPERATORS, SEPARATORS
+from .constants import ENGINE_FSM, ENGINE_PATTERN, TRACE_LEVELS, TRACE_FULL
+from .trace import trace_level
+
+# \s matches exactly the characters str.isspace() accepts
+WHITESPACE_RUN = re.compile(r"\s*")
 
 class Lexer:
-    def __init__(self,text):
+    def __init__(self,text, engine=ENGINE_FSM, spans=False, trace=TRACE_FULL, trace_sink=None):
         self.text = text
         self.pos = 0
         self.line = 1
         self.column = 1
         self.current_char = self.text[self.pos] if self.text else None
 
+        if engine not in (ENGINE_FSM, ENGINE_PATTERN):
+            raise ValueError(f"Unknown lexer engine '{engine}'")
+
+        # The pattern engine is exact for ASCII sources, anything else stays on the FSMs
+        self.scanner = PatternScanner(self) if engine == ENGINE_PATTERN and text.isascii() else None
+
+        # In span mode tokens only keep offsets, line/column come from this index on demand
+        self.line_index = LineIndex(text) if spans else None
+
+        # Debug lines are only written by the FSM engine at the full trace level, to trace_sink or stdout
+        self.debug = trace_level(trace) >= TRACE_LEVELS.index(TRACE_FULL) and self.scanner is None
+        self.trace_sink = trace_sink
+
+    def trace(self, message):
+        if self.trace_sink is not None:
+            self.trace_sink.write(message)
+        else:
+            print(message)
+
     def advance(self):
         if self.current_char is not None:
             if self.current_char == '\n':
@@ -20,24 +48,60 @@ class Lexer:
             self.column += 1
             self.current_char = self.text[self.pos] if self.pos < len(self.text) else None
 
+    def jump_to(self, pos):
+        """
+        Moves forward to pos in one step, keeping line and column in sync with advance().
+        """
+        newlines = self.text.count('\n', self.pos, pos)
+        if newlines:
+            self.line += newlines
+            self.column = pos - self.text.rfind('\n', self.pos, pos)
+        else:
+            self.column += pos - self.pos
+        self.pos = pos
+        self.current_char = self.text[pos] if pos < len(self.text) else None
+
     def skip_whitespace(self):
-        while self.current_char is not None and self.current_char.isspace():
-            self.advance()
+        end = WHITESPACE_RUN.match(self.text, self.pos).end()
+        if end != self.pos:
+            self.jump_to(end)
             
     def skip_comment(self):
         if self.text[self.pos:self.pos+2] == "[*":
-            while self.current_char is not None:
-                self.advance()
-                if self.text[self.pos-1:self.pos+1] == "*]":
-                    self.advance()  # Move past the closing "]*"
-                    return
+            # The closing "*]" may reuse the '*' of the opener
+            close = self.text.find("*]", self.pos + 1)
+            if close < 0:
+                raise SyntaxError(f"Unterminated comment starting at line {self.line}, column {self.column}")
+            self.jump_to(close + 2)  # Move past the closing "*]"
 
-    def get_next_token(self):
-        self.skip_whitespace()
-        
-        if self.text[self.pos:self.pos+2] == "[*":
+    def skip_whitespace_and_comments(self):
+        # A loop rather than recursion, so any number of comments in a row is fine
+        while True:
+            self.skip_whitespace()
+            if self.text[self.pos:self.pos+2] != "[*":
+                return
             self.skip_comment()
-            return self.get_next_token()
+
+    def make_token(self, token_type, start, end):
+        """
+        Builds the token for text[start:end], a SpanToken when in span mode.
+        """
+        if self.line_index is not None:
+            return SpanToken(token_type, self.text, start, end, self.line_index)
+        return Token(token_type, self.text[start:end])
+
+    def get_next_token(self):
+        if self.scanner:
+            return self.scanner.next_token()
+
+        token = self.fsm_token()
+        if token is not None and self.line_index is not None:
+            # Every lexeme is an exact copy of the source it was read from
+            return self.make_token(token.token_type, self.pos - len(token.lexeme), self.pos)
+        return token
+
+    def fsm_token(self):
+        self.skip_whitespace_and_comments()
     
         if self.current_char is None:
             return None
@@ -66,12 +130,14 @@ class Lexer:
                     while self.current_char is not None and self.current_char.isdigit():
                         result += self.current_char
                         self.advance()
-                    print(f"Debug: Recognized real number '{result}'")
+                    if self.debug:
+                        self.trace(f"Debug: Recognized real number '{result}'")
                     return Token(TOKEN_REAL, result)
                 else:
                     raise SyntaxError(f"Invalid real number format at line {self.line}, column {self.column}")
         
-            print(f"Debug: Recognized integer '{result}'")
+            if self.debug:
+                self.trace(f"Debug: Recognized integer '{result}'")
             return Token(TOKEN_INTEGER, result)
 
         fsm = FiniteStateMachines(self)
@@ -80,7 +146,8 @@ class Lexer:
             if token:
                 return token
 
-        print(f"Debug: Unrecognized character '{self.current_char}' at line {self.line}, column {self.column}")
+        if self.debug:
+            self.trace(f"Debug: Unrecognized character '{self.current_char}' at line {self.line}, column {self.column}")
 
     # Handle standalone '.'
         if self.current_char == '.':
@@ -89,7 +156,36 @@ class Lexer:
         raise SyntaxError(f"Invalid Character '{self.current_char}' at line {self.line}, column {self.column}")
 
     
+    def read_tokens(self, count, tokens, ends):
+        """
+        Appends up to count tokens to tokens and the offset just past each to ends,
+        fewer only at the end of input. Tokens read before a lexical error stay appended.
+        """
+        if not self.scanner:
+            for _ in range(count):
+                token = self.get_next_token()
+                if token is None:
+                    return
+                tokens.append(token)
+                ends.append(self.pos)
+            return
+
+        # The pattern engine scans the whole batch, syncing the lexer position once
+        scan = self.scanner.scan
+        make_token = self.make_token
+        end = self.pos
+        for _ in range(count):
+            token_type, start, end = scan(end)
+            if token_type is None:
+                break
+            tokens.append(make_token(token_type, start, end))
+            ends.append(end)
+        self.jump_to(end)
+
     def tokenize(self):
+        if self.scanner:
+            return self.scanner.tokenize()
+
         tokens = []
         while (token := self.get_next_token()) is not None:
             tokens.append(token)
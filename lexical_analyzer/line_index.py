@@ -0,0 +1,36 @@
+from array import array
+from bisect import bisect_right
+
+
+class LineIndex:
+    """
+    Offsets at which every line of a source starts.
+    Built once, then any offset is turned into a line and column with a binary search.
+    text can be a str or raw bytes (bytes, mmap).
+    """
+    def __init__(self, text):
+        self.line_starts = array('Q', [0])
+        line_break = '\n' if isinstance(text, str) else b'\n'
+        newline = text.find(line_break)
+        while newline >= 0:
+            self.line_starts.append(newline + 1)
+            newline = text.find(line_break, newline + 1)
+
+    @classmethod
+    def from_line_starts(cls, line_starts):
+        """
+        Rebuilds an index from saved line start offsets without scanning the text.
+        """
+        index = cls.__new__(cls)
+        index.line_starts = array('Q', line_starts)
+        return index
+
+    def position(self, offset):
+        """
+        Returns the (line, column) of offset, both starting at 1 like the Lexer's.
+        """
+        line = bisect_right(self.line_starts, offset)
+        return line, offset - self.line_starts[line - 1] + 1
+
+    def line_count(self):
+        return len(self.line_starts)
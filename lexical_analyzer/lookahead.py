@@ -0,0 +1,193 @@
+from .line_index import LineIndex
+from .token_buffer import TokenBuffer
+
+DEFAULT_BATCH_SIZE = 256
+
+
+class TokenLookahead:
+    """
+    Prefetching ring buffer over a streaming token source (a Lexer or anything
+    with get_next_token). Tokens are read from the source a batch at a time and
+    handed out in order; peek(k) looks any number of tokens ahead.
+    Like a lexer, line and column are just past the last token handed out. A
+    lexical error met while prefetching is only raised once the tokens before
+    it have all been handed out, where the source itself would have raised it.
+    """
+    positions = True    # The source always knows where it stands
+
+    def __init__(self, source, batch_size=DEFAULT_BATCH_SIZE):
+        self.source = source
+        # The FSM lexer writes a debug line per number, one token at a time keeps them in step with the parser trace
+        self.batch_size = 1 if getattr(source, "debug", False) else batch_size
+        capacity = 1
+        while capacity < self.batch_size * 2:
+            capacity *= 2
+        self.tokens = [None] * capacity
+        self.marks = [None] * capacity     # Where the source stood after each token
+        self.mask = capacity - 1
+        self.head = 0       # Slot of the next token to hand out
+        self.count = 0      # Tokens waiting in the ring
+        self.done = False   # The source has no tokens left
+        self.end_mark = None
+        self.pending_error = None
+        self.mark = None    # Mark of the last token handed out
+
+        # A source over the whole text (the Lexer, the BytesLexer) marks tokens with an end
+        # offset, resolved to a line and column only when asked. A StreamingLexer has
+        # dropped the text by then, so its tokens are marked with a line and column.
+        self.offsets = hasattr(source, "line_index")
+        self.line_index = source.line_index if self.offsets else None
+
+    def read(self, count, tokens, marks):
+        source = self.source
+        if hasattr(source, "read_tokens"):
+            source.read_tokens(count, tokens, marks)
+            return
+
+        get_next_token = source.get_next_token
+        for _ in range(count):
+            token = get_next_token()
+            if token is None:
+                return
+            tokens.append(token)
+            marks.append(source.pos if self.offsets else (source.line, source.column))
+
+    def fill(self, needed):
+        """
+        Reads batches from the source until at least needed tokens wait in the ring
+        or the source is exhausted.
+        """
+        while self.count < needed and not self.done and self.pending_error is None:
+            batch = max(self.batch_size, needed - self.count)
+            if self.count + batch > len(self.tokens):
+                self.grow(self.count + batch)
+
+            tokens, marks = [], []
+            try:
+                self.read(batch, tokens, marks)
+            except SyntaxError as e:
+                self.pending_error = e
+            if len(tokens) < batch and self.pending_error is None:
+                self.done = True
+                self.end_mark = self.source.pos if self.offsets else (self.source.line, self.source.column)
+
+            # Copy the batch into the free slots, in two parts when it wraps around the end
+            start = (self.head + self.count) & self.mask
+            first = min(len(tokens), len(self.tokens) - start)
+            self.tokens[start:start + first] = tokens[:first]
+            self.marks[start:start + first] = marks[:first]
+            self.tokens[:len(tokens) - first] = tokens[first:]
+            self.marks[:len(tokens) - first] = marks[first:]
+            self.count += len(tokens)
+
+    def grow(self, size):
+        capacity = len(self.tokens)
+        while capacity < size:
+            capacity *= 2
+        order = [(self.head + i) & self.mask for i in range(self.count)]
+        tokens = [None] * capacity
+        marks = [None] * capacity
+        tokens[:self.count] = [self.tokens[slot] for slot in order]
+        marks[:self.count] = [self.marks[slot] for slot in order]
+        self.tokens, self.marks = tokens, marks
+        self.mask = capacity - 1
+        self.head = 0
+
+    def get_next_token(self):
+        if not self.count:
+            self.fill(1)
+            if not self.count:
+                if self.pending_error is not None:
+                    raise self.pending_error
+                self.mark = self.end_mark
+                return None
+        head = self.head
+        token = self.tokens[head]
+        self.mark = self.marks[head]
+        self.tokens[head] = None
+        self.head = (head + 1) & self.mask
+        self.count -= 1
+        return token
+
+    def peek(self, k=1):
+        """
+        Returns the k-th token get_next_token will hand out, or None past the end.
+        """
+        if k > self.count:
+            self.fill(k)
+            if k > self.count:
+                if self.pending_error is not None:
+                    raise self.pending_error
+                return None
+        return self.tokens[(self.head + k - 1) & self.mask]
+
+    def position(self):
+        mark = self.mark
+        if mark is None:
+            return 1, 1
+        if not self.offsets:
+            return mark
+        if self.line_index is None:
+            self.line_index = LineIndex(self.source.text)
+        return self.line_index.position(mark)
+
+    @property
+    def line(self):
+        return self.position()[0]
+
+    @property
+    def column(self):
+        return self.position()[1]
+
+
+class ListLookahead:
+    """
+    The same interface as TokenLookahead over tokens that are all in memory, a
+    TokenBuffer or a list of tokens, so peeking is plain indexing.
+    Reading starts at the token at index. positions is False when the tokens
+    do not know where they are in the source, a plain list of Tokens.
+    """
+    def __init__(self, tokens, index=0):
+        self.tokens = tokens
+        self.index = index
+        self.positions = isinstance(tokens, TokenBuffer) and tokens.line_index is not None
+
+    def get_next_token(self):
+        if self.index >= len(self.tokens):
+            return None
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+
+    def peek(self, k=1):
+        index = self.index + k - 1
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def position(self):
+        """
+        Returns the (line, column) just past the last token handed out.
+        Only a TokenBuffer knows where its tokens are, a plain list stays at 1, 1.
+        """
+        if self.index == 0 or not isinstance(self.tokens, TokenBuffer) or self.tokens.line_index is None:
+            return 1, 1
+        return self.tokens.line_index.position(self.tokens.end(self.index - 1))
+
+    @property
+    def line(self):
+        return self.position()[0]
+
+    @property
+    def column(self):
+        return self.position()[1]
+
+
+def token_lookahead(source, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Wraps a token source for the parser: a TokenBuffer or list of tokens is read
+    in place, anything else through a TokenLookahead ring.
+    """
+    if isinstance(source, (TokenLookahead, ListLookahead)):
+        return source
+    if isinstance(source, (TokenBuffer, list)):
+        return ListLookahead(source)
+    return TokenLookahead(source, batch_size)
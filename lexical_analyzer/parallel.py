@@ -0,0 +1,96 @@
+import os
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+from .lexical_analyzer import Lexer
+from .line_index import LineIndex
+from .token_buffer import TokenBuffer
+from .constants import ENGINE_PATTERN, TRACE_OFF
+
+# Below this many characters per worker the process pool costs more than it saves
+MIN_PIECE_SIZE = 1 << 18
+
+
+def comment_spans(text):
+    """
+    Pre-scans text for [* ... *] comments, returns their (start, end) offsets in order.
+    """
+    spans = []
+    start = text.find("[*")
+    while start >= 0:
+        # The closing "*]" may reuse the '*' of the opener, as in Lexer.skip_comment
+        close = text.find("*]", start + 1)
+        end = len(text) if close < 0 else close + 2
+        spans.append((start, end))
+        start = text.find("[*", end)
+    return spans
+
+
+def find_cut_points(text, pieces):
+    """
+    Returns offsets splitting text into about pieces parts. Every cut is just
+    after a newline outside any comment, so no token or comment spans a cut.
+    """
+    spans = comment_spans(text)
+    span_starts = [start for start, _ in spans]
+    cuts = [0]
+    for piece in range(1, pieces):
+        newline = text.find('\n', max(len(text) * piece // pieces, cuts[-1]))
+        while newline >= 0:
+            index = bisect_right(span_starts, newline) - 1
+            if index < 0 or spans[index][1] <= newline:
+                break
+            # Inside a comment, look again after it closes
+            newline = text.find('\n', spans[index][1])
+        if newline < 0:
+            break
+        if newline + 1 > cuts[-1]:
+            cuts.append(newline + 1)
+    cuts.append(len(text))
+    return cuts
+
+
+def lex_piece(piece, first_line, engine, trace=TRACE_OFF):
+    """
+    Lexes one piece of the source in a worker process.
+    The piece starts a line, so seeding the lexer's line keeps every error position global.
+    """
+    lexer = Lexer(piece, engine, trace=trace)
+    lexer.line = first_line
+    buffer = TokenBuffer.from_lexer(lexer)
+    buffer.line_index = None    # Rebuilt once for the whole source, no need to send it back
+    return buffer
+
+
+def parallel_token_buffer(text, workers=None, engine=ENGINE_PATTERN, trace=TRACE_OFF):
+    """
+    Lexes text in a process pool and joins the pieces into one TokenBuffer
+    with offsets relative to the whole text. trace is the lexers' trace level;
+    the FSM debug lines of the workers would interleave, so there are none by default.
+    """
+    workers = workers or os.cpu_count() or 1
+    pieces = min(workers * 4, len(text) // MIN_PIECE_SIZE)
+    if workers == 1 or pieces <= 1:
+        return TokenBuffer.from_lexer(Lexer(text, engine, trace=trace))
+
+    cuts = find_cut_points(text, pieces)
+    first_lines = [1]
+    for start, end in zip(cuts, cuts[1:-1]):
+        first_lines.append(first_lines[-1] + text.count('\n', start, end))
+
+    result = TokenBuffer(LineIndex(text))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map hands the results back in order, so the first error raised is the
+        # same one the sequential lexer would have stopped at
+        buffers = pool.map(lex_piece, [text[start:end] for start, end in zip(cuts, cuts[1:])], first_lines,
+                           [engine] * len(first_lines), [trace] * len(first_lines))
+        for start, buffer in zip(cuts, buffers):
+            result.extend(buffer, start)
+    return result
+
+
+def parallel_tokenize(text, workers=None, engine=ENGINE_PATTERN, trace=TRACE_OFF):
+    """
+    Same token list as Lexer(text, engine).tokenize(), lexed on several cores.
+    """
+    return list(parallel_token_buffer(text, workers, engine, trace))
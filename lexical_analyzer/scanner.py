@@ -0,0 +1,125 @@
+import re
+
+from .constants import TOKEN_KEYWORD, TOKEN_IDENTIFIER, TOKEN_INTEGER, TOKEN_REAL, TOKEN_OPERATOR, TOKEN_SEPARATOR
+from .constants import KEYWORDS, OPERATORS, SEPARATORS
+
+# ASCII characters for which str.isspace() is true
+WHITESPACE_CHARS = " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+
+
+def alternatives(symbols):
+    """
+    Builds a regex alternation that tries the longest symbols first.
+    """
+    return "|".join(re.escape(symbol) for symbol in sorted(symbols, key=len, reverse=True))
+
+
+# A two character operator is only reachable when its first character is an
+# operator on its own, which is how FiniteStateMachines.operator extends them
+SCANNER_OPERATORS = [op for op in OPERATORS if len(op) == 1 or op[0] in OPERATORS]
+
+WHITESPACE_PATTERN = re.compile(f"[{re.escape(WHITESPACE_CHARS)}]*")
+
+# Master pattern built once from the constants. Leading whitespace is folded in
+# and every named group maps straight to a token type, so each token (or comment
+# opener) is recognized by exactly one match without slicing its lexeme
+MASTER_PATTERN = re.compile(
+    f"[{re.escape(WHITESPACE_CHARS)}]*(?:"
+    r"(?P<comment>\[\*)"
+    r"|(?P<real>[0-9]+\.[0-9]+)"
+    r"|(?P<invalid_real>[0-9]+\.)"
+    r"|(?P<integer>[0-9]+)"
+    f"|(?P<keyword>(?:{alternatives(KEYWORDS)})(?![A-Za-z0-9]))"
+    r"|(?P<identifier>[A-Za-z][A-Za-z0-9]*)"
+    f"|(?P<operator>{alternatives(SCANNER_OPERATORS)})"
+    f"|(?P<separator>{alternatives(SEPARATORS)})"
+    ")"
+)
+
+COMMENT_GROUP = MASTER_PATTERN.groupindex["comment"]
+
+# Token type for each group index of MASTER_PATTERN
+GROUP_TYPES = [None] * (MASTER_PATTERN.groups + 1)
+GROUP_TYPES[MASTER_PATTERN.groupindex["real"]] = TOKEN_REAL
+GROUP_TYPES[MASTER_PATTERN.groupindex["integer"]] = TOKEN_INTEGER
+GROUP_TYPES[MASTER_PATTERN.groupindex["keyword"]] = TOKEN_KEYWORD
+GROUP_TYPES[MASTER_PATTERN.groupindex["identifier"]] = TOKEN_IDENTIFIER
+GROUP_TYPES[MASTER_PATTERN.groupindex["operator"]] = TOKEN_OPERATOR
+GROUP_TYPES[MASTER_PATTERN.groupindex["separator"]] = TOKEN_SEPARATOR
+
+
+class PatternScanner:
+    """
+    Single-pass scanner engine for ASCII sources.
+    Each token is matched in one step by MASTER_PATTERN instead of walking the
+    finite state machines one character at a time.
+    """
+    def __init__(self, lexer):
+        self.lexer = lexer
+
+    def scan(self, pos):
+        """
+        Scans the token at or after pos.
+        Returns (token_type, start, end), token_type is None once the input is exhausted.
+        """
+        text = self.lexer.text
+        match = MASTER_PATTERN.match
+        while True:
+            found = match(text, pos)
+            if found is None:
+                pos = WHITESPACE_PATTERN.match(text, pos).end()
+                if pos < len(text):
+                    self.invalid_character(pos)
+                return None, pos, pos
+
+            group = found.lastindex
+            token_type = GROUP_TYPES[group]
+            if token_type is not None:
+                return token_type, found.start(group), found.end()
+
+            if group == COMMENT_GROUP:
+                # The closing "*]" may reuse the '*' of the opener, as in Lexer.skip_comment
+                close = text.find("*]", found.start(group) + 1)
+                if close < 0:
+                    self.lexer.jump_to(found.start(group))
+                    raise SyntaxError(f"Unterminated comment starting at line {self.lexer.line}, column {self.lexer.column}")
+                pos = close + 2
+                continue
+
+            # invalid_real group: digits and a '.' without digits after it
+            self.lexer.jump_to(found.end())
+            raise SyntaxError(f"Invalid real number format at line {self.lexer.line}, column {self.lexer.column}")
+
+    def invalid_character(self, pos):
+        """
+        Raises the same error as the FSM engine for a character no token can start with.
+        """
+        self.lexer.jump_to(pos)
+        raise SyntaxError(f"Invalid Character '{self.lexer.current_char}' at line {self.lexer.line}, column {self.lexer.column}")
+
+    def next_token(self):
+        """
+        Returns the next token and moves the lexer past it.
+        """
+        token_type, start, end = self.scan(self.lexer.pos)
+        self.lexer.jump_to(end)
+        if token_type is None:
+            return None
+        return self.lexer.make_token(token_type, start, end)
+
+    def tokenize(self):
+        """
+        Scans the rest of the input, only syncing the lexer position at the end.
+        """
+        tokens = []
+        append = tokens.append
+        scan = self.scan
+        make_token = self.lexer.make_token
+        end = self.lexer.pos
+        while True:
+            token_type, start, end = scan(end)
+            if token_type is None:
+                break
+            append(make_token(token_type, start, end))
+        self.lexer.jump_to(end)
+        return tokens
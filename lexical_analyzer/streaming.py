@@ -0,0 +1,183 @@
+from .token import Token
+from .scanner import MASTER_PATTERN, WHITESPACE_PATTERN, GROUP_TYPES, COMMENT_GROUP
+from .lexical_analyzer import Lexer, WHITESPACE_RUN
+from .constants import ENGINE_FSM, TRACE_OFF
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+
+class StreamingLexer:
+    """
+    Lexes a text file chunk by chunk and yields tokens as they are recognized.
+    Only the current chunk plus a partially read token is held in memory, so the
+    input can be larger than RAM. Like the Lexer, it runs the pattern engine on
+    ASCII text and the FSMs on any chunk that is not, so it accepts the same
+    programs as the FSM engine.
+    """
+    def __init__(self, file, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.offset = 0     # Offset of buffer[0] in the whole input
+        self.index = 0      # Current position inside buffer
+        self.eof = False
+        self.ascii = True
+        self.fsm_lexer = None   # FSM Lexer over a buffer that is not ASCII
+        self.line = 1
+        self.line_start = 0  # Offset the current line starts at
+        self.token_stream = self.tokens()
+
+    @property
+    def pos(self):
+        return self.offset + self.index
+
+    @property
+    def column(self):
+        return self.pos - self.line_start + 1
+
+    def fill(self):
+        """
+        Drops the text already consumed and appends the next chunk of the file.
+        """
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.index:] + chunk
+        self.offset += self.index
+        self.index = 0
+        self.ascii = self.buffer.isascii()
+        self.fsm_lexer = None
+        if not chunk:
+            self.eof = True
+
+    def move_to(self, index):
+        """
+        Moves to index in the buffer, keeping line and column in sync.
+        """
+        newlines = self.buffer.count('\n', self.index, index)
+        if newlines:
+            self.line += newlines
+            self.line_start = self.offset + self.buffer.rfind('\n', self.index, index) + 1
+        self.index = index
+
+    def skip_comment(self, start):
+        """
+        Skips the comment opened at start, reading more chunks until its "*]" shows up.
+        """
+        self.move_to(start)
+        line, column = self.line, self.column
+        # The closing "*]" may reuse the '*' of the opener, as in Lexer.skip_comment
+        search = start + 1
+        while True:
+            close = self.buffer.find("*]", search)
+            if close >= 0:
+                self.move_to(close + 2)
+                return
+            if self.eof:
+                raise SyntaxError(f"Unterminated comment starting at line {line}, column {column}")
+            # Let go of the comment read so far, except a last '*' that may start "*]"
+            self.move_to(max(len(self.buffer) - 1, search))
+            search = 0
+            self.fill()
+
+    def tokens(self):
+        """
+        Generator yielding the tokens of the file in order.
+        """
+        match = MASTER_PATTERN.match
+        while True:
+            if not self.ascii:
+                if self.eof and WHITESPACE_RUN.match(self.buffer, self.index).end() == len(self.buffer):
+                    return
+                token = self.fsm_token()
+                if token is not None:
+                    yield token
+                continue
+
+            found = match(self.buffer, self.index)
+
+            if not self.eof:
+                # Anything running into the end of the buffer could still grow, so read
+                # on first. Only a lone last character (like the '$' of "$$") can
+                # become a token when nothing matched.
+                if found is None:
+                    start = WHITESPACE_PATTERN.match(self.buffer, self.index).end()
+                    reached = start + 1
+                else:
+                    start = found.start(found.lastindex)
+                    reached = found.end()
+                if reached >= len(self.buffer):
+                    self.move_to(start)
+                    self.fill()
+                    continue
+
+            if found is None:
+                self.move_to(WHITESPACE_PATTERN.match(self.buffer, self.index).end())
+                if self.index < len(self.buffer):
+                    raise SyntaxError(f"Invalid Character '{self.buffer[self.index]}' at line {self.line}, column {self.column}")
+                return
+
+            group = found.lastindex
+            token_type = GROUP_TYPES[group]
+            if token_type is not None:
+                lexeme = found.group(group)
+                self.move_to(found.end())
+                yield Token(token_type, lexeme)
+            elif group == COMMENT_GROUP:
+                self.skip_comment(found.start(group))
+            else:
+                # invalid_real group: digits and a '.' without digits after it
+                self.move_to(found.end())
+                raise SyntaxError(f"Invalid real number format at line {self.line}, column {self.column}")
+
+    def fsm_token(self):
+        """
+        Lexes the token at index with the FSMs. Returns None after skipping a
+        comment, or after reading more input when the token may run on into it.
+        """
+        buffer = self.buffer
+        start = WHITESPACE_RUN.match(buffer, self.index).end()
+        # Two characters are enough to tell a comment, "$$" or a two character operator
+        if start + 1 >= len(buffer) and not self.eof:
+            self.move_to(start)
+            self.fill()
+            return None
+        if buffer.startswith("[*", start):
+            self.skip_comment(start)
+            return None
+
+        self.move_to(start)
+        lexer = self.fsm_lexer
+        if lexer is None:
+            lexer = self.fsm_lexer = Lexer(buffer, ENGINE_FSM, trace=TRACE_OFF)
+        lexer.pos = start
+        lexer.current_char = buffer[start]
+        lexer.line, lexer.column = self.line, self.column
+        try:
+            token = lexer.get_next_token()
+        except SyntaxError:
+            # An error at the very end of the buffer may be a token cut short
+            if self.eof or lexer.pos + 1 < len(buffer):
+                raise
+            self.fill()
+            return None
+        if lexer.pos >= len(buffer) and not self.eof:
+            self.fill()
+            return None
+        self.move_to(lexer.pos)
+        return token
+
+    def get_next_token(self):
+        """
+        Lexer-compatible access to the stream, returns None at the end of the input.
+        """
+        return next(self.token_stream, None)
+
+    def tokenize(self):
+        return list(self.token_stream)
+
+
+def stream_file(input_file, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields the tokens of input_file without ever reading the whole file.
+    """
+    with open(input_file, 'r') as file:
+        yield from StreamingLexer(file, chunk_size).tokens()
@@ -1,10 +1,64 @@
+from .constants import CLASS_KINDS, KIND_CODES
+
+
+def token_kind(token_type, lexeme):
+    """
+    Returns the integer kind code of a token (see constants.TOKEN_KINDS).
+    """
+    kind = CLASS_KINDS.get(token_type)
+    return kind if kind is not None else KIND_CODES.get(lexeme)
+
+
 class Token:
     def __init__(self, token_type, lexeme):
         self.token_type = token_type
         self.lexeme = lexeme
+        self.kind = token_kind(token_type, lexeme)
     
     def __str__(self):
         return f"Token({self.token_type:<20} {self.lexeme})"
     
     def __repr__(self):
-        return f"Token({self.token_type}, {self.lexeme})"
\ No newline at end of file
+        return f"Token({self.token_type}, {self.lexeme})"
+
+
+class SpanToken:
+    """
+    Token that only stores its start and end offsets into the source.
+    The lexeme is sliced, and the line/column resolved, only when asked for.
+    """
+    __slots__ = ("token_type", "kind", "source", "start", "end", "line_index")
+
+    def __init__(self, token_type, source, start, end, line_index):
+        self.token_type = token_type
+        self.source = source
+        self.start = start
+        self.end = end
+        self.line_index = line_index
+        # Only keywords, operators and separators need their text for the kind
+        kind = CLASS_KINDS.get(token_type)
+        self.kind = kind if kind is not None else KIND_CODES.get(source[start:end])
+
+    @property
+    def lexeme(self):
+        return self.source[self.start:self.end]
+
+    def position(self):
+        """
+        Returns the exact (line, column) the token starts at.
+        """
+        return self.line_index.position(self.start)
+
+    @property
+    def line(self):
+        return self.position()[0]
+
+    @property
+    def column(self):
+        return self.position()[1]
+
+    def __str__(self):
+        return f"Token({self.token_type:<20} {self.lexeme})"
+
+    def __repr__(self):
+        return f"Token({self.token_type}, {self.lexeme})"
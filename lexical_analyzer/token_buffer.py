@@ -0,0 +1,121 @@
+from array import array
+
+from .token import Token
+from .line_index import LineIndex
+from .constants import TOKEN_TYPES, TOKEN_TYPE_CODES
+
+
+class TokenBuffer:
+    """
+    Compact struct-of-arrays token storage.
+    Each token is a type code in kinds, a start offset in starts and the id of its
+    interned lexeme in lexeme_ids, roughly 9 bytes per token instead of a Token object.
+    """
+    def __init__(self, line_index=None):
+        self.kinds = array('B')
+        self.starts = array('I')
+        self.lexeme_ids = array('I')
+        self.strings = []       # Interned lexemes, indexed by lexeme id
+        self.string_ids = {}    # Lexeme -> lexeme id
+        self.line_index = line_index
+
+    @classmethod
+    def from_lexer(cls, lexer):
+        """
+        Scans the rest of the lexer's input straight into a new buffer.
+        """
+        buffer = cls(lexer.line_index or LineIndex(lexer.text))
+
+        if lexer.scanner:
+            # The pattern engine hands out raw spans, no Token is ever built
+            text = lexer.text
+            scan = lexer.scanner.scan
+            end = lexer.pos
+            while True:
+                token_type, start, end = scan(end)
+                if token_type is None:
+                    break
+                buffer.append(token_type, text[start:end], start)
+            lexer.jump_to(end)
+        else:
+            while (token := lexer.get_next_token()) is not None:
+                lexeme = token.lexeme
+                buffer.append(token.token_type, lexeme, lexer.pos - len(lexeme))
+
+        return buffer
+
+    def intern(self, lexeme):
+        """
+        Returns the id of lexeme in the string table, adding it if needed.
+        """
+        lexeme_id = self.string_ids.get(lexeme)
+        if lexeme_id is None:
+            lexeme_id = self.string_ids[lexeme] = len(self.strings)
+            self.strings.append(lexeme)
+        return lexeme_id
+
+    def append(self, token_type, lexeme, start):
+        self.kinds.append(TOKEN_TYPE_CODES[token_type])
+        self.starts.append(start)
+        self.lexeme_ids.append(self.intern(lexeme))
+
+    def extend(self, other, offset=0):
+        """
+        Appends every token of other, shifting its start offsets by offset.
+        """
+        lexeme_ids = [self.intern(lexeme) for lexeme in other.strings]
+        self.kinds.extend(other.kinds)
+        self.starts.extend(array('I', (start + offset for start in other.starts)) if offset else other.starts)
+        self.lexeme_ids.extend(array('I', (lexeme_ids[lexeme_id] for lexeme_id in other.lexeme_ids)))
+
+    def token_type(self, index):
+        return TOKEN_TYPES[self.kinds[index]]
+
+    def lexeme(self, index):
+        return self.strings[self.lexeme_ids[index]]
+
+    def end(self, index):
+        return self.starts[index] + len(self.lexeme(index))
+
+    def position(self, index):
+        """
+        Returns the (line, column) the token at index starts at.
+        """
+        return self.line_index.position(self.starts[index])
+
+    def nbytes(self):
+        """
+        Size of the per-token columns in bytes, the string table excluded.
+        """
+        return sum(column.itemsize * len(column) for column in (self.kinds, self.starts, self.lexeme_ids))
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            sliced = TokenBuffer(self.line_index)
+            sliced.kinds = self.kinds[index]
+            sliced.starts = self.starts[index]
+            sliced.lexeme_ids = self.lexeme_ids[index]
+            # Lexeme ids stay valid, so the string table is shared rather than copied
+            sliced.strings = self.strings
+            sliced.string_ids = self.string_ids
+            return sliced
+        return Token(TOKEN_TYPES[self.kinds[index]], self.strings[self.lexeme_ids[index]])
+
+    def __iter__(self):
+        strings = self.strings
+        for kind, lexeme_id in zip(self.kinds, self.lexeme_ids):
+            yield Token(TOKEN_TYPES[kind], strings[lexeme_id])
+
+    def __getstate__(self):
+        # The lexeme -> id map is rebuilt on load instead of being pickled
+        state = self.__dict__.copy()
+        del state["string_ids"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.string_ids = {lexeme: lexeme_id for lexeme_id, lexeme in enumerate(self.strings)}
+
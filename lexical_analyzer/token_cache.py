@@ -0,0 +1,247 @@
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from itertools import accumulate
+
+from .lexical_analyzer import Lexer
+from .line_index import LineIndex
+from .token_buffer import TokenBuffer
+from .byte_lexer import bytes_lexer
+from .constants import ENGINE_FSM, ENGINE_BYTES, LEXER_VERSION, TOKEN_TYPES, TRACE_OFF
+
+# Binary token stream layout, all integers little-endian:
+#   header       magic, format version, number of token types, token count,
+#                string count, size of the UTF-8 string blob, line count
+#   kinds        token count x uint8, index into TOKEN_TYPES
+#   starts       token count x uint32, start offset in the source
+#   lexeme ids   token count x uint32, index into the string table
+#   lengths      string count x uint32, length of each string in characters
+#   blob         every string of the table, UTF-8 encoded back to back
+#   line starts  line count x uint64, LineIndex of the source (none if it had no index)
+STREAM_MAGIC = b"RTOK"
+STREAM_VERSION = 1
+STREAM_HEADER = struct.Struct("<4sHHIIII")
+
+DEFAULT_CACHE_DIR = "__tokencache__"
+
+
+def little_endian(column):
+    """
+    Returns the column as little-endian bytes, swapping a copy on big-endian machines.
+    """
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def read_column(typecode, data, start, count):
+    column = array(typecode)
+    end = start + column.itemsize * count
+    column.frombytes(data[start:end])
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column, end
+
+
+def write_token_stream(buffer, file):
+    """
+    Writes a TokenBuffer to a binary file object.
+    """
+    lengths = array('I', map(len, buffer.strings))
+    blob = "".join(buffer.strings).encode('utf-8')
+    line_starts = buffer.line_index.line_starts if buffer.line_index else array('Q')
+    file.write(STREAM_HEADER.pack(STREAM_MAGIC, STREAM_VERSION, len(TOKEN_TYPES), len(buffer), len(buffer.strings), len(blob), len(line_starts)))
+    file.write(buffer.kinds.tobytes())
+    file.write(little_endian(buffer.starts))
+    file.write(little_endian(buffer.lexeme_ids))
+    file.write(little_endian(lengths))
+    file.write(blob)
+    file.write(little_endian(line_starts))
+
+
+def read_token_stream(file):
+    """
+    Reads a TokenBuffer written by write_token_stream from a binary file object.
+    """
+    data = file.read()
+    if len(data) < STREAM_HEADER.size:
+        raise ValueError("Truncated token stream header")
+    magic, version, type_count, count, string_count, blob_size, line_count = STREAM_HEADER.unpack_from(data)
+    if magic != STREAM_MAGIC or version != STREAM_VERSION or type_count != len(TOKEN_TYPES):
+        raise ValueError("Not a token stream of this version")
+
+    buffer = TokenBuffer()
+    offset = STREAM_HEADER.size
+    buffer.kinds, offset = read_column('B', data, offset, count)
+    buffer.starts, offset = read_column('I', data, offset, count)
+    buffer.lexeme_ids, offset = read_column('I', data, offset, count)
+    lengths, offset = read_column('I', data, offset, string_count)
+    blob = data[offset:offset + blob_size].decode('utf-8')
+    line_starts, offset = read_column('Q', data, offset + blob_size, line_count)
+    if offset != len(data):
+        raise ValueError("Truncated token stream")
+
+    ends = list(accumulate(lengths))
+    buffer.strings = [blob[end - length:end] for end, length in zip(ends, lengths)]
+    buffer.string_ids = {lexeme: lexeme_id for lexeme_id, lexeme in enumerate(buffer.strings)}
+    if line_count:
+        buffer.line_index = LineIndex.from_line_starts(line_starts)
+    return buffer
+
+
+class TokenCache:
+    """
+    On-disk cache of lexed token streams.
+    Entries are keyed by a hash of the source content and the lexer version,
+    so an unchanged source is never lexed twice.
+    """
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+
+    def key(self, data):
+        digest = hashlib.sha256(f"{LEXER_VERSION}\0".encode())
+        digest.update(data)
+        return digest.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.tok")
+
+    def load(self, key):
+        """
+        Returns the cached TokenBuffer for key, or None if there is no usable entry.
+        """
+        try:
+            with open(self.path(key), 'rb') as file:
+                return read_token_stream(file)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key, buffer):
+        os.makedirs(self.directory, exist_ok=True)
+        # Written aside and renamed, so a reader never sees a half written entry
+        temporary = f"{self.path(key)}.{os.getpid()}"
+        with open(temporary, 'wb') as file:
+            write_token_stream(buffer, file)
+        os.replace(temporary, self.path(key))
+
+
+class CachingLexer:
+    """
+    Hands out the tokens of a live lexer (a Lexer or BytesLexer) and records them
+    in a TokenBuffer, which is cached under key once the lexer reaches the end of
+    the source. A lexical error, or a parse that stops before the end, leaves
+    nothing cached.
+    """
+    def __init__(self, lexer, cache, key):
+        self.lexer = lexer
+        self.cache = cache
+        self.key = key
+        self.buffer = TokenBuffer()
+        self.text = lexer.text
+        self.line_index = lexer.line_index
+        self.debug = getattr(lexer, "debug", False)
+
+    @property
+    def pos(self):
+        return self.lexer.pos
+
+    @property
+    def line(self):
+        return self.lexer.line
+
+    @property
+    def column(self):
+        return self.lexer.column
+
+    def get_next_token(self):
+        token = self.lexer.get_next_token()
+        if token is None:
+            self.finish()
+        else:
+            self.buffer.append(token.token_type, token.lexeme, self.lexer.pos - len(token.lexeme))
+        return token
+
+    def read_tokens(self, count, tokens, ends):
+        """
+        Appends up to count tokens to tokens and the offset just past each to ends,
+        fewer only at the end of input, like Lexer.read_tokens.
+        """
+        first = len(tokens)
+        if hasattr(self.lexer, "read_tokens"):
+            self.lexer.read_tokens(count, tokens, ends)
+        else:
+            for _ in range(count):
+                token = self.lexer.get_next_token()
+                if token is None:
+                    break
+                tokens.append(token)
+                ends.append(self.lexer.pos)
+        for token, end in zip(tokens[first:], ends[first:]):
+            self.buffer.append(token.token_type, token.lexeme, end - len(token.lexeme))
+        if len(tokens) - first < count:
+            self.finish()
+
+    def finish(self):
+        """
+        Caches the recorded tokens, once, now that the whole source lexed cleanly.
+        """
+        if self.cache is not None:
+            self.buffer.line_index = self.line_index or LineIndex(self.text)
+            self.cache.store(self.key, self.buffer)
+            self.cache = None
+
+
+def read_source(cache, input_file, engine):
+    """
+    Reads input_file as the lexer for engine takes it, returns (source, cache key).
+    """
+    if engine == ENGINE_BYTES:
+        with open(input_file, 'rb') as file:
+            source = file.read()
+        # Offsets of the bytes engine count raw bytes, keep them apart from the str engines'
+        return source, cache.key(b"bytes\0" + source)
+    with open(input_file, 'r') as file:
+        source = file.read()
+    return source, cache.key(source.encode('utf-8', 'surrogatepass'))
+
+
+def source_lexer(source, engine):
+    """
+    Returns the lexer for a source read by read_source. It writes no trace, so
+    lexing for the cache prints the same whether the entry is there or not.
+    """
+    if engine == ENGINE_BYTES:
+        return bytes_lexer(source, trace=TRACE_OFF)
+    return Lexer(source, engine, trace=TRACE_OFF)
+
+
+def cached_token_buffer(input_file, engine=ENGINE_FSM, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Returns the TokenBuffer of input_file, loaded from the cache when the file
+    has not changed since it was last lexed, lexed with engine and cached otherwise.
+    """
+    cache = TokenCache(cache_dir)
+    source, key = read_source(cache, input_file, engine)
+    buffer = cache.load(key)
+    if buffer is None:
+        buffer = TokenBuffer.from_lexer(source_lexer(source, engine))
+        cache.store(key, buffer)
+    return buffer
+
+
+def cached_token_source(input_file, engine=ENGINE_FSM, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Returns the cached TokenBuffer of input_file when the file has not changed
+    since it was last lexed, otherwise a CachingLexer over it. The parser then
+    reads the tokens as they are lexed, so it meets a lexical error where the
+    uncached lexer would, after any syntax error before it.
+    """
+    cache = TokenCache(cache_dir)
+    source, key = read_source(cache, input_file, engine)
+    buffer = cache.load(key)
+    if buffer is not None:
+        return buffer
+    return CachingLexer(source_lexer(source, engine), cache, key)
@@ -0,0 +1,40 @@
+import sys
+
+from .constants import TRACE_LEVELS, TRACE_FULL
+
+
+def trace_level(level):
+    """
+    Returns the position of a trace level in TRACE_LEVELS.
+    None and True stand for TRACE_FULL, False for TRACE_OFF.
+    """
+    if level is None or level is True:
+        level = TRACE_FULL
+    elif level is False:
+        return 0
+    if level not in TRACE_LEVELS:
+        raise ValueError(f"Unknown trace level '{level}'")
+    return TRACE_LEVELS.index(level)
+
+
+class TraceSink:
+    """
+    Collects trace lines and writes them out in batches instead of one print per line.
+    Without a stream the lines go to whatever sys.stdout is when they are flushed.
+    """
+    def __init__(self, stream=None, batch_size=4096):
+        self.stream = stream
+        self.batch_size = batch_size
+        self.lines = []
+
+    def write(self, line):
+        self.lines.append(line)
+        if len(self.lines) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            stream = self.stream if self.stream is not None else sys.stdout
+            self.lines.append("")
+            stream.write("\n".join(self.lines))
+            self.lines = []
@@ -0,0 +1,186 @@
+"""
+Optional NumPy pre-pass that finds token boundaries in bulk.
+Every byte is classified at once and identifier, integer and whitespace runs are
+found with vectorized diff/nonzero operations. A small residual pass over the
+candidates only handles what depends on what came before it: [* *] comments,
+two character operators, $$ and reals.
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .token import Token
+from .line_index import LineIndex
+from .lexical_analyzer import Lexer
+from .byte_lexer import CHAR_CLASSES, OTHER, WHITESPACE, LETTER, DIGIT, OPERATOR, SEPARATOR, DOLLAR
+from .scanner import SCANNER_OPERATORS
+from .constants import TOKEN_KEYWORD, TOKEN_IDENTIFIER, TOKEN_INTEGER, TOKEN_REAL, TOKEN_OPERATOR, TOKEN_SEPARATOR
+from .constants import KEYWORDS, TOKEN_TYPES, TOKEN_TYPE_CODES, TRACE_OFF
+
+KEYWORD_SET = frozenset(KEYWORDS)
+TWO_CHAR_OPERATORS = frozenset(op for op in SCANNER_OPERATORS if len(op) == 2)
+
+IDENTIFIER_CODE = TOKEN_TYPE_CODES[TOKEN_IDENTIFIER]
+INTEGER_CODE = TOKEN_TYPE_CODES[TOKEN_INTEGER]
+REAL_CODE = TOKEN_TYPE_CODES[TOKEN_REAL]
+OPERATOR_CODE = TOKEN_TYPE_CODES[TOKEN_OPERATOR]
+SEPARATOR_CODE = TOKEN_TYPE_CODES[TOKEN_SEPARATOR]
+
+
+def runs(mask):
+    """
+    Returns the start and end offsets of every run of True in mask.
+    """
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2], edges[1::2]
+
+
+def blank_comments(data, classes):
+    """
+    Turns every [* ... *] comment into whitespace in classes.
+    Returns the offset of an unterminated comment, or None.
+    """
+    opens = np.flatnonzero((data[:-1] == ord('[')) & (data[1:] == ord('*')))
+    if len(opens) == 0:
+        return None
+    closes = np.flatnonzero((data[:-1] == ord('*')) & (data[1:] == ord(']')))
+
+    size = len(data)
+    marks = np.zeros(size + 1, dtype=np.int8)
+    end = 0
+    unterminated = None
+    for start in opens.tolist():
+        if start < end:
+            continue  # "[*" inside an earlier comment
+        # The closing "*]" may reuse the '*' of the opener, as in Lexer.skip_comment
+        index = np.searchsorted(closes, start + 1)
+        if index < len(closes):
+            end = int(closes[index]) + 2
+        else:
+            end = size
+            unterminated = start
+        marks[start] += 1
+        marks[end] -= 1
+    classes[np.cumsum(marks[:size]) > 0] = WHITESPACE
+    return unterminated
+
+
+def vectorized_tokenize(text, trace=TRACE_OFF):
+    """
+    Returns the same token list as Lexer(text).tokenize().
+    Sources that are not ASCII are handed to the Lexer as they are, at trace
+    level trace, so by default without the debug lines the ASCII path never writes.
+    """
+    if np is None:
+        raise ImportError("vectorized_tokenize requires NumPy (pip install numpy)")
+    if not text.isascii():
+        return Lexer(text, trace=trace).tokenize()
+
+    data = np.frombuffer(text.encode('ascii'), dtype=np.uint8)
+    size = len(data)
+    classes = np.frombuffer(CHAR_CLASSES, dtype=np.uint8)[data]
+    unterminated = blank_comments(data, classes)
+
+    errors = []     # (offset of the offending token, offset reported, message)
+    if unterminated is not None:
+        errors.append((unterminated, unterminated, "Unterminated comment starting"))
+    starts, ends, codes = [], [], []
+
+    # Alphanumeric runs: a leading digit part is a number, the rest one identifier
+    run_starts, run_ends = runs((classes == LETTER) | (classes == DIGIT))
+    letters = np.append(np.flatnonzero(classes == LETTER), size)
+    first_letters = np.minimum(letters[np.searchsorted(letters, run_starts)], run_ends)
+
+    has_word = first_letters < run_ends
+    starts.append(first_letters[has_word])
+    ends.append(run_ends[has_word])
+    codes.append(np.full(int(has_word.sum()), IDENTIFIER_CODE))
+
+    number_starts = run_starts.copy()
+    number_ends = first_letters.copy()
+    number_codes = np.full(len(run_starts), INTEGER_CODE)
+
+    # Residual pass for reals: an all-digit run followed by '.'
+    dotted = np.flatnonzero((number_ends == run_ends) & (run_ends > run_starts) & (run_ends < size))
+    dotted = dotted[data[run_ends[dotted]] == ord('.')]
+    consumed = -1
+    real_dots = []
+    for run in dotted.tolist():
+        if run == consumed:
+            continue  # Its digits already are the fraction of the previous real
+        after = int(run_ends[run]) + 1
+        if after < size and classes[after] == DIGIT:
+            # The fraction is the digit part of the next run, which starts right after the '.'
+            number_ends[run] = number_ends[run + 1]
+            number_codes[run] = REAL_CODE
+            number_starts[run + 1] = number_ends[run + 1]
+            consumed = run + 1
+            real_dots.append(after - 1)
+        else:
+            errors.append((int(run_starts[run]), after, "Invalid real number format"))
+
+    has_number = number_ends > number_starts
+    starts.append(number_starts[has_number])
+    ends.append(number_ends[has_number])
+    codes.append(number_codes[has_number])
+
+    # Operators are single characters unless a pair like "<=" forms, left to right
+    operator_positions = np.flatnonzero(classes == OPERATOR)
+    pairs = operator_positions[operator_positions + 1 < size]
+    pairs = pairs[data[pairs + 1] == ord('=')]
+    operator_ends = operator_positions + 1
+    paired = set()
+    for position in pairs.tolist():
+        if position - 1 in paired or text[position:position + 2] not in TWO_CHAR_OPERATORS:
+            continue
+        paired.add(position)
+    if paired:
+        pair_positions = np.array(sorted(paired))
+        second_chars = np.isin(operator_positions, pair_positions + 1)
+        operator_ends[np.isin(operator_positions, pair_positions)] += 1
+        operator_positions, operator_ends = operator_positions[~second_chars], operator_ends[~second_chars]
+    starts.append(operator_positions)
+    ends.append(operator_ends)
+    codes.append(np.full(len(operator_positions), OPERATOR_CODE))
+
+    separator_positions = np.flatnonzero(classes == SEPARATOR)
+    if real_dots:
+        separator_positions = separator_positions[~np.isin(separator_positions, real_dots)]
+    starts.append(separator_positions)
+    ends.append(separator_positions + 1)
+    codes.append(np.full(len(separator_positions), SEPARATOR_CODE))
+
+    # Runs of '$' pair up into "$$", an odd one out is an invalid character
+    dollar_starts, dollar_ends = runs(classes == DOLLAR)
+    for start, end in zip(dollar_starts.tolist(), dollar_ends.tolist()):
+        pair_starts = np.arange(start, end - 1, 2)
+        starts.append(pair_starts)
+        ends.append(pair_starts + 2)
+        codes.append(np.full(len(pair_starts), SEPARATOR_CODE))
+        if (end - start) % 2:
+            errors.append((end - 1, end - 1, "Invalid Character"))
+
+    invalid = np.flatnonzero(classes == OTHER)
+    if len(invalid):
+        errors.append((int(invalid[0]), int(invalid[0]), "Invalid Character"))
+
+    if errors:
+        # Report the error the sequential lexer runs into first
+        _, offset, message = min(errors)
+        line, column = LineIndex(text).position(offset)
+        if message == "Invalid Character":
+            raise SyntaxError(f"Invalid Character '{text[offset]}' at line {line}, column {column}")
+        raise SyntaxError(f"{message} at line {line}, column {column}")
+
+    starts = np.concatenate(starts)
+    order = np.argsort(starts, kind='stable')
+    starts = starts[order].tolist()
+    codes = np.concatenate(codes)[order]
+    lexemes = [text[start:end] for start, end in zip(starts, np.concatenate(ends)[order].tolist())]
+    token_types = np.array(TOKEN_TYPES, dtype=object)[codes].tolist()
+    for index in np.flatnonzero(codes == IDENTIFIER_CODE).tolist():
+        if lexemes[index] in KEYWORD_SET:
+            token_types[index] = TOKEN_KEYWORD
+    return list(map(Token, token_types, lexemes))
@@ -1,8 +1,22 @@
+import contextlib
+import io
+import os
+import tempfile
+
 from lexical_analyzer.lexical_analyzer import Lexer
 from lexical_analyzer.file_handler import FileHandler
+from lexical_analyzer.streaming import StreamingLexer
+from lexical_analyzer.byte_lexer import lex_file_bytes
+from lexical_analyzer.token_cache import cached_token_source
+from lexical_analyzer.constants import ENGINE_FSM, ENGINE_BYTES, TRACE_FULL, TRACE_OFF
+from lexical_analyzer.trace import TraceSink
 from syntax_analyzer.parser import Parser
+from syntax_analyzer.ll_parser import LLParser, PARSER_RECURSIVE, PARSER_LL1
+from syntax_analyzer.trace_log import TraceLog, write_trace_log
 from code_generator.symbol_table import SymbolTable
 from code_generator.code_generator import AssemblyGenerator
+from code_generator.tree_codegen import TreeCodeGenerator
+from code_generator.vm import run_program, MachineError
 
 def create_test_files():
     
@@ -89,26 +103,78 @@ $$"""
     
     print("Test files created successfully.")
     
-def run_syntax_analysis(input_file, output_file):
+def run_syntax_analysis(input_file, output_file, engine=ENGINE_FSM, spans=False, stream=False, cache_dir=None, parser_engine=PARSER_RECURSIVE, build_ast=False, trace=TRACE_FULL, trace_log=None, recover=False, optimize=False, fold_constants=False, inputs=None):
     """
     Run the syntax analyzer and code generator on the input file and output the results
+    engine selects the lexer's scanner engine (see lexical_analyzer.constants)
+    spans makes the lexer produce offset-only tokens with exact error positions
+    stream lexes the file chunk by chunk instead of reading it whole
+    cache_dir keeps lexed token streams there and skips lexing unchanged inputs
+    parser_engine picks the recursive descent Parser or the table-driven LLParser
+    build_ast parses into a syntax tree first and generates code from it in a second pass
+    trace is the trace level of the parser and lexer (see lexical_analyzer.constants)
+    trace_log records the parser trace to that file as a binary log instead of text
+    recover keeps parsing after an error to report every error in one pass
+    optimize runs the peephole optimizer over the code of a program that compiled
+    fold_constants computes constant expressions at compile time (see AssemblyGenerator)
+    inputs runs the code of a program that compiled on the stack machine, with those integers for SIN
     """
-    # Read the input file
-    with open(input_file, 'r') as f:
-        input_text = f.read()
-    
-    # Create a lexer for the input
-    lexer = Lexer(input_text)
+    # Parser and lexer trace lines share one buffered sink, so they stay in order
+    trace_sink = TraceSink()
+    log = TraceLog() if trace_log else None
+    input_stream = None
+    if stream:
+        input_stream = open(input_file, 'r')
+        lexer = StreamingLexer(input_stream)
+    elif cache_dir:
+        lexer = cached_token_source(input_file, engine, cache_dir)
+    elif engine == ENGINE_BYTES:
+        lexer = lex_file_bytes(input_file, trace=trace, trace_sink=trace_sink)
+    else:
+        # Read the input file
+        with open(input_file, 'r') as f:
+            input_text = f.read()
+        
+        # Create a lexer for the input
+        lexer = Lexer(input_text, engine, spans, trace, trace_sink)
     
     # Create symbol table and assembly generator
     symbol_table = SymbolTable()
-    assembly_gen = AssemblyGenerator(symbol_table)
+    assembly_gen = AssemblyGenerator(symbol_table, fold_constants)
     
     # Create a parser and parse the input
-    parser = Parser(lexer, output_file, symbol_table, assembly_gen)
+    parser_class = LLParser if parser_engine == PARSER_LL1 else Parser
+    if build_ast:
+        parser = parser_class(lexer, output_file, symbol_table, None, trace, build_ast=True, trace_sink=trace_sink, trace_log=log, recover=recover)
+    else:
+        parser = parser_class(lexer, output_file, symbol_table, assembly_gen, trace, trace_sink=trace_sink, trace_log=log, recover=recover)
     
     print(f"Parsing {input_file}...")
-    parser.parse()
+    errors = parser.parse()
+    
+    # The tree is only there when the whole program parsed
+    if build_ast and parser.tree is not None:
+        TreeCodeGenerator(symbol_table, assembly_gen).generate(parser.tree)
+    
+    for diagnostic in assembly_gen.diagnostics:
+        print(f"Warning: {diagnostic}")
+    
+    if optimize and not errors:
+        removed = assembly_gen.optimize()
+        print(f"Peephole optimizer removed {removed} instruction(s)")
+    
+    if inputs is not None and not errors:
+        try:
+            print(f"Program output: {run_program(assembly_gen, inputs)}")
+        except MachineError as e:
+            print(f"Run time error: {e}")
+    
+    if input_stream:
+        input_stream.close()
+    
+    if log is not None:
+        with open(trace_log, 'wb') as f:
+            write_trace_log(log, f)
     
     # Print symbol table and assembly code
     symbol_table.print_table()
@@ -154,7 +220,28 @@ def run_tests():
     run_syntax_analysis("test_syntax2.txt", "output_syntax2.txt")
     run_syntax_analysis("test_syntax3.txt", "output_syntax3.txt")
     
+    print(f"Errors read the same through the token cache: {check_cache_errors()}")
+    
     print("All tests completed.")
+
+def check_cache_errors():
+    """
+    Parses a program with a syntax error and a later lexical error with and
+    without a token cache, on a cache miss. Returns True when both report the
+    syntax error, the one the parser meets first.
+    """
+    program = "$$\n$$\ninteger a;\n$$\na = 5 5;\na = 5 @ 3;\n$$\n"
+    reports = []
+    with tempfile.TemporaryDirectory() as directory:
+        input_file = os.path.join(directory, "errors.txt")
+        with open(input_file, "w") as f:
+            f.write(program)
+        for cache_dir in (None, os.path.join(directory, "cache")):
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                run_syntax_analysis(input_file, os.path.join(directory, "output.txt"), cache_dir=cache_dir, trace=TRACE_OFF)
+            reports.append([line for line in output.getvalue().splitlines() if line.startswith("Parsing failed")])
+    return reports[0] == reports[1] == ["Parsing failed: Expected ';' after assignment at line 5, column 7"]
     
 def main():
     """
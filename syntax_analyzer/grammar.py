@@ -0,0 +1,281 @@
+"""
+Grammar description of simplified Rat25S (R1-R26) for the table-driven parser.
+Every rule maps a nonterminal to its alternatives. An alternative lists:
+  - terminals: a lexeme, or one of the token classes below, optionally as
+    (terminal, message) for the error raised when the lookahead does not match
+  - nonterminals: the names used as keys of GRAMMAR
+  - semantic actions: names starting with '#', run when they come off the stack
+The rules are written so the table parser takes exactly the decisions of the
+recursive descent Parser, including where it reports each error.
+"""
+import hashlib
+import json
+import os
+
+# Token classes, matched on the token type rather than the lexeme
+IDENTIFIER = "<identifier>"
+INTEGER = "<integer>"
+END = "<end>"   # No token left
+
+GRAMMAR = {
+    # R1
+    "Rat25S": [
+        [("$$", "Expected '$$' at the beginning of the program"),
+         ("$$", "Expected '$$' after beginning of program"),
+         "OptDeclarationList",
+         ("$$", "Expected '$$' after declarations"),
+         "StatementList",
+         ("$$", "Expected '$$' at the end of the program")],
+    ],
+    # R5
+    "OptDeclarationList": [["DeclarationList"], []],
+    # R6
+    "DeclarationList": [["Declaration", (";", "Expected ';' after declaration"), "DeclarationListTail"]],
+    "DeclarationListTail": [["DeclarationList"], []],
+    # R7, R8
+    "Declaration": [["Qualifier", "IDs", "#end_declaration"]],
+    "Qualifier": [["integer", "#qualifier"], ["boolean", "#qualifier"]],
+    # R10
+    "IDs": [[(IDENTIFIER, "Expected identifier"), "#declare", "IDsTail"]],
+    "IDsTail": [[",", "IDs"], []],
+    # R11
+    "StatementList": [["Statement", "StatementListTail"]],
+    "StatementListTail": [["StatementList"], []],
+    # R12
+    "Statement": [["Compound"], ["Assign"], ["If"], ["Print"], ["Scan"], ["While"]],
+    # R13
+    "Compound": [[("{", "Expected '{' to start compound statement"), "CompoundBody", ("}", "Expected '}' to end compound statement")]],
+    "CompoundBody": [["StatementList"], []],
+    # R14
+    "Assign": [
+        [(IDENTIFIER, "Expected identifier for assignment"), "#assign_target",
+         ("=", "Expected '=' in assignment"), "Expression", "#assign",
+         (";", "Expected ';' after assignment")],
+    ],
+    # R15
+    "If": [
+        [("if", "Expected 'if'"), ("(", "Expected '(' after 'if'"), "Condition", "#start_if",
+         (")", "Expected ')' after condition"), "Statement", "ElsePart",
+         ("endif", "Expected 'endif'"), "#end_if"],
+    ],
+    "ElsePart": [["else", "#else", "Statement"], []],
+    # R17
+    "Print": [
+        [("print", "Expected 'print'"), ("(", "Expected '(' after 'print'"), "Expression",
+         (")", "Expected ')' after expression"), "#print", (";", "Expected ';' after print statement")],
+    ],
+    # R18
+    "Scan": [
+        [("scan", "Expected 'scan'"), ("(", "Expected '(' after 'scan'"), "ScanIDs",
+         (")", "Expected ')' after IDs"), (";", "Expected ';' after scan statement")],
+    ],
+    "ScanIDs": [[(IDENTIFIER, "Expected identifier for scan"), "#scan", "ScanIDsTail"]],
+    "ScanIDsTail": [[",", "ScanIDs"], []],
+    # R19
+    "While": [
+        [("while", "Expected 'while'"), "#start_while", ("(", "Expected '(' after 'while'"), "Condition",
+         "#while_condition", (")", "Expected ')' after condition"), "Statement", "#end_while",
+         ("endwhile", "Expected 'endwhile'")],
+    ],
+    # R20, R21
+    "Condition": [["Expression", "Relop", "Expression", "#condition"]],
+    "Relop": [[relop, "#operator"] for relop in ["==", "!=", ">", "<", "<=", ">="]],
+    # R22, R23, left factored so operator chains group from the left
+    "Expression": [["Term", "ExpressionTail"]],
+    "ExpressionTail": [["+", "#operator", "Term", "#operation", "ExpressionTail"],
+                       ["-", "#operator", "Term", "#operation", "ExpressionTail"],
+                       []],
+    "Term": [["Factor", "TermTail"]],
+    "TermTail": [["*", "#operator", "Factor", "#operation", "TermTail"],
+                 ["/", "#operator", "Factor", "#operation", "TermTail"],
+                 []],
+    # R24, R25
+    "Factor": [["-", "Primary", "#negate"], ["Primary"]],
+    "Primary": [
+        [IDENTIFIER, "#identifier"],
+        [INTEGER, "#integer"],
+        ["(", "Expression", (")", "Expected ')' after expression")],
+        ["true", "#true"],
+        ["false", "#false"],
+    ],
+}
+
+START = "Rat25S"
+
+# Alternative taken on a lookahead the table has no entry for. Like the recursive
+# Parser, these rules only look for what starts their other alternatives and
+# leave anything else to the default. Single alternative rules default to it.
+DEFAULTS = {
+    "OptDeclarationList": 1,
+    "DeclarationListTail": 1,
+    "IDsTail": 1,
+    "StatementListTail": 0,
+    "CompoundBody": 0,
+    "ElsePart": 1,
+    "ScanIDsTail": 1,
+    "ExpressionTail": 2,
+    "TermTail": 2,
+    "Factor": 1,
+}
+
+# Errors for rules without a default: (message, message at the end of input)
+ERRORS = {
+    "Qualifier": ("Expected 'integer' or 'boolean'", "Expected 'integer' or 'boolean'"),
+    "Statement": ("Invalid statement starting with '{lexeme}'", "Unexpected end of input in statement"),
+    "Relop": ("Expected relational operator", "Expected relational operator"),
+    "Primary": ("Invalid primary: {lexeme}", "Unexpected end of input in primary"),
+}
+
+# Production printed once a rule is done, for the rules the Parser traces
+PRODUCTIONS = {
+    "Rat25S": "<Rat25S> -> $$ $$ <Opt Declaration List> $$ <Statement List> $$",
+    "OptDeclarationList": "<Opt Declaration List> -> <Declaration List> | <Empty>",
+    "DeclarationList": "<Declaration List> -> <Declaration> ; | <Declaration> ; <Declaration List>",
+    "Declaration": "<Declaration> -> <Qualifier> <IDs>",
+    "Qualifier": "<Qualifier> -> integer | boolean",
+    "IDs": "<IDs> -> <Identifier> | <Identifier>, <IDs>",
+    "StatementList": "<Statement List> -> <Statement> | <Statement> <Statement List>",
+    "Statement": "<Statement> -> <Compound> | <Assign> | <If> | <Return> | <Print> | <Scan> | <While>",
+    "Compound": "<Compound> -> { <Statement List> }",
+    "Assign": "<Assign> -> <Identifier> = <Expression> ;",
+    "If": "<If> -> if ( <Condition> ) <Statement> endif | if ( <Condition> ) <Statement> else <Statement> endif",
+    "Print": "<Print> -> print ( <Expression> ) ;",
+    "Scan": "<Scan> -> scan ( <IDs> ) ;",
+    "While": "<While> -> while ( <Condition> ) <Statement> endwhile",
+    "Condition": "<Condition> -> <Expression> <Relop> <Expression>",
+    "Relop": "<Relop> -> == | != | > | < | <= | >=",
+}
+
+# Bumped whenever the way tables are built changes, invalidating cached tables
+TABLE_VERSION = 1
+
+DEFAULT_TABLE_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "__pycache__")
+
+
+def is_action(symbol):
+    return isinstance(symbol, str) and symbol.startswith("#")
+
+
+def is_nonterminal(symbol):
+    return isinstance(symbol, str) and symbol in GRAMMAR
+
+
+def terminal_of(symbol):
+    """
+    Returns the terminal of a (terminal, message) pair or a bare terminal.
+    """
+    return symbol[0] if isinstance(symbol, tuple) else symbol
+
+
+def first_of(symbols, first, nullable):
+    """
+    Returns (FIRST set, nullable) of a sequence of symbols.
+    """
+    result = set()
+    for symbol in symbols:
+        if is_action(symbol):
+            continue
+        if is_nonterminal(symbol):
+            result |= first[symbol]
+            if symbol not in nullable:
+                return result, False
+        else:
+            result.add(terminal_of(symbol))
+            return result, False
+    return result, True
+
+
+def first_sets():
+    """
+    Computes FIRST of every nonterminal and the set of nullable nonterminals.
+    """
+    first = {nonterminal: set() for nonterminal in GRAMMAR}
+    nullable = set()
+    changed = True
+    while changed:
+        changed = False
+        for nonterminal, alternatives in GRAMMAR.items():
+            for alternative in alternatives:
+                symbols, empty = first_of(alternative, first, nullable)
+                if not symbols <= first[nonterminal]:
+                    first[nonterminal] |= symbols
+                    changed = True
+                if empty and nonterminal not in nullable:
+                    nullable.add(nonterminal)
+                    changed = True
+    return first, nullable
+
+
+def follow_sets(first, nullable):
+    """
+    Computes FOLLOW of every nonterminal.
+    """
+    follow = {nonterminal: set() for nonterminal in GRAMMAR}
+    follow[START].add(END)
+    changed = True
+    while changed:
+        changed = False
+        for nonterminal, alternatives in GRAMMAR.items():
+            for alternative in alternatives:
+                for index, symbol in enumerate(alternative):
+                    if not is_nonterminal(symbol):
+                        continue
+                    symbols, empty = first_of(alternative[index + 1:], first, nullable)
+                    if empty:
+                        symbols |= follow[nonterminal]
+                    if not symbols <= follow[symbol]:
+                        follow[symbol] |= symbols
+                        changed = True
+    return follow
+
+
+def predict_table():
+    """
+    Builds the LL(1) table: nonterminal -> {lookahead terminal: alternative index}.
+    A nullable rule also takes its empty alternative at the end of input, the way
+    the Parser's "self.current_token and ..." checks fall through to it.
+    """
+    first, nullable = first_sets()
+    follow = follow_sets(first, nullable)
+    table = {}
+    for nonterminal, alternatives in GRAMMAR.items():
+        row = table[nonterminal] = {}
+        for index, alternative in enumerate(alternatives):
+            symbols, empty = first_of(alternative, first, nullable)
+            if empty:
+                symbols |= follow[nonterminal] | {END}
+            for terminal in symbols:
+                if row.setdefault(terminal, index) != index:
+                    raise ValueError(f"Grammar is not LL(1): {nonterminal} has two alternatives for '{terminal}'")
+    return table
+
+
+def grammar_key():
+    """
+    Hash of everything the tables are built from.
+    """
+    description = repr((TABLE_VERSION, START, GRAMMAR)).encode()
+    return hashlib.sha256(description).hexdigest()[:16]
+
+
+def load_table(cache_dir=DEFAULT_TABLE_CACHE):
+    """
+    Returns the predict table, read from cache_dir when it was built for this grammar.
+    """
+    path = os.path.join(cache_dir, f"ll1_table_{grammar_key()}.json")
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        pass
+
+    table = predict_table()
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        temporary = f"{path}.{os.getpid()}"
+        with open(temporary, 'w') as file:
+            json.dump(table, file)
+        os.replace(temporary, path)
+    except OSError:
+        pass    # A read-only install just builds the table every time
+    return table
@@ -0,0 +1,164 @@
+"""
+Incremental compilation of a Rat25S source as it is edited.
+The compiled program is kept split into its top-level statements, each with
+the tokens it was parsed from and the instructions generated for it. An edit
+re-lexes only around the edited text (see lexical_analyzer.incremental), then
+only the statements whose tokens changed are parsed and generated again; the
+instructions after them are shifted and their jump targets moved with them.
+"""
+from bisect import bisect_right
+
+from lexical_analyzer.incremental import IncrementalLexer
+from lexical_analyzer.lexical_analyzer import Lexer
+from lexical_analyzer.lookahead import ListLookahead
+from lexical_analyzer.constants import ENGINE_PATTERN, TRACE_OFF
+from syntax_analyzer.parser import Parser, ParseError, KIND_DOLLARS
+from code_generator.symbol_table import SymbolTable
+from code_generator.code_generator import AssemblyGenerator
+
+
+class IncrementalCompiler:
+    """
+    Keeps symbol_table and assembly_gen up to date with the source as it is edited.
+    token_marks and code_marks hold the statement boundaries: top-level statement
+    i was parsed from tokens token_marks[i] to token_marks[i + 1] and generated
+    instructions code_marks[i] to code_marks[i + 1]. The last marks are the
+    closing $$ and the end of the code.
+    Edits to the declarations, the $$ separators or anything that does not
+    compile fall back to compiling the whole source, which reports the error.
+    """
+    def __init__(self, text, engine=ENGINE_PATTERN):
+        try:
+            self.lexer = IncrementalLexer(text, engine)
+        except SyntaxError:
+            # compile() reports the error, and the next edit lexes the whole source again
+            self.lexer = IncrementalLexer("", engine)
+            self.lexer.reset(text)
+        self.compile()
+
+    @property
+    def text(self):
+        return self.lexer.text
+
+    def compile(self):
+        """
+        Compiles the whole source from scratch. Returns the errors, empty on success.
+        """
+        self.symbol_table = SymbolTable()
+        self.assembly_gen = AssemblyGenerator(self.symbol_table)
+        self.token_marks = []
+        self.code_marks = []
+        self.errors = []
+        self.valid = False
+
+        marks = []
+        try:
+            # A fresh lexer rather than the token list, so errors get their line and column
+            parser = Parser(Lexer(self.text, self.lexer.engine, trace=TRACE_OFF), None,
+                            self.symbol_table, self.assembly_gen, TRACE_OFF)
+            parser.statement_marks = marks
+            parser.rat25s()
+        except ParseError:
+            self.errors = parser.errors
+            return self.errors
+        except SyntaxError as e:
+            self.errors = [str(e)]
+            return self.errors
+
+        self.token_marks = [token_index for token_index, _ in marks]
+        self.code_marks = [instruction for _, instruction in marks]
+        self.valid = True
+        return self.errors
+
+    def apply_edits(self, edits):
+        """
+        Applies edits in order, each (offset, removed length, inserted text) as
+        for IncrementalLexer.apply_edits. Returns the errors, empty on success.
+        """
+        for offset, removed, inserted in edits:
+            self.apply_edit(offset, removed, inserted)
+        return self.errors
+
+    def apply_edit(self, offset, removed, inserted):
+        try:
+            self.lexer.apply_edit(offset, removed, inserted)
+        except SyntaxError:
+            return self.compile()
+
+        if not self.valid or self.lexer.changed is None:
+            return self.compile()
+        first, last, count = self.lexer.changed
+        marks = self.token_marks
+        if first > marks[-1]:
+            return self.errors  # Past the closing $$, nothing there is compiled
+        if first < marks[0] or last > marks[-1]:
+            return self.compile()
+        if first == last and count == 0:
+            return self.errors  # Only whitespace or comments changed
+
+        if not self.recompile(first, last, count):
+            return self.compile()
+        return self.errors
+
+    def recompile(self, first, last, count):
+        """
+        Parses and generates again the statements from the one holding token first
+        until the new tokens line up with an old statement boundary past the edit.
+        Returns False when that cannot be done statement by statement.
+        """
+        marks = self.token_marks
+        token_delta = count - (last - first)
+        changed_end = first + count
+
+        # Statements are self-delimiting, so the one holding the first changed token is the first to redo
+        start = bisect_right(marks, first) - 1
+        position = marks[start]
+        new_marks = [position]
+        new_code_marks = [1]
+
+        assembly_gen = AssemblyGenerator(self.symbol_table)
+        parser = Parser(ListLookahead(self.lexer.tokens, position), None,
+                        self.symbol_table, assembly_gen, TRACE_OFF)
+        resume = start
+        try:
+            while True:
+                if position >= changed_end:
+                    # Old tokens from here on are unchanged, an old boundary here ends the work
+                    old = position - token_delta
+                    while resume < len(marks) and marks[resume] < old:
+                        resume += 1
+                    if resume < len(marks) and marks[resume] == old:
+                        break
+                token = parser.current_token
+                if token is None or token.kind == KIND_DOLLARS:
+                    return False
+                parser.run_rules(parser.statement())
+                position = new_marks[0] + parser.token_index
+                new_marks.append(position)
+                new_code_marks.append(assembly_gen.get_next_instruction())
+        except (ParseError, SyntaxError):
+            return False
+
+        # The statement list needs at least one statement left
+        if len(marks) - 1 - (resume - start) + len(new_marks) - 1 == 0:
+            return False
+
+        code_marks = self.code_marks
+        code_start = code_marks[start]
+        code_delta = (new_code_marks[-1] - 1) - (code_marks[resume] - code_start)
+        self.assembly_gen.replace_instructions(code_start, code_marks[resume], assembly_gen, code_start - 1)
+
+        # Statements after the edit keep their marks, moved by the change in length
+        self.token_marks[start:resume + 1] = new_marks
+        self.code_marks[start:resume + 1] = [code_start + mark - 1 for mark in new_code_marks]
+        if token_delta or code_delta:
+            for index in range(start + len(new_marks), len(self.token_marks)):
+                self.token_marks[index] += token_delta
+                self.code_marks[index] += code_delta
+        return True
+
+    def instructions(self):
+        """
+        Returns the generated instructions, in order.
+        """
+        return self.assembly_gen.instructions[1:self.assembly_gen.get_next_instruction()]
@@ -0,0 +1,254 @@
+from lexical_analyzer.constants import KIND_IDENTIFIER, KIND_INTEGER, KIND_CODES
+from syntax_analyzer.parser import Parser
+from syntax_analyzer.grammar import (
+    GRAMMAR, START, DEFAULTS, ERRORS, PRODUCTIONS, IDENTIFIER, INTEGER, END,
+    DEFAULT_TABLE_CACHE, is_action, is_nonterminal, terminal_of, load_table
+)
+
+# Parse engines selectable in run_syntax_analysis
+PARSER_RECURSIVE = "recursive"
+PARSER_LL1 = "ll1"
+
+# Stack entries are (kind, argument, message) tuples
+EXPAND, MATCH, ACTION, PRODUCTION = range(4)
+
+# Lookahead once the tokens run out, no token has a negative kind
+KIND_END = -1
+
+
+def terminal_kind(terminal):
+    """
+    Returns the token kind code a grammar terminal is matched on.
+    """
+    if terminal == IDENTIFIER:
+        return KIND_IDENTIFIER
+    if terminal == INTEGER:
+        return KIND_INTEGER
+    if terminal == END:
+        return KIND_END
+    return KIND_CODES[terminal]
+
+
+class LLParser(Parser):
+    """
+    Table-driven LL(1) parser for the same language as Parser.
+    Rules come from syntax_analyzer.grammar and are expanded on an explicit
+    stack; semantic actions call the same SymbolTable and AssemblyGenerator
+    hooks in the same order, so the trace and the generated code are identical.
+    """
+    rows = None     # nonterminal -> {lookahead kind: stack entries}
+    defaults = None  # nonterminal -> stack entries for any other lookahead
+
+    def __init__(self, lexer, output_file=None, symbol_table=None, assembly_gen=None, debug=None, build_ast=False, trace_sink=None, trace_log=None, recover=False):
+        if build_ast:
+            raise ValueError("The table-driven parser does not build syntax trees, use Parser")
+        if recover:
+            raise ValueError("The table-driven parser does not recover from errors, use Parser")
+        super().__init__(lexer, output_file, symbol_table, assembly_gen, debug, trace_sink=trace_sink, trace_log=trace_log)
+        if LLParser.rows is None:
+            LLParser.compile_table()
+        self.values = []    # Types, operators and jump addresses passed between actions
+        self.previous_token = None
+
+    @classmethod
+    def compile_table(cls, cache_dir=DEFAULT_TABLE_CACHE):
+        """
+        Turns the predict table into ready to push stack entries, once per process.
+        """
+        table = load_table(cache_dir)
+        entries = {nonterminal: [cls.stack_entries(nonterminal, alternative) for alternative in alternatives]
+                   for nonterminal, alternatives in GRAMMAR.items()}
+        cls.rows = {nonterminal: {terminal_kind(terminal): entries[nonterminal][index] for terminal, index in row.items()}
+                    for nonterminal, row in table.items()}
+        cls.defaults = {}
+        for nonterminal, alternatives in GRAMMAR.items():
+            index = DEFAULTS.get(nonterminal, 0 if len(alternatives) == 1 else None)
+            cls.defaults[nonterminal] = None if index is None else entries[nonterminal][index]
+
+    @classmethod
+    def stack_entries(cls, nonterminal, alternative):
+        """
+        Stack entries for one alternative, in push order (last symbol first).
+        """
+        entries = []
+        if nonterminal in PRODUCTIONS:
+            entries.append((PRODUCTION, PRODUCTIONS[nonterminal], None))
+        for symbol in reversed(alternative):
+            if is_action(symbol):
+                entries.append((ACTION, getattr(cls, f"action_{symbol[1:]}"), None))
+            elif is_nonterminal(symbol):
+                entries.append((EXPAND, symbol, None))
+            else:
+                message = symbol[1] if isinstance(symbol, tuple) else f"Expected '{symbol}'"
+                entries.append((MATCH, terminal_kind(terminal_of(symbol)), message))
+        return tuple(entries)
+
+    def lookahead(self):
+        """
+        Returns the kind code of the current token, KIND_END past the last one.
+        """
+        token = self.current_token
+        return KIND_END if token is None else token.kind
+
+    def rat25s(self):
+        """
+        Runs the LL(1) table from the start rule instead of the recursive rule methods.
+        """
+        rows = self.rows
+        defaults = self.defaults
+        stack = [(EXPAND, START, None)]
+        pop = stack.pop
+        push = stack.extend
+        lookahead = self.lookahead()
+
+        while stack:
+            kind, argument, message = pop()
+            if kind == MATCH:
+                if lookahead != argument:
+                    self.error(message)
+                self.previous_token = self.match()
+                lookahead = self.lookahead()
+            elif kind == EXPAND:
+                entries = rows[argument].get(lookahead)
+                if entries is None:
+                    entries = defaults[argument]
+                    if entries is None:
+                        self.rule_error(argument)
+                push(entries)
+            elif kind == ACTION:
+                argument(self)
+            elif self.trace_productions:
+                self.print_production(argument)
+
+    def rule_error(self, nonterminal):
+        message, end_message = ERRORS[nonterminal]
+        if self.current_token is None:
+            self.error(end_message)
+        self.error(message.format(lexeme=self.current_token.lexeme))
+
+    #=========================
+    # SEMANTIC ACTIONS
+    #=========================
+
+    def action_qualifier(self):
+        self.values.append(self.previous_token.lexeme)
+
+    def action_declare(self):
+        if self.symbol_table:
+            try:
+                self.symbol_table.insert(self.previous_token.lexeme, self.values[-1])
+            except Exception as e:
+                self.error(str(e))
+
+    def action_end_declaration(self):
+        self.values.pop()
+
+    def action_assign_target(self):
+        identifier = self.previous_token.lexeme
+        identifier_type = None
+        if self.symbol_table:
+            try:
+                identifier_type = self.symbol_table.get_type(identifier)
+            except Exception as e:
+                self.error(str(e))
+        self.values.append((identifier, identifier_type))
+
+    def action_assign(self):
+        expr_type = self.values.pop()
+        identifier, identifier_type = self.values.pop()
+        if self.symbol_table and not self.symbol_table.check_type_compatibility(identifier_type, expr_type):
+            self.error(f"Type mismatch in assignment: Cannot assign {expr_type} to {identifier_type}")
+        if self.assembly_gen:
+            self.assembly_gen.gen_assignment(identifier)
+
+    def action_start_if(self):
+        self.values.append(self.assembly_gen.start_if_statement() if self.assembly_gen else None)
+
+    def action_else(self):
+        if_jmp_addr = self.values.pop()
+        self.values.append(self.assembly_gen.else_statement(if_jmp_addr) if self.assembly_gen else if_jmp_addr)
+
+    def action_end_if(self):
+        else_jmp_addr = self.values.pop()
+        if self.assembly_gen:
+            self.assembly_gen.end_if_statement(else_jmp_addr)
+
+    def action_print(self):
+        self.values.pop()
+        if self.assembly_gen:
+            self.assembly_gen.gen_stdout()
+
+    def action_scan(self):
+        identifier = self.previous_token.lexeme
+        if self.symbol_table:
+            try:
+                self.symbol_table.get_type(identifier)  # This will raise an error if not found
+                if self.assembly_gen:
+                    self.assembly_gen.gen_scan(identifier)
+            except Exception as e:
+                self.error(str(e))
+
+    def action_start_while(self):
+        self.values.append(self.assembly_gen.start_while_loop() if self.assembly_gen else None)
+
+    def action_while_condition(self):
+        self.values.append(self.assembly_gen.while_condition() if self.assembly_gen else None)
+
+    def action_end_while(self):
+        condition_jmp = self.values.pop()
+        loop_start = self.values.pop()
+        if self.assembly_gen:
+            self.assembly_gen.end_while_loop(loop_start, condition_jmp)
+
+    def action_operator(self):
+        self.values.append(self.previous_token.lexeme)
+
+    def action_condition(self):
+        expr2_type = self.values.pop()
+        relop = self.values.pop()
+        expr1_type = self.values.pop()
+        if self.symbol_table and not self.symbol_table.check_type_compatibility(expr1_type, expr2_type):
+            self.error(f"Type mismatch in condition: Cannot compare {expr1_type} with {expr2_type}")
+        if self.assembly_gen:
+            self.assembly_gen.gen_relational(relop)
+
+    def action_operation(self):
+        right_type = self.values.pop()
+        operator = self.values.pop()
+        self.values.append(right_type)
+        # Same type check and code as the precedence climbing Parser, the left type is kept
+        self.apply_operator(operator, self.values)
+
+    def action_negate(self):
+        if self.symbol_table and self.values[-1] == "boolean":
+            self.error("Cannot apply unary minus to boolean value")
+        if self.assembly_gen:
+            self.assembly_gen.gen_pushi(-1)
+            self.assembly_gen.gen_mul()
+
+    def action_identifier(self):
+        identifier = self.previous_token.lexeme
+        identifier_type = "unknown"     # Default type if no symbol table
+        if self.symbol_table:
+            try:
+                identifier_type = self.symbol_table.get_type(identifier)
+                if self.assembly_gen:
+                    self.assembly_gen.gen_pushm(self.symbol_table.get_address(identifier))
+            except Exception as e:
+                self.error(str(e))
+        self.values.append(identifier_type)
+
+    def action_integer(self):
+        if self.assembly_gen:
+            self.assembly_gen.gen_pushi(self.previous_token.lexeme)
+        self.values.append("integer")
+
+    def action_true(self):
+        if self.assembly_gen:
+            self.assembly_gen.gen_pushi(1)
+        self.values.append("boolean")
+
+    def action_false(self):
+        if self.assembly_gen:
+            self.assembly_gen.gen_pushi(0)
+        self.values.append("boolean")
@@ -1,21 +1,93 @@
 from lexical_analyzer.lexical_analyzer import Lexer
-from lexical_analyzer.token import Token
+from lexical_analyzer.token import Token, SpanToken
+from lexical_analyzer.lookahead import token_lookahead
+from lexical_analyzer.trace import TraceSink, trace_level
 from lexical_analyzer.constants import (
-    TOKEN_KEYWORD, TOKEN_IDENTIFIER, TOKEN_INTEGER, 
-    TOKEN_REAL, TOKEN_OPERATOR, TOKEN_SEPARATOR
+    TOKEN_KEYWORD, TOKEN_REAL, TOKEN_OPERATOR, TOKEN_SEPARATOR,
+    TRACE_LEVELS, TRACE_PRODUCTIONS, TRACE_TOKENS,
+    TOKEN_KINDS, KIND_CODES, KIND_IDENTIFIER, KIND_INTEGER, KIND_REAL
 )
+from syntax_analyzer.syntax_tree import (
+    Program, Declaration, Compound, Assign, If, While, Print, Scan,
+    Condition, BinaryOp, Negate, Identifier, Integer, Boolean
+)
+
+# Kind codes of the keywords, operators and separators the rules look for
+KIND_DOLLARS = KIND_CODES["$$"]
+KIND_SEMICOLON = KIND_CODES[";"]
+KIND_COMMA = KIND_CODES[","]
+KIND_ASSIGN = KIND_CODES["="]
+KIND_LEFT_PAREN = KIND_CODES["("]
+KIND_RIGHT_PAREN = KIND_CODES[")"]
+KIND_LEFT_BRACE = KIND_CODES["{"]
+KIND_RIGHT_BRACE = KIND_CODES["}"]
+KIND_MINUS = KIND_CODES["-"]
+KIND_IF = KIND_CODES["if"]
+KIND_ELSE = KIND_CODES["else"]
+KIND_ENDIF = KIND_CODES["endif"]
+KIND_WHILE = KIND_CODES["while"]
+KIND_ENDWHILE = KIND_CODES["endwhile"]
+KIND_PRINT = KIND_CODES["print"]
+KIND_SCAN = KIND_CODES["scan"]
+KIND_TRUE = KIND_CODES["true"]
+KIND_FALSE = KIND_CODES["false"]
+
+# Kind -> type name of the R8 qualifiers
+QUALIFIERS = {KIND_CODES["integer"]: "integer", KIND_CODES["boolean"]: "boolean"}
+
+# Kind -> relational operator passed to the code generator
+RELOPS = {KIND_CODES[relop]: relop for relop in ["==", "!=", ">", "<", "<=", ">="]}
+
+# Binding power of each arithmetic operator, higher binds tighter
+BINDING_POWERS = {"+": 1, "-": 1, "*": 2, "/": 2}
+
+# Kind -> (operator, binding power) of the arithmetic operators
+ARITHMETIC = {KIND_CODES[operator]: (operator, power) for operator, power in BINDING_POWERS.items()}
+
+# Kinds of the tokens panic mode error recovery skips ahead to
+SYNC_KINDS = {KIND_SEMICOLON, KIND_RIGHT_BRACE, KIND_ENDIF, KIND_ENDWHILE, KIND_DOLLARS}
+
+# Kinds of the closing tokens and the statement rule that matches each of them
+CLOSERS = {KIND_RIGHT_BRACE: "compound", KIND_ENDIF: "if_statement", KIND_ENDWHILE: "while_statement"}
+
+class ParseError(Exception):
+    """
+    Raised by Parser.error for a syntax or semantic error in the program.
+    """
 
 class Parser:
     """
-    Initializes the parser with a lexer and an optional output file.
+    Initializes the parser with a lexer (or a TokenBuffer) and an optional output file.
+    Tokens are read through a lookahead buffer, so peek(k) can look past the current token.
+    With build_ast the parser also builds a syntax tree in self.tree, so code can be
+    generated from it in a separate pass (see code_generator.tree_codegen).
+    debug is the trace level (see lexical_analyzer.constants), True or None for full and
+    False for off. Trace lines go to the output file and to trace_sink, a TraceSink
+    that batches them to stdout unless one is given. With a trace_log (see
+    syntax_analyzer.trace_log) the trace is recorded there as binary events instead.
+    With recover, errors in declarations and statements are recorded and parsing
+    resumes after the next synchronizing token, so one parse reports them all.
     """
-    def __init__(self, lexer, output_file=None, symbol_table=None, assembly_gen=None, debug=None):
-        self.lexer = lexer
+    def __init__(self, lexer, output_file=None, symbol_table=None, assembly_gen=None, debug=None, build_ast=False, trace_sink=None, trace_log=None, recover=False):
+        # A live lexer fills a ring buffer in batches, a TokenBuffer is read in place
+        self.lexer = token_lookahead(lexer)
         self.current_token = self.lexer.get_next_token()
         self.output_file = None
-        self.debug = True
+        level = trace_level(debug)
+        self.trace_level = TRACE_LEVELS[level]
+        self.trace_productions = level >= TRACE_LEVELS.index(TRACE_PRODUCTIONS)
+        self.debug = level >= TRACE_LEVELS.index(TRACE_TOKENS)     # Tokens are traced in match()
+        self.trace_sink = trace_sink if trace_sink is not None else TraceSink()
+        self.trace_log = trace_log
+        self.token_index = 0    # Number of tokens matched so far
         self.symbol_table = symbol_table
         self.assembly_gen = assembly_gen
+        self.build_ast = build_ast
+        self.nodes = []     # Finished tree nodes waiting for the rule that contains them
+        self.tree = None    # Program node, set once the whole program has parsed
+        self.recover = recover
+        self.errors = []    # Every error reported, in order
+        self.statement_marks = None     # (token index, instruction) around top-level statements, when a list
         
         if output_file:
             self.output_file = open(output_file, 'w')
@@ -28,75 +100,124 @@ class Parser:
             
     def error(self, message="Syntax error"):
         """
-        Raises an error with a message and the current line and column of the lexer.
+        Raises an error with a message and the line and column the current token starts at.
+        Span tokens know exactly where they start; for other tokens it is worked back
+        from the lexer's position, which is just past the current token. A plain
+        list of Tokens has no positions, so the message has none either.
         """
-        error_msg = f"{message} at line {self.lexer.line}, column {self.lexer.column}"
+        if isinstance(self.current_token, SpanToken):
+            line, column = self.current_token.position()
+            error_msg = f"{message} at line {line}, column {column}"
+        elif self.lexer.positions:
+            line, column = self.lexer.line, self.lexer.column
+            if self.current_token:
+                # The lexer stops right after the current token, which never spans lines
+                column -= len(self.current_token.lexeme)
+            error_msg = f"{message} at line {line}, column {column}"
+        else:
+            error_msg = message
         error_msg += f"\nUnexpected token: {self.current_token}"
         
         if self.output_file:
             self.output_file.write(f"Error: {error_msg}\n")
         
-        raise Exception(error_msg)
+        # Whatever follows the first error is not compiled
+        self.errors.append(error_msg)
+        self.assembly_gen = None
+        self.build_ast = False
+        
+        raise ParseError(error_msg)
     
     def print_production(self, production):
         """
         Prints production rule that is being used.
         """
+        if self.trace_log is not None:
+            self.trace_log.production(production, self.token_index, self.lexer.line)
+            return
+        
         output_str = (f"\tProduction: {production}")
         
         if self.output_file:
             self.output_file.write(f"{output_str}\n")
                 
-        print(output_str)
+        self.trace_sink.write(output_str)
             
     def print_token(self):
         """
         Prints the current token and lexemme
         """
         
+        if self.trace_log is not None:
+            self.trace_log.token(self.token_index, self.lexer.line)
+            return
+        
         if self.current_token:
             output_str = f"Token: {self.current_token.token_type}, Lexeme: {self.current_token.lexeme}"
             
             if self.output_file:
                 self.output_file.write(f"{output_str}\n")
             
-            print(output_str)
+            self.trace_sink.write(output_str)
     
-    def match(self, token_type=None, lexeme=None):
+    def peek(self, k=1):
         """
-        Matches the current token with the expected token type and lexeme.
+        Returns the token k positions after the current token, or None past the end.
         """
-        
-        if self.current_token is None:
+        return self.lexer.peek(k)
+    
+    def match(self, kind=None):
+        """
+        Matches the current token with the expected kind code (see lexical_analyzer.constants).
+        """
+        current_token = self.current_token
+        if current_token is None:
             self.error("Unexpected end of input")
             
         if self.debug:
             self.print_token()
         
-        if token_type and self.current_token.token_type != token_type:
-            self.error(f"Expected token type {token_type}, but got {self.current_token.token_type}")
-            
-        if lexeme and self.current_token.lexeme != lexeme:
-            self.error(f"Expected lexeme {lexeme}, but got {self.current_token.lexeme}")
+        # One integer comparison per token, the names are only looked up for the error
+        if kind is not None and current_token.kind != kind:
+            if kind <= KIND_REAL:
+                self.error(f"Expected token type {TOKEN_KINDS[kind]}, but got {current_token.token_type}")
+            self.error(f"Expected lexeme {TOKEN_KINDS[kind]}, but got {current_token.lexeme}")
             
-        current_token = self.current_token
         self.current_token = self.lexer.get_next_token()
+        self.token_index += 1
         return current_token
         
     def parse(self):
         """
         Starts the parsing process from the top-level rule <Rat25S>.
+        Returns the errors found, empty when parsing succeeded.
         """
         
         try:
             self.rat25s()
+        except Exception as e:
+            self.trace_sink.flush()
+            if not isinstance(e, ParseError):
+                self.errors.append(str(e))
+            if not self.recover:
+                print(f"Parsing failed: {e}")
+                if self.output_file:
+                    self.output_file.write(f"Parsing failed: {e}\n")
+                return self.errors
+        
+        self.trace_sink.flush()
+        if self.errors:
+            summary = f"Parsing failed with {len(self.errors)} error(s)"
+            print(summary)
+            for error_msg in self.errors:
+                print(f"Error: {error_msg}")
+            if self.output_file:
+                self.output_file.write(f"{summary}\n")
+        else:
             print("Parsing completed successfully!")
             if self.output_file:
                 self.output_file.write("Parsing completed successfully!\n")
-        except Exception as e:
-            print(f"Parsing failed: {e}")
-            if self.output_file:
-                self.output_file.write(f"Parsing failed: {e}\n")
+        return self.errors
         
     def rat25s(self):
         """
@@ -105,15 +226,15 @@ class Parser:
         Modified to: <Rat25S> ::= $$ $$ <Opt Declaration List> $$ <Statement List> $$
         """
         # Match the first $$
-        if self.current_token and self.current_token.lexeme == "$$":
-            self.match(lexeme="$$")
+        if self.current_token and self.current_token.kind == KIND_DOLLARS:
+            self.match(KIND_DOLLARS)
         else:
             self.error("Expected '$$' at the beginning of the program")
         
         # For simplified Rat25S, we skip function definitions
         # Just match the second $$
-        if self.current_token and self.current_token.lexeme == "$$":
-            self.match(lexeme="$$")
+        if self.current_token and self.current_token.kind == KIND_DOLLARS:
+            self.match(KIND_DOLLARS)
         else:
             self.error("Expected '$$' after beginning of program")
         
@@ -121,47 +242,76 @@ class Parser:
         self.opt_declaration_list()
         
         # Match the third $$
-        if self.current_token and self.current_token.lexeme == "$$":
-            self.match(lexeme="$$")
+        if self.current_token and self.current_token.kind == KIND_DOLLARS:
+            self.match(KIND_DOLLARS)
         else:
             self.error("Expected '$$' after declarations")
         
         # Parse statement list
-        self.statement_list()
+        self.mark_statement()
+        self.run_rules(self.statement_list(top_level=True))
         
         # Match the fourth $$
-        if self.current_token and self.current_token.lexeme == "$$":
-            self.match(lexeme="$$")
+        if self.current_token and self.current_token.kind == KIND_DOLLARS:
+            self.match(KIND_DOLLARS)
         else:
             self.error("Expected '$$' at the end of the program")
 
-        self.print_production("<Rat25S> -> $$ $$ <Opt Declaration List> $$ <Statement List> $$")
+        if self.build_ast:
+            statements = self.nodes.pop()
+            self.tree = Program(self.nodes.pop(), statements)
+
+        if self.trace_productions:
+            self.print_production("<Rat25S> -> $$ $$ <Opt Declaration List> $$ <Statement List> $$")
         
     def opt_declaration_list(self):
         """
         R5. <Opt Declaration List> ::= <Declaration List> | <Empty>
         """
-        if self.current_token and self.current_token.lexeme in ["integer", "boolean"]:
+        if self.current_token and self.current_token.kind in QUALIFIERS:
             self.declaration_list()
+        elif self.build_ast:
+            self.nodes.append(())
         # else: Empty production, do nothing
         
-        self.print_production("<Opt Declaration List> -> <Declaration List> | <Empty>")
+        if self.trace_productions:
+            self.print_production("<Opt Declaration List> -> <Declaration List> | <Empty>")
         
     def declaration_list(self):
         """
         R6. <Declaration List> ::= <Declaration> ; | <Declaration> ; <Declaration List>
+        Parsed in a loop; the production is printed once per declaration at the end,
+        as the nested rules would have.
         """
-        self.declaration()
-        
-        if self.current_token and self.current_token.lexeme == ";":
-            self.match(lexeme=";")
-        else:
-            self.error("Expected ';' after declaration")
+        count = 0
+        while True:
+            try:
+                self.declaration()
+                count += 1
+                
+                if self.current_token and self.current_token.kind == KIND_SEMICOLON:
+                    self.match(KIND_SEMICOLON)
+                else:
+                    self.error("Expected ';' after declaration")
+            except ParseError:
+                # Panic mode: drop the rest of the declaration
+                if not self.recover:
+                    raise
+                self.skip_until(SYNC_KINDS)
+                if self.current_token is None:
+                    raise
+                if self.current_token.kind == KIND_SEMICOLON:
+                    self.skip_token()
+            
+            if not (self.current_token and self.current_token.kind in QUALIFIERS):
+                break
         
-        if self.current_token and self.current_token.lexeme in ["integer", "boolean"]:
-            self.declaration_list()
+        if self.build_ast:
+            self.collect(count)
             
-        self.print_production("<Declaration List> -> <Declaration> ; | <Declaration> ; <Declaration List>")
+        if self.trace_productions:
+            for _ in range(count):
+                self.print_production("<Declaration List> -> <Declaration> ; | <Declaration> ; <Declaration List>")
         
     def declaration(self):
         """
@@ -172,61 +322,170 @@ class Parser:
         type_name = self.qualifier()
         
         # Parse IDs and add them to symbol table
-        self.ids(type_name)
+        names = self.ids(type_name)
         
-        self.print_production("<Declaration> -> <Qualifier> <IDs>")
+        if self.build_ast:
+            self.nodes.append(Declaration(type_name, names))
+        
+        if self.trace_productions:
+            self.print_production("<Declaration> -> <Qualifier> <IDs>")
         
     def qualifier(self):
         """
         R8. <Qualifier> ::= integer | boolean
         Modified for simplified Rat25S: No real type
         """
-        if self.current_token and self.current_token.lexeme == "integer":
-            self.match(lexeme="integer")
-            qualifier_type = "integer"
-        elif self.current_token and self.current_token.lexeme == "boolean":
-            self.match(lexeme="boolean")
-            qualifier_type = "boolean"
-        else:
+        qualifier_type = QUALIFIERS.get(self.current_token.kind) if self.current_token else None
+        if qualifier_type is None:
             self.error("Expected 'integer' or 'boolean'")
+        self.match()
         
-        self.print_production("<Qualifier> -> integer | boolean")
+        if self.trace_productions:
+            self.print_production("<Qualifier> -> integer | boolean")
         return qualifier_type
         
     def ids(self, type_name):
         """
         R10. <IDs> ::= <Identifier> | <Identifier>, <IDs>
         Now also adds identifiers to the symbol table.
+        Parsed in a loop, printing the production once per identifier at the end.
+        Returns the declared names.
         """
-        if self.current_token and self.current_token.token_type == TOKEN_IDENTIFIER:
-            # Get the identifier lexeme
-            id_token = self.match(TOKEN_IDENTIFIER)
+        names = []
+        while True:
+            if self.current_token and self.current_token.kind == KIND_IDENTIFIER:
+                # Get the identifier lexeme
+                id_token = self.match(KIND_IDENTIFIER)
+                names.append(id_token.lexeme)
+                
+                # Add to symbol table
+                if self.symbol_table:
+                    try:
+                        self.symbol_table.insert(id_token.lexeme, type_name)
+                    except Exception as e:
+                        self.error(str(e))
+            else:
+                self.error("Expected identifier")
             
-            # Add to symbol table
-            if self.symbol_table:
-                try:
-                    self.symbol_table.insert(id_token.lexeme, type_name)
-                except Exception as e:
-                    self.error(str(e))
-        else:
-            self.error("Expected identifier")
-        
-        if self.current_token and self.current_token.lexeme == ",":
-            self.match(lexeme=",")
-            self.ids(type_name)
+            if not (self.current_token and self.current_token.kind == KIND_COMMA):
+                break
+            self.match(KIND_COMMA)
             
-        self.print_production("<IDs> -> <Identifier> | <Identifier>, <IDs>")
+        if self.trace_productions:
+            for _ in names:
+                self.print_production("<IDs> -> <Identifier> | <Identifier>, <IDs>")
+        return tuple(names)
+    
+    def collect(self, count):
+        """
+        Replaces the last count tree nodes with one tuple holding them.
+        """
+        start = len(self.nodes) - count
+        nodes = tuple(self.nodes[start:])
+        del self.nodes[start:]
+        self.nodes.append(nodes)
+    
+    def run_rules(self, rule):
+        """
+        Runs a statement rule and everything nested in it.
+        Statement rules are generators that yield each nested rule they need parsed.
+        The nested rule runs to completion on an explicit stack before the rule that
+        yielded it resumes, so nesting depth is limited by memory, not the recursion limit.
+        When recovering, a rule that fails is dropped and parsing resynchronizes.
+        """
+        stack = [rule]
+        while stack:
+            try:
+                nested = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+            except ParseError:
+                stack.pop()
+                if not self.recover or not self.synchronize(stack):
+                    raise
+            else:
+                stack.append(nested)
+    
+    def skip_token(self):
+        """
+        Moves past the current token without matching or tracing it.
+        """
+        self.current_token = self.lexer.get_next_token()
+        self.token_index += 1
+    
+    def skip_until(self, kinds):
+        while self.current_token and self.current_token.kind not in kinds:
+            self.skip_token()
+    
+    def open_rule(self, stack, kind):
+        """
+        Returns the index of the innermost rule on the stack that matches the closing token kind, or None.
+        """
+        name = CLOSERS[kind]
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index].__name__ == name:
+                return index
+        return None
+    
+    def synchronize(self, stack):
+        """
+        Panic mode recovery after an error in a statement: skips to the next
+        synchronizing token, then unwinds the rule stack to the rule that takes it.
+        ';' ends the broken statement, a closing token goes back to the open
+        compound, if or while it closes, and $$ ends the statement list.
+        Returns False at the end of input, where there is nothing to resume.
+        """
+        while True:
+            self.skip_until(SYNC_KINDS)
+            if self.current_token is None:
+                return False
+            
+            kind = self.current_token.kind
+            if kind == KIND_DOLLARS:
+                del stack[1:]
+                return True
+            if kind in CLOSERS:
+                index = self.open_rule(stack, kind)
+                if index is not None:
+                    del stack[index + 1:]
+                    return True
+            # A ';', or a closing token with nothing open for it
+            self.skip_token()
+            
+            kind = self.current_token.kind if self.current_token else None
+            if kind not in CLOSERS or self.open_rule(stack, kind) is not None:
+                return True
     
-    def statement_list(self):
+    def mark_statement(self):
+        """
+        Records where a top-level statement starts or ends in statement_marks:
+        the number of tokens matched and the next instruction (see syntax_analyzer.incremental).
+        """
+        if self.statement_marks is not None:
+            instruction = self.assembly_gen.get_next_instruction() if self.assembly_gen else None
+            self.statement_marks.append((self.token_index, instruction))
+    
+    def statement_list(self, top_level=False):
         """
         R11. <Statement List> ::= <Statement> | <Statement> <Statement List>
+        Parsed in a loop, printing the production once per statement at the end.
         """
-        self.statement()
+        count = 0
+        while True:
+            yield self.statement()
+            count += 1
+            if top_level:
+                self.mark_statement()
+            
+            if not (self.current_token and self.current_token.kind != KIND_DOLLARS and self.current_token.kind != KIND_RIGHT_BRACE):
+                break
         
-        if self.current_token and self.current_token.lexeme != "$$" and self.current_token.lexeme != "}":
-            self.statement_list()
+        if self.build_ast:
+            self.collect(count)
         
-        self.print_production("<Statement List> -> <Statement> | <Statement> <Statement List>")
+        if self.trace_productions:
+            for _ in range(count):
+                self.print_production("<Statement List> -> <Statement> | <Statement> <Statement List>")
     
     def statement(self):
         """
@@ -235,50 +494,50 @@ class Parser:
         if not self.current_token:
             self.error("Unexpected end of input in statement")
             
-        if self.current_token.lexeme == "{":
-            self.compound()
-        elif self.current_token.token_type == TOKEN_IDENTIFIER:
-            self.assign()
-        elif self.current_token.lexeme == "if":
-            self.if_statement()
-        elif self.current_token.lexeme == "print":
-            self.print_statement()
-        elif self.current_token.lexeme == "scan":
-            self.scan_statement()
-        elif self.current_token.lexeme == "while":
-            self.while_statement()
-        else:
+        rule = STATEMENT_RULES.get(self.current_token.kind)
+        if rule is None:
             self.error(f"Invalid statement starting with '{self.current_token.lexeme}'")
+        # Compound, if and while are rules of their own on the stack, the others run right here
+        nested = rule(self)
+        if nested is not None:
+            yield nested
             
-        self.print_production("<Statement> -> <Compound> | <Assign> | <If> | <Return> | <Print> | <Scan> | <While>")
+        if self.trace_productions:
+            self.print_production("<Statement> -> <Compound> | <Assign> | <If> | <Return> | <Print> | <Scan> | <While>")
     
     def compound(self):
         """
         R13. <Compound> ::= { <Statement List> }
         """
-        if self.current_token and self.current_token.lexeme == "{":
-            self.match(lexeme="{")
+        if self.current_token and self.current_token.kind == KIND_LEFT_BRACE:
+            self.match(KIND_LEFT_BRACE)
         else:
             self.error("Expected '{' to start compound statement")
             
-        if self.current_token and self.current_token.lexeme != "}":
-            self.statement_list()
+        if self.current_token and self.current_token.kind != KIND_RIGHT_BRACE:
+            yield self.statement_list()
+        elif self.build_ast:
+            self.nodes.append(())
             
-        if self.current_token and self.current_token.lexeme == "}":
-            self.match(lexeme="}")
+        if self.current_token and self.current_token.kind == KIND_RIGHT_BRACE:
+            self.match(KIND_RIGHT_BRACE)
         else:
             self.error("Expected '}' to end compound statement")
+        
+        if self.build_ast:
+            self.nodes.append(Compound(self.nodes.pop()))
             
-        self.print_production("<Compound> -> { <Statement List> }")
+        if self.trace_productions:
+            self.print_production("<Compound> -> { <Statement List> }")
     
     def assign(self):
         """
         R14. <Assign> ::= <Identifier> = <Expression> ;
         Now also generates assembly code for the assignment.
         """
-        if self.current_token and self.current_token.token_type == TOKEN_IDENTIFIER:
+        if self.current_token and self.current_token.kind == KIND_IDENTIFIER:
             # Get the identifier
-            id_token = self.match(TOKEN_IDENTIFIER)
+            id_token = self.match(KIND_IDENTIFIER)
             identifier = id_token.lexeme
             
             # Check if identifier is in symbol table
@@ -290,8 +549,8 @@ class Parser:
         else:
             self.error("Expected identifier for assignment")
             
-        if self.current_token and self.current_token.lexeme == "=":
-            self.match(lexeme="=")
+        if self.current_token and self.current_token.kind == KIND_ASSIGN:
+            self.match(KIND_ASSIGN)
         else:
             self.error("Expected '=' in assignment")
             
@@ -305,13 +564,17 @@ class Parser:
         # Generate assembly code for the assignment
         if self.assembly_gen:
             self.assembly_gen.gen_assignment(identifier)
+        
+        if self.build_ast:
+            self.nodes.append(Assign(identifier, self.nodes.pop()))
             
-        if self.current_token and self.current_token.lexeme == ";":
-            self.match(lexeme=";")
+        if self.current_token and self.current_token.kind == KIND_SEMICOLON:
+            self.match(KIND_SEMICOLON)
         else:
             self.error("Expected ';' after assignment")
             
-        self.print_production("<Assign> -> <Identifier> = <Expression> ;")
+        if self.trace_productions:
+            self.print_production("<Assign> -> <Identifier> = <Expression> ;")
     
     def if_statement(self):
         """
@@ -319,13 +582,13 @@ class Parser:
                    if ( <Condition> ) <Statement> else <Statement> endif
         Now also generates assembly code for the if statement.
         """
-        if self.current_token and self.current_token.lexeme == "if":
-            self.match(lexeme="if")
+        if self.current_token and self.current_token.kind == KIND_IF:
+            self.match(KIND_IF)
         else:
             self.error("Expected 'if'")
             
-        if self.current_token and self.current_token.lexeme == "(":
-            self.match(lexeme="(")
+        if self.current_token and self.current_token.kind == KIND_LEFT_PAREN:
+            self.match(KIND_LEFT_PAREN)
         else:
             self.error("Expected '(' after 'if'")
             
@@ -337,136 +600,157 @@ class Parser:
         if self.assembly_gen:
             if_jmp_addr = self.assembly_gen.start_if_statement()
             
-        if self.current_token and self.current_token.lexeme == ")":
-            self.match(lexeme=")")
+        if self.current_token and self.current_token.kind == KIND_RIGHT_PAREN:
+            self.match(KIND_RIGHT_PAREN)
         else:
             self.error("Expected ')' after condition")
             
         # Parse the statement
-        self.statement()
+        yield self.statement()
         
         # Check if there's an else part
         else_jmp_addr = if_jmp_addr
-        if self.current_token and self.current_token.lexeme == "else":
-            self.match(lexeme="else")
+        has_else = False
+        if self.current_token and self.current_token.kind == KIND_ELSE:
+            has_else = True
+            self.match(KIND_ELSE)
             
             # Generate assembly code for the else part
             if self.assembly_gen:
                 else_jmp_addr = self.assembly_gen.else_statement(if_jmp_addr)
                 
             # Parse the else statement
-            self.statement()
+            yield self.statement()
         
         # Match the endif
-        if self.current_token and self.current_token.lexeme == "endif":
-            self.match(lexeme="endif")
+        if self.current_token and self.current_token.kind == KIND_ENDIF:
+            self.match(KIND_ENDIF)
         else:
             self.error("Expected 'endif'")
             
         # Generate assembly code for the end of the if statement
         if self.assembly_gen:
             self.assembly_gen.end_if_statement(else_jmp_addr)
+        
+        if self.build_ast:
+            otherwise = self.nodes.pop() if has_else else None
+            then = self.nodes.pop()
+            self.nodes.append(If(self.nodes.pop(), then, otherwise))
             
-        self.print_production("<If> -> if ( <Condition> ) <Statement> endif | if ( <Condition> ) <Statement> else <Statement> endif")
+        if self.trace_productions:
+            self.print_production("<If> -> if ( <Condition> ) <Statement> endif | if ( <Condition> ) <Statement> else <Statement> endif")
 
     def print_statement(self):
         """
         R17. <Print> ::= print ( <Expression> ) ;
         Now also generates assembly code for the print statement.
         """
-        if self.current_token and self.current_token.lexeme == "print":
-            self.match(lexeme="print")
+        if self.current_token and self.current_token.kind == KIND_PRINT:
+            self.match(KIND_PRINT)
         else:
             self.error("Expected 'print'")
             
-        if self.current_token and self.current_token.lexeme == "(":
-            self.match(lexeme="(")
+        if self.current_token and self.current_token.kind == KIND_LEFT_PAREN:
+            self.match(KIND_LEFT_PAREN)
         else:
             self.error("Expected '(' after 'print'")
             
         # Parse the expression, which will put the result on the stack
         self.expression()
         
-        if self.current_token and self.current_token.lexeme == ")":
-            self.match(lexeme=")")
+        if self.current_token and self.current_token.kind == KIND_RIGHT_PAREN:
+            self.match(KIND_RIGHT_PAREN)
         else:
             self.error("Expected ')' after expression")
             
         # Generate assembly code for the print statement
         if self.assembly_gen:
             self.assembly_gen.gen_stdout()
+        
+        if self.build_ast:
+            self.nodes.append(Print(self.nodes.pop()))
             
-        if self.current_token and self.current_token.lexeme == ";":
-            self.match(lexeme=";")
+        if self.current_token and self.current_token.kind == KIND_SEMICOLON:
+            self.match(KIND_SEMICOLON)
         else:
             self.error("Expected ';' after print statement")
             
-        self.print_production("<Print> -> print ( <Expression> ) ;")
+        if self.trace_productions:
+            self.print_production("<Print> -> print ( <Expression> ) ;")
     
     def scan_statement(self):
         """
         R18. <Scan> ::= scan ( <IDs> ) ;
         Now also generates assembly code for the scan statement.
         """
-        if self.current_token and self.current_token.lexeme == "scan":
-            self.match(lexeme="scan")
+        if self.current_token and self.current_token.kind == KIND_SCAN:
+            self.match(KIND_SCAN)
         else:
             self.error("Expected 'scan'")
             
-        if self.current_token and self.current_token.lexeme == "(":
-            self.match(lexeme="(")
+        if self.current_token and self.current_token.kind == KIND_LEFT_PAREN:
+            self.match(KIND_LEFT_PAREN)
         else:
             self.error("Expected '(' after 'scan'")
             
         # Parse the IDs and generate scan instructions for each one
-        self.scan_ids()
+        names = self.scan_ids()
             
-        if self.current_token and self.current_token.lexeme == ")":
-            self.match(lexeme=")")
+        if self.current_token and self.current_token.kind == KIND_RIGHT_PAREN:
+            self.match(KIND_RIGHT_PAREN)
         else:
             self.error("Expected ')' after IDs")
             
-        if self.current_token and self.current_token.lexeme == ";":
-            self.match(lexeme=";")
+        if self.current_token and self.current_token.kind == KIND_SEMICOLON:
+            self.match(KIND_SEMICOLON)
         else:
             self.error("Expected ';' after scan statement")
+        
+        if self.build_ast:
+            self.nodes.append(Scan(names))
             
-        self.print_production("<Scan> -> scan ( <IDs> ) ;")
+        if self.trace_productions:
+            self.print_production("<Scan> -> scan ( <IDs> ) ;")
     
     def scan_ids(self):
         """
         Helper method for scan statement to handle multiple IDs.
         Similar to <IDs> rule but generates scan instructions for each ID.
+        Returns the scanned names.
         """
-        if self.current_token and self.current_token.token_type == TOKEN_IDENTIFIER:
-            # Get the identifier
-            id_token = self.match(TOKEN_IDENTIFIER)
-            identifier = id_token.lexeme
+        names = []
+        while True:
+            if self.current_token and self.current_token.kind == KIND_IDENTIFIER:
+                # Get the identifier
+                id_token = self.match(KIND_IDENTIFIER)
+                identifier = id_token.lexeme
+                names.append(identifier)
+                
+                # Check if identifier is in symbol table
+                if self.symbol_table:
+                    try:
+                        self.symbol_table.get_type(identifier)  # This will raise an error if not found
+                        
+                        # Generate assembly code for the scan
+                        if self.assembly_gen:
+                            self.assembly_gen.gen_scan(identifier)
+                    except Exception as e:
+                        self.error(str(e))
+            else:
+                self.error("Expected identifier for scan")
             
-            # Check if identifier is in symbol table
-            if self.symbol_table:
-                try:
-                    self.symbol_table.get_type(identifier)  # This will raise an error if not found
-                    
-                    # Generate assembly code for the scan
-                    if self.assembly_gen:
-                        self.assembly_gen.gen_scan(identifier)
-                except Exception as e:
-                    self.error(str(e))
-        else:
-            self.error("Expected identifier for scan")
-        
-        if self.current_token and self.current_token.lexeme == ",":
-            self.match(lexeme=",")
-            self.scan_ids()
+            if not (self.current_token and self.current_token.kind == KIND_COMMA):
+                break
+            self.match(KIND_COMMA)
+        return tuple(names)
     
     def while_statement(self):
         """
         R19. <While> ::= while ( <Condition> ) <Statement> endwhile
         Now also generates assembly code for the while loop.
         """
-        if self.current_token and self.current_token.lexeme == "while":
-            self.match(lexeme="while")
+        if self.current_token and self.current_token.kind == KIND_WHILE:
+            self.match(KIND_WHILE)
         else:
             self.error("Expected 'while'")
             
@@ -475,8 +759,8 @@ class Parser:
         if self.assembly_gen:
             loop_start = self.assembly_gen.start_while_loop()
             
-        if self.current_token and self.current_token.lexeme == "(":
-            self.match(lexeme="(")
+        if self.current_token and self.current_token.kind == KIND_LEFT_PAREN:
+            self.match(KIND_LEFT_PAREN)
         else:
             self.error("Expected '(' after 'while'")
             
@@ -488,24 +772,29 @@ class Parser:
         if self.assembly_gen:
             condition_jmp = self.assembly_gen.while_condition()
             
-        if self.current_token and self.current_token.lexeme == ")":
-            self.match(lexeme=")")
+        if self.current_token and self.current_token.kind == KIND_RIGHT_PAREN:
+            self.match(KIND_RIGHT_PAREN)
         else:
             self.error("Expected ')' after condition")
             
         # Parse the statement
-        self.statement()
+        yield self.statement()
         
         # Generate code to jump back to the condition
         if self.assembly_gen:
             self.assembly_gen.end_while_loop(loop_start, condition_jmp)
             
-        if self.current_token and self.current_token.lexeme == "endwhile":
-            self.match(lexeme="endwhile")
+        if self.current_token and self.current_token.kind == KIND_ENDWHILE:
+            self.match(KIND_ENDWHILE)
         else:
             self.error("Expected 'endwhile'")
+        
+        if self.build_ast:
+            body = self.nodes.pop()
+            self.nodes.append(While(self.nodes.pop(), body))
             
-        self.print_production("<While> -> while ( <Condition> ) <Statement> endwhile")
+        if self.trace_productions:
+            self.print_production("<While> -> while ( <Condition> ) <Statement> endwhile")
     
     def condition(self):
         """
@@ -528,141 +817,146 @@ class Parser:
         # Generate assembly code for the condition
         if self.assembly_gen:
             self.assembly_gen.gen_relational(relop)
+        
+        if self.build_ast:
+            right = self.nodes.pop()
+            self.nodes.append(Condition(relop, self.nodes.pop(), right))
             
-        self.print_production("<Condition> -> <Expression> <Relop> <Expression>")
+        if self.trace_productions:
+            self.print_production("<Condition> -> <Expression> <Relop> <Expression>")
     
     def relop(self):
         """
         R21. <Relop> ::= == | != | > | < | <= | >=
         Now returns the relational operator for code generation.
         """
-        relop = None
-        
-        if self.current_token and self.current_token.lexeme == "==":
-            self.match(lexeme="==")
-            relop = "=="
-        elif self.current_token and self.current_token.lexeme == "!=":
-            self.match(lexeme="!=")
-            relop = "!="
-        elif self.current_token and self.current_token.lexeme == ">":
-            self.match(lexeme=">")
-            relop = ">"
-        elif self.current_token and self.current_token.lexeme == "<":
-            self.match(lexeme="<")
-            relop = "<"
-        elif self.current_token and self.current_token.lexeme == "<=":
-            self.match(lexeme="<=")
-            relop = "<="
-        elif self.current_token and self.current_token.lexeme == ">=":
-            self.match(lexeme=">=")
-            relop = ">="
-        else:
+        relop = RELOPS.get(self.current_token.kind) if self.current_token else None
+        if relop is None:
             self.error("Expected relational operator")
+        self.match()
             
-        self.print_production("<Relop> -> == | != | > | < | <= | >=")
+        if self.trace_productions:
+            self.print_production("<Relop> -> == | != | > | < | <= | >=")
         return relop
     
     def expression(self):
         """
         R22. <Expression> ::= <Term> | <Term> + <Expression> | <Term> - <Expression>
-        Now also generates assembly code for the expression and returns the type.
+        R23. <Term> ::= <Factor> | <Factor> * <Term> | <Factor> / <Term>
+        R24. <Factor> ::= - <Primary> | <Primary>
+        Parsed by precedence climbing in a loop: operators wait on a stack until one
+        that binds less tightly shows up, so chains group from the left. Each
+        parenthesized expression is a new level on an explicit stack rather than a
+        recursive call, so nesting depth is limited by memory only.
+        Generates assembly code for the expression and returns its type.
         """
-        # Parse the first term
-        term_type = self.term()
+        levels = []     # (operand types, operators, negated) of every enclosing '('
+        operand_types = []
+        operators = []
         
-        # Check if there's an operator
-        if self.current_token and self.current_token.lexeme in ["+", "-"]:
-            operator = self.current_token.lexeme
-            self.match(lexeme=operator)
-            
-            # Parse the rest of the expression
-            expr_type = self.expression()
-            
-            # Type checking for the expression
-            if self.symbol_table:
-                # Check if both operands are same type and not boolean for arithmetic operations
-                if not self.symbol_table.check_type_compatibility(term_type, expr_type, operator):
-                    self.error(f"Type mismatch in expression: Cannot perform {operator} on {term_type} and {expr_type}")
-            
-            # Generate assembly code for the expression
-            if self.assembly_gen:
-                self.assembly_gen.gen_arithmetic(operator)
+        while True:
+            # Factor: optional unary minus, then a primary or a parenthesized expression
+            negated = False
+            if self.current_token and self.current_token.kind == KIND_MINUS:
+                self.match(KIND_MINUS)
+                negated = True
+            
+            if self.current_token and self.current_token.kind == KIND_LEFT_PAREN:
+                self.match(KIND_LEFT_PAREN)
+                levels.append((operand_types, operators, negated))
+                operand_types, operators = [], []
+                continue
+            
+            operand_type = self.primary()
+            if negated:
+                self.negate(operand_type)
+            operand_types.append(operand_type)
+            
+            while True:
+                arithmetic = ARITHMETIC.get(self.current_token.kind) if self.current_token else None
+                if arithmetic is not None:
+                    operator, binding_power = arithmetic
+                    # Everything already waiting that binds at least as tightly applies first
+                    while operators and BINDING_POWERS[operators[-1]] >= binding_power:
+                        self.apply_operator(operators.pop(), operand_types)
+                    self.match()
+                    operators.append(operator)
+                    break
                 
-            return term_type  # Return the type of the expression
-            
-        return term_type  # Return the type of the term if no operator
+                while operators:
+                    self.apply_operator(operators.pop(), operand_types)
+                
+                if not levels:
+                    return operand_types[0]
+                
+                # Close the innermost parenthesized expression
+                if self.current_token and self.current_token.kind == KIND_RIGHT_PAREN:
+                    self.match(KIND_RIGHT_PAREN)
+                else:
+                    self.error("Expected ')' after expression")
+                
+                expr_type = operand_types[0]
+                operand_types, operators, negated = levels.pop()
+                if negated:
+                    self.negate(expr_type)
+                operand_types.append(expr_type)
     
-    def term(self):
+    def apply_operator(self, operator, operand_types):
         """
-        R23. <Term> ::= <Factor> | <Factor> * <Term> | <Factor> / <Term>
-        Now also generates assembly code for the term and returns the type.
+        Type checks and generates one arithmetic operator over the two topmost operands.
+        The result keeps the type of the left operand.
         """
-        # Parse the first factor
-        factor_type = self.factor()
+        right_type = operand_types.pop()
+        left_type = operand_types[-1]
         
-        # Check if there's an operator
-        if self.current_token and self.current_token.lexeme in ["*", "/"]:
-            operator = self.current_token.lexeme
-            self.match(lexeme=operator)
-            
-            # Parse the rest of the term
-            term_type = self.term()
-            
-            # Type checking for the term
-            if self.symbol_table:
-                # Check if both operands are same type and not boolean for arithmetic operations
-                if not self.symbol_table.check_type_compatibility(factor_type, term_type, operator):
-                    self.error(f"Type mismatch in term: Cannot perform {operator} on {factor_type} and {term_type}")
-            
-            # Generate assembly code for the term
-            if self.assembly_gen:
-                self.assembly_gen.gen_arithmetic(operator)
-                
-            return factor_type  # Return the type of the term
-            
-        return factor_type  # Return the type of the factor if no operator
+        if self.symbol_table:
+            # Check if both operands are same type and not boolean for arithmetic operations
+            if not self.symbol_table.check_type_compatibility(left_type, right_type, operator):
+                rule = "expression" if operator in ["+", "-"] else "term"
+                self.error(f"Type mismatch in {rule}: Cannot perform {operator} on {left_type} and {right_type}")
+        
+        if self.assembly_gen:
+            self.assembly_gen.gen_arithmetic(operator)
+        
+        if self.build_ast:
+            right = self.nodes.pop()
+            self.nodes[-1] = BinaryOp(operator, self.nodes[-1], right)
     
-    def factor(self):
+    def negate(self, primary_type):
         """
-        R24. <Factor> ::= - <Primary> | <Primary>
-        Now also generates assembly code for the factor and returns the type.
+        Unary minus of R24, applied once its primary has been parsed.
         """
-        # Check if there's a unary minus
-        if self.current_token and self.current_token.lexeme == "-":
-            self.match(lexeme="-")
-            
-            # Parse the primary
-            primary_type = self.primary()
-            
-            # Type checking for the unary minus
-            if self.symbol_table and primary_type == "boolean":
-                self.error("Cannot apply unary minus to boolean value")
-            
-            # Generate assembly code for the unary minus (negate by multiplying by -1)
-            if self.assembly_gen:
-                self.assembly_gen.gen_pushi(-1)
-                self.assembly_gen.gen_mul()
-                
-            return primary_type
-            
-        # Parse the primary
-        return self.primary()
+        # Type checking for the unary minus
+        if self.symbol_table and primary_type == "boolean":
+            self.error("Cannot apply unary minus to boolean value")
+        
+        # Generate assembly code for the unary minus (negate by multiplying by -1)
+        if self.assembly_gen:
+            self.assembly_gen.gen_pushi(-1)
+            self.assembly_gen.gen_mul()
+        
+        if self.build_ast:
+            self.nodes[-1] = Negate(self.nodes[-1])
     
     def primary(self):
         """
         R25. <Primary> ::= <Identifier> | <Integer> | <Identifier> ( <IDs> ) | ( <Expression> ) | <Real> | true | false
         Modified for simplified Rat25S: No function calls
+        ( <Expression> ) is handled by expression(), which keeps its own stack of open parentheses.
         Now also generates assembly code for the primary and returns the type.
         """
         if not self.current_token:
             self.error("Unexpected end of input in primary")
             
         # Identifier
-        if self.current_token.token_type == TOKEN_IDENTIFIER:
+        if self.current_token.kind == KIND_IDENTIFIER:
             # Get the identifier
-            id_token = self.match(TOKEN_IDENTIFIER)
+            id_token = self.match(KIND_IDENTIFIER)
             identifier = id_token.lexeme
             
+            if self.build_ast:
+                self.nodes.append(Identifier(identifier))
+            
             # Check if identifier is in symbol table
             if self.symbol_table:
                 try:
@@ -680,54 +974,64 @@ class Parser:
             return "unknown"  # Default type if no symbol table
             
         # Integer
-        elif self.current_token.token_type == TOKEN_INTEGER:
+        elif self.current_token.kind == KIND_INTEGER:
             value = self.current_token.lexeme
-            self.match(TOKEN_INTEGER)
+            self.match(KIND_INTEGER)
             
             # Generate assembly code for the integer
             if self.assembly_gen:
                 self.assembly_gen.gen_pushi(value)
-                
-            return "integer"
-            
-        # Expression in parentheses
-        elif self.current_token.lexeme == "(":
-            self.match(lexeme="(")
-            expr_type = self.expression()
             
-            if self.current_token and self.current_token.lexeme == ")":
-                self.match(lexeme=")")
-            else:
-                self.error("Expected ')' after expression")
+            if self.build_ast:
+                self.nodes.append(Integer(value))
                 
-            return expr_type
+            return "integer"
             
         # Boolean literals
-        elif self.current_token.lexeme == "true":
-            self.match(lexeme="true")
+        elif self.current_token.kind == KIND_TRUE:
+            self.match(KIND_TRUE)
             
             # Generate assembly code for true (1)
             if self.assembly_gen:
                 self.assembly_gen.gen_pushi(1)
+            
+            if self.build_ast:
+                self.nodes.append(Boolean(True))
                 
             return "boolean"
             
-        elif self.current_token.lexeme == "false":
-            self.match(lexeme="false")
+        elif self.current_token.kind == KIND_FALSE:
+            self.match(KIND_FALSE)
             
             # Generate assembly code for false (0)
             if self.assembly_gen:
                 self.assembly_gen.gen_pushi(0)
+            
+            if self.build_ast:
+                self.nodes.append(Boolean(False))
                 
             return "boolean"
             
         else:
             self.error(f"Invalid primary: {self.current_token.lexeme}")
             
-        self.print_production("<Primary> -> <Identifier> | <Integer> | ( <Expression> ) | true | false")
+        if self.trace_productions:
+            self.print_production("<Primary> -> <Identifier> | <Integer> | ( <Expression> ) | true | false")
     
     def empty(self):
         """
         R26. <Empty> ::= ε
         """
-        self.print_production("<Empty> -> ε")
+        if self.trace_productions:
+            self.print_production("<Empty> -> ε")
+
+
+# Kind of the token a statement starts with -> the rule parsing it
+STATEMENT_RULES = {
+    KIND_LEFT_BRACE: Parser.compound,
+    KIND_IDENTIFIER: Parser.assign,
+    KIND_IF: Parser.if_statement,
+    KIND_PRINT: Parser.print_statement,
+    KIND_SCAN: Parser.scan_statement,
+    KIND_WHILE: Parser.while_statement,
+}
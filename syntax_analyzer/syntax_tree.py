@@ -0,0 +1,207 @@
+"""
+Abstract syntax tree built by Parser(build_ast=True).
+Nodes use __slots__ and keep child lists as tuples so large programs stay
+compact; every node exposes children for utils.pretty_print_parse_tree.
+"""
+
+
+class Node:
+    __slots__ = ()
+
+    @property
+    def children(self):
+        return ()
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class Program(Node):
+    """
+    R1. $$ $$ <Opt Declaration List> $$ <Statement List> $$
+    """
+    __slots__ = ("declarations", "statements")
+
+    def __init__(self, declarations, statements):
+        self.declarations = declarations
+        self.statements = statements
+
+    @property
+    def children(self):
+        return self.declarations + self.statements
+
+    def __str__(self):
+        return "Program"
+
+
+class Declaration(Node):
+    __slots__ = ("type_name", "names")
+
+    def __init__(self, type_name, names):
+        self.type_name = type_name
+        self.names = names
+
+    def __str__(self):
+        return f"Declaration {self.type_name} {', '.join(self.names)}"
+
+
+class Compound(Node):
+    __slots__ = ("statements",)
+
+    def __init__(self, statements):
+        self.statements = statements
+
+    @property
+    def children(self):
+        return self.statements
+
+    def __str__(self):
+        return "Compound"
+
+
+class Assign(Node):
+    __slots__ = ("name", "expression")
+
+    def __init__(self, name, expression):
+        self.name = name
+        self.expression = expression
+
+    @property
+    def children(self):
+        return (self.expression,)
+
+    def __str__(self):
+        return f"Assign {self.name}"
+
+
+class If(Node):
+    __slots__ = ("condition", "then", "otherwise")
+
+    def __init__(self, condition, then, otherwise=None):
+        self.condition = condition
+        self.then = then
+        self.otherwise = otherwise  # None without an else part
+
+    @property
+    def children(self):
+        if self.otherwise is None:
+            return (self.condition, self.then)
+        return (self.condition, self.then, self.otherwise)
+
+    def __str__(self):
+        return "If"
+
+
+class While(Node):
+    __slots__ = ("condition", "body")
+
+    def __init__(self, condition, body):
+        self.condition = condition
+        self.body = body
+
+    @property
+    def children(self):
+        return (self.condition, self.body)
+
+    def __str__(self):
+        return "While"
+
+
+class Print(Node):
+    __slots__ = ("expression",)
+
+    def __init__(self, expression):
+        self.expression = expression
+
+    @property
+    def children(self):
+        return (self.expression,)
+
+    def __str__(self):
+        return "Print"
+
+
+class Scan(Node):
+    __slots__ = ("names",)
+
+    def __init__(self, names):
+        self.names = names
+
+    def __str__(self):
+        return f"Scan {', '.join(self.names)}"
+
+
+class Condition(Node):
+    __slots__ = ("operator", "left", "right")
+
+    def __init__(self, operator, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+    @property
+    def children(self):
+        return (self.left, self.right)
+
+    def __str__(self):
+        return f"Condition {self.operator}"
+
+
+class BinaryOp(Node):
+    __slots__ = ("operator", "left", "right")
+
+    def __init__(self, operator, left, right):
+        self.operator = operator
+        self.left = left
+        self.right = right
+
+    @property
+    def children(self):
+        return (self.left, self.right)
+
+    def __str__(self):
+        return f"BinaryOp {self.operator}"
+
+
+class Negate(Node):
+    __slots__ = ("operand",)
+
+    def __init__(self, operand):
+        self.operand = operand
+
+    @property
+    def children(self):
+        return (self.operand,)
+
+    def __str__(self):
+        return "Negate"
+
+
+class Identifier(Node):
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return f"Identifier {self.name}"
+
+
+class Integer(Node):
+    __slots__ = ("lexeme",)
+
+    def __init__(self, lexeme):
+        self.lexeme = lexeme    # Kept as written, the listing pushes the lexeme as is
+
+    def __str__(self):
+        return f"Integer {self.lexeme}"
+
+
+class Boolean(Node):
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return f"Boolean {'true' if self.value else 'false'}"
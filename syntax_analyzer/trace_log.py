@@ -0,0 +1,176 @@
+"""
+Compact binary log of the parser trace.
+Instead of writing every production and token as text, the Parser records one
+(rule id, token index, line) record per trace event. render_trace turns a log
+back into the text trace on demand, optionally only for some rules or lines.
+
+Usage: python -m syntax_analyzer.trace_log <log> <source> [--rule NAME]... [--lines FIRST-LAST]
+"""
+import struct
+import sys
+from array import array
+
+from lexical_analyzer.lexical_analyzer import Lexer
+from lexical_analyzer.token_cache import little_endian, read_column
+from lexical_analyzer.constants import ENGINE_PATTERN, TRACE_OFF
+
+# Rule id of a matched token, productions are numbered from 1 in the log's rule table
+TOKEN_EVENT = 0
+
+# Trace log layout, all integers little-endian:
+#   header   magic, format version, rule count, event count
+#   lengths  rule count x uint32, length of each production text in UTF-8 bytes
+#   rules    every production text, UTF-8 encoded back to back
+#   events   event count x 3 uint32: rule id, token index, line
+LOG_MAGIC = b"RTRL"
+LOG_VERSION = 1
+LOG_HEADER = struct.Struct("<4sHII")
+
+
+class TraceLog:
+    """
+    Trace events of one parse, three integers each. Production texts are kept
+    once in a rule table and referred to by id.
+    """
+    def __init__(self):
+        self.rules = [None]     # Rule id -> production text, id 0 is the token event
+        self.rule_ids = {}
+        self.events = array('I')
+
+    def production(self, production, token_index, line):
+        rule_id = self.rule_ids.get(production)
+        if rule_id is None:
+            rule_id = self.rule_ids[production] = len(self.rules)
+            self.rules.append(production)
+        self.events.extend((rule_id, token_index, line))
+
+    def token(self, token_index, line):
+        self.events.extend((TOKEN_EVENT, token_index, line))
+
+    def __len__(self):
+        return len(self.events) // 3
+
+    def __iter__(self):
+        """
+        Yields (rule id, token index, line) of every event.
+        """
+        events = self.events
+        for index in range(0, len(events), 3):
+            yield events[index], events[index + 1], events[index + 2]
+
+    def nbytes(self):
+        return self.events.itemsize * len(self.events)
+
+
+def write_trace_log(log, file):
+    """
+    Writes a TraceLog to a binary file object.
+    """
+    rules = [rule.encode('utf-8') for rule in log.rules[1:]]
+    file.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, len(rules), len(log)))
+    file.write(little_endian(array('I', map(len, rules))))
+    file.write(b"".join(rules))
+    file.write(little_endian(log.events))
+
+
+def read_trace_log(file):
+    """
+    Reads a TraceLog written by write_trace_log from a binary file object.
+    """
+    data = file.read()
+    if len(data) < LOG_HEADER.size:
+        raise ValueError("Truncated trace log header")
+    magic, version, rule_count, event_count = LOG_HEADER.unpack_from(data)
+    if magic != LOG_MAGIC or version != LOG_VERSION:
+        raise ValueError("Not a trace log of this version")
+
+    log = TraceLog()
+    lengths, offset = read_column('I', data, LOG_HEADER.size, rule_count)
+    for length in lengths:
+        log.rules.append(data[offset:offset + length].decode('utf-8'))
+        offset += length
+    log.rule_ids = {rule: rule_id for rule_id, rule in enumerate(log.rules) if rule_id}
+    log.events, offset = read_column('I', data, offset, event_count * 3)
+    if offset != len(data):
+        raise ValueError("Truncated trace log")
+    return log
+
+
+def rule_name(production):
+    """
+    Returns the rule a production is for, "Assign" for "<Assign> -> ...".
+    """
+    return production.split(" -> ", 1)[0].strip("<>")
+
+
+def render_trace(log, tokens, rules=None, lines=None):
+    """
+    Yields the lines of the text trace recorded in log, as the Parser prints them.
+    tokens is the token sequence that was parsed, used for the matched tokens.
+    rules keeps only the productions of those rule names, dropping the tokens
+    unless "Token" is one of them; lines keeps only events on lines first to last.
+    """
+    wanted = None
+    if rules is not None:
+        names = {name.strip("<>") for name in rules}
+        wanted = {rule_id for rule_id, rule in enumerate(log.rules) if rule_id and rule_name(rule) in names}
+        if "Token" in names:
+            wanted.add(TOKEN_EVENT)
+    first, last = lines if lines is not None else (0, float("inf"))
+
+    productions = [None] + [f"\tProduction: {rule}" for rule in log.rules[1:]]
+    for rule_id, token_index, line in log:
+        if wanted is not None and rule_id not in wanted:
+            continue
+        if not first <= line <= last:
+            continue
+        if rule_id == TOKEN_EVENT:
+            token = tokens[token_index]
+            yield f"Token: {token.token_type}, Lexeme: {token.lexeme}"
+        else:
+            yield productions[rule_id]
+
+
+def source_tokens(text):
+    """
+    Lexes text for rendering, up to the first lexical error like the parse did.
+    """
+    lexer = Lexer(text, ENGINE_PATTERN, trace=TRACE_OFF)
+    tokens = []
+    try:
+        while (token := lexer.get_next_token()) is not None:
+            tokens.append(token)
+    except SyntaxError:
+        pass
+    return tokens
+
+
+def main(arguments):
+    if len(arguments) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        return 1
+    log_path, source_path = arguments[:2]
+    rules = []
+    lines = None
+    rest = iter(arguments[2:])
+    for argument in rest:
+        if argument == "--rule":
+            rules.append(next(rest))
+        elif argument == "--lines":
+            first, last = next(rest).split("-")
+            lines = (int(first), int(last))
+        else:
+            print(f"Unknown argument '{argument}'")
+            return 1
+
+    with open(log_path, 'rb') as file:
+        log = read_trace_log(file)
+    with open(source_path, 'r') as file:
+        tokens = source_tokens(file.read())
+    for line in render_trace(log, tokens, rules or None, lines):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))